@@ -1,5 +1,6 @@
 from machine import I2C
 import time
+import ustruct
 
 # BME280 default address.
 BME280_I2CADDR = 0x76
@@ -150,95 +151,108 @@ class BME280:
     if i2c is None:
       raise ValueError('An I2C object is required.')
     self._device = Device(address, i2c)
+    # Pressure, temperature and humidity data registers 0xF7..0xFE.
+    self._buf = bytearray(8)
+    # Datasheet maximum measurement time for the oversampling of all three channels.
+    osample = 1 << (mode - 1)
+    self._measure_us = 1250 + 2300 * osample * 3 + 575 * 2
     # Load calibration values.
     self._load_calibration()
+    # Humidity oversampling is latched by the next CONTROL write.
+    self._device.write8(BME280_REGISTER_CONTROL_HUM, self._mode)
     self._device.write8(BME280_REGISTER_CONTROL, 0x3F)
     self.t_fine = 0
 
   def _load_calibration(self):
-
-    self.dig_T1 = self._device.readU16LE(BME280_REGISTER_DIG_T1)
-    self.dig_T2 = self._device.readS16LE(BME280_REGISTER_DIG_T2)
-    self.dig_T3 = self._device.readS16LE(BME280_REGISTER_DIG_T3)
-
-    self.dig_P1 = self._device.readU16LE(BME280_REGISTER_DIG_P1)
-    self.dig_P2 = self._device.readS16LE(BME280_REGISTER_DIG_P2)
-    self.dig_P3 = self._device.readS16LE(BME280_REGISTER_DIG_P3)
-    self.dig_P4 = self._device.readS16LE(BME280_REGISTER_DIG_P4)
-    self.dig_P5 = self._device.readS16LE(BME280_REGISTER_DIG_P5)
-    self.dig_P6 = self._device.readS16LE(BME280_REGISTER_DIG_P6)
-    self.dig_P7 = self._device.readS16LE(BME280_REGISTER_DIG_P7)
-    self.dig_P8 = self._device.readS16LE(BME280_REGISTER_DIG_P8)
-    self.dig_P9 = self._device.readS16LE(BME280_REGISTER_DIG_P9)
-
-    self.dig_H1 = self._device.readU8(BME280_REGISTER_DIG_H1)
-    self.dig_H2 = self._device.readS16LE(BME280_REGISTER_DIG_H2)
-    self.dig_H3 = self._device.readU8(BME280_REGISTER_DIG_H3)
-    self.dig_H6 = self._device.readS8(BME280_REGISTER_DIG_H7)
-
-    h4 = self._device.readS8(BME280_REGISTER_DIG_H4)
-    h4 = (h4 << 24) >> 20
-    self.dig_H4 = h4 | (self._device.readU8(BME280_REGISTER_DIG_H5) & 0x0F)
-
-    h5 = self._device.readS8(BME280_REGISTER_DIG_H6)
-    h5 = (h5 << 24) >> 20
-    self.dig_H5 = h5 | (
-        self._device.readU8(BME280_REGISTER_DIG_H5) >> 4 & 0x0F)
+    """Reads the trimming parameters in two bursts: 0x88..0xA1 and 0xE1..0xE7."""
+    i2c, address = self._device._i2c, self._device._address
+    cal = i2c.readfrom_mem(address, BME280_REGISTER_DIG_T1, 26)
+    (self.dig_T1, self.dig_T2, self.dig_T3,
+     self.dig_P1, self.dig_P2, self.dig_P3, self.dig_P4, self.dig_P5,
+     self.dig_P6, self.dig_P7, self.dig_P8, self.dig_P9) = \
+        ustruct.unpack_from('<HhhHhhhhhhhh', cal)
+    self.dig_H1 = cal[BME280_REGISTER_DIG_H1 - BME280_REGISTER_DIG_T1]
+
+    cal = i2c.readfrom_mem(address, BME280_REGISTER_DIG_H2, 7)
+    self.dig_H2, self.dig_H3, e4, e5, e6, self.dig_H6 = \
+        ustruct.unpack('<hBbBbb', cal)
+    self.dig_H4 = (e4 << 4) | (e5 & 0x0F)
+    self.dig_H5 = (e6 << 4) | (e5 >> 4)
+
+  def start_measurement(self):
+    """Starts a forced mode measurement, returns its duration in microseconds.
+    Collect the result when it passed."""
+    self._device.write8(BME280_REGISTER_CONTROL,
+                        self._mode << 5 | self._mode << 2 | 1)
+    return self._measure_us
+
+  def collect_raw_data(self):
+    """Reads raw temperature, pressure and humidity of the last measurement
+    in one burst."""
+    self._device._i2c.readfrom_mem_into(
+        self._device._address, BME280_REGISTER_PRESSURE_DATA, self._buf)
+    buf = self._buf
+    return (((buf[3] << 16) | (buf[4] << 8) | buf[5]) >> 4,
+            ((buf[0] << 16) | (buf[1] << 8) | buf[2]) >> 4,
+            (buf[6] << 8) | buf[7])
+
+  def collect_compensated_data(self):
+    """Compensated data of the last measurement: temperature in 0.01 of a
+    degree celsius, pressure in Q24.8 Pascals and humidity in Q22.10 percent."""
+    raw_t, raw_p, raw_h = self.collect_raw_data()
+    return (self.compensate_temperature(raw_t),
+            self.compensate_pressure(raw_p),
+            self.compensate_humidity(raw_h))
+
+  def read_raw_data(self):
+    """Makes a forced mode measurement and reads raw temperature, pressure
+    and humidity in one burst."""
+    time.sleep_us(self.start_measurement())  # Wait the required time
+    return self.collect_raw_data()
+
+  def read_compensated_data(self):
+    """Measures once, returns the compensated data."""
+    time.sleep_us(self.start_measurement())  # Wait the required time
+    return self.collect_compensated_data()
 
   def read_raw_temp(self):
     """Reads the raw (uncompensated) temperature from the sensor."""
-    meas = self._mode
-    self._device.write8(BME280_REGISTER_CONTROL_HUM, meas)
-    meas = self._mode << 5 | self._mode << 2 | 1
-    self._device.write8(BME280_REGISTER_CONTROL, meas)
-    sleep_time = 1250 + 2300 * (1 << self._mode)
-
-    sleep_time = sleep_time + 2300 * (1 << self._mode) + 575
-    sleep_time = sleep_time + 2300 * (1 << self._mode) + 575
-    time.sleep_us(sleep_time)  # Wait the required time
-    msb = self._device.readU8(BME280_REGISTER_TEMP_DATA)
-    lsb = self._device.readU8(BME280_REGISTER_TEMP_DATA + 1)
-    xlsb = self._device.readU8(BME280_REGISTER_TEMP_DATA + 2)
-    raw = ((msb << 16) | (lsb << 8) | xlsb) >> 4
-    return raw
+    return self.read_raw_data()[0]
 
   def read_raw_pressure(self):
     """Reads the raw (uncompensated) pressure level from the sensor."""
     """Assumes that the temperature has already been read """
     """i.e. that enough delay has been provided"""
-    msb = self._device.readU8(BME280_REGISTER_PRESSURE_DATA)
-    lsb = self._device.readU8(BME280_REGISTER_PRESSURE_DATA + 1)
-    xlsb = self._device.readU8(BME280_REGISTER_PRESSURE_DATA + 2)
-    raw = ((msb << 16) | (lsb << 8) | xlsb) >> 4
-    return raw
+    buf = self._buf
+    self._device._i2c.readfrom_mem_into(
+        self._device._address, BME280_REGISTER_PRESSURE_DATA, buf)
+    return ((buf[0] << 16) | (buf[1] << 8) | buf[2]) >> 4
 
   def read_raw_humidity(self):
     """Assumes that the temperature has already been read """
     """i.e. that enough delay has been provided"""
-    msb = self._device.readU8(BME280_REGISTER_HUMIDITY_DATA)
-    lsb = self._device.readU8(BME280_REGISTER_HUMIDITY_DATA + 1)
-    raw = (msb << 8) | lsb
-    return raw
-
-  def read_temperature(self):
-    """Get the compensated temperature in 0.01 of a degree celsius."""
-    adc = self.read_raw_temp()
-    var1 = ((adc >> 3) - (self.dig_T1 << 1)) * (self.dig_T2 >> 11)
+    buf = self._buf
+    self._device._i2c.readfrom_mem_into(
+        self._device._address, BME280_REGISTER_PRESSURE_DATA, buf)
+    return (buf[6] << 8) | buf[7]
+
+  def compensate_temperature(self, adc):
+    """Compensated temperature in 0.01 of a degree celsius, sets t_fine."""
+    var1 = (((adc >> 3) - (self.dig_T1 << 1)) * self.dig_T2) >> 11
     var2 = ((
         (((adc >> 4) - self.dig_T1) * ((adc >> 4) - self.dig_T1)) >> 12) *
         self.dig_T3) >> 14
     self.t_fine = var1 + var2
     return (self.t_fine * 5 + 128) >> 8
 
-  def read_pressure(self):
-    """Gets the compensated pressure in Pascals."""
-    adc = self.read_raw_pressure()
+  def compensate_pressure(self, adc):
+    """Compensated pressure in Q24.8 Pascals, needs t_fine."""
     var1 = self.t_fine - 128000
     var2 = var1 * var1 * self.dig_P6
     var2 = var2 + ((var1 * self.dig_P5) << 17)
     var2 = var2 + (self.dig_P4 << 35)
     var1 = (((var1 * var1 * self.dig_P3) >> 8) +
-            ((var1 * self.dig_P2) >> 12))
+            ((var1 * self.dig_P2) << 12))
     var1 = (((1 << 47) + var1) * self.dig_P1) >> 33
     if var1 == 0:
       return 0
@@ -248,9 +262,8 @@ class BME280:
     var2 = (self.dig_P8 * p) >> 19
     return ((p + var1 + var2) >> 8) + (self.dig_P7 << 4)
 
-  def read_humidity(self):
-    adc = self.read_raw_humidity()
-    # print 'Raw humidity = {0:d}'.format (adc)
+  def compensate_humidity(self, adc):
+    """Compensated humidity in Q22.10 percent, needs t_fine."""
     h = self.t_fine - 76800
     h = (((((adc << 14) - (self.dig_H4 << 20) - (self.dig_H5 * h)) +
          16384) >> 15) * (((((((h * self.dig_H6) >> 10) * (((h *
@@ -261,6 +274,17 @@ class BME280:
     h = 419430400 if h > 419430400 else h
     return h >> 12
 
+  def read_temperature(self):
+    """Get the compensated temperature in 0.01 of a degree celsius."""
+    return self.compensate_temperature(self.read_raw_temp())
+
+  def read_pressure(self):
+    """Gets the compensated pressure in Pascals."""
+    return self.compensate_pressure(self.read_raw_pressure())
+
+  def read_humidity(self):
+    return self.compensate_humidity(self.read_raw_humidity())
+
   @property
   def temperature(self):
     "Return the temperature in degrees."
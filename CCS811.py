@@ -13,6 +13,9 @@ from machine import I2C
 class CCS811(object):
     """CCS811 gas sensor. Measures eCO2 in ppm and TVOC in ppb"""
 
+    # Measurement period of the drive modes, ms
+    DRIVE_MODE_PERIOD = {1: 1000, 2: 10000, 3: 60000, 4: 250}
+
     def __init__(self, i2c=None, addr=90):
         self.i2c = i2c
         self.addr = addr      # 0x5A = 90, 0x5B = 91
@@ -61,6 +64,22 @@ class CCS811(object):
         else:
             return False
 
+    def read_algorithm_data(self):
+        """data_ready in one transaction: eCO2, TVOC and the status are read together,
+        returns true if the values were new"""
+        register = self.i2c.readfrom_mem(self.addr, 0x02, 5)
+        # the status register follows the data: bit 3 is data_ready
+        if (register[4] >> 3) & 0x01:
+            self.eCO2 = (register[0] << 8) | register[1]
+            self.tVOC = (register[2] << 8) | register[3]
+            return True
+        return False
+
+    @property
+    def period_ms(self):
+        """measurement period of the drive mode"""
+        return self.DRIVE_MODE_PERIOD[self.mode]
+
     def get_baseline(self):
         register = self.i2c.readfrom_mem(self.addr,0x11,2)
         HB = register[0]
@@ -1,6 +1,8 @@
 import math
 import time
-from machine import ADC, Pin
+from machine import ADC
+
+from adc_sampler import AdcSampler
 
 class MQ135(object):
     """ Class for dealing with MQ13 Gas Sensors """
@@ -25,10 +27,8 @@ class MQ135(object):
     ATMOCO2 = 410
 
 
-    def __init__(self, pin):
-        self._adc = ADC(Pin(pin, Pin.IN))
-        self._adc.width(ADC.WIDTH_10BIT)
-        self._adc.aten(ADC.ATTN_11DB)
+    def __init__(self, pin, samples=32):
+        self._sampler = AdcSampler(pin, samples, width=ADC.WIDTH_10BIT, atten=ADC.ATTN_11DB)
 
     def get_correction_factor(self, temperature, humidity):
         """Calculates the correction factor for ambient air temperature and relative humidity
@@ -45,7 +45,7 @@ class MQ135(object):
 
     def get_resistance(self):
         """Returns the resistance of the sensor in kOhms // -1 if not value got in pin"""
-        value = self._adc.read() * 1.44
+        value = self._sampler.mean() * 1.44
         if value == 0:
             return -1
 
@@ -0,0 +1,47 @@
+from array import array
+from machine import ADC, Pin
+
+class AdcSampler:
+    """reads bursts of an ADC input into a preallocated buffer; the burst is sorted in place,
+    readings outside the Tukey fences (quartiles -/+ reject * interquartile range) are dropped"""
+
+    def __init__(self, pin, samples=32, width=ADC.WIDTH_12BIT, atten=ADC.ATTN_11DB, reject=1.5):
+        self._adc = ADC(Pin(pin, Pin.IN))
+        self._adc.width(width)
+        self._adc.atten(atten)
+        self._buf = array('H', [0] * samples)
+        self._reject = reject
+        self.full_scale = (1 << (9 + width)) - 1
+
+    def sample(self):
+        "reads a burst and sorts it"
+        buf = self._buf
+        read = self._adc.read
+        for idx in range(len(buf)):
+            buf[idx] = read()
+        for idx in range(1, len(buf)):
+            value = buf[idx]
+            pos = idx - 1
+            while pos >= 0 and buf[pos] > value:
+                buf[pos + 1] = buf[pos]
+                pos -= 1
+            buf[pos + 1] = value
+
+    def median(self):
+        "median of a new burst"
+        self.sample()
+        return self._buf[len(self._buf) // 2]
+
+    def mean(self):
+        "mean of a new burst without the outliers"
+        self.sample()
+        buf = self._buf
+        count = len(buf)
+        spread = (buf[count * 3 // 4] - buf[count // 4]) * self._reject
+        low, high = buf[count // 4] - spread, buf[count * 3 // 4] + spread
+        total, kept = 0, 0
+        for value in buf:
+            if low <= value <= high:
+                total += value
+                kept += 1
+        return total / kept
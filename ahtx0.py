@@ -41,6 +41,7 @@ class AHT10:
     AHTX0_CMD_SOFTRESET = const(0xBA)  # Soft reset command
     AHTX0_STATUS_BUSY = const(0x80)  # Status bit for busy
     AHTX0_STATUS_CALIBRATED = const(0x08)  # Status bit for calibrated
+    AHTX0_CONVERSION_MS = const(80)  # Measurement duration
 
     def __init__(self, i2c, address=AHTX0_I2CADDR_DEFAULT):
         utime.sleep_ms(20)  # 20ms delay to wake up
@@ -81,17 +82,26 @@ class AHT10:
     def relative_humidity(self):
         """The measured relative humidity in percent."""
         self._perform_measurement()
-        self._humidity = (self._buf[1] << 12) | (self._buf[2] << 4) | (self._buf[3] >> 4)
-        self._humidity = (self._humidity * 100) / 0x100000
-        return self._humidity
+        return self._decode()[1]
 
     @property
     def temperature(self):
         """The measured temperature in degrees Celcius."""
         self._perform_measurement()
-        self._temp = ((self._buf[3] & 0xF) << 16) | (self._buf[4] << 8) | self._buf[5]
-        self._temp = ((self._temp * 200.0) / 0x100000) - 50
-        return self._temp
+        return self._decode()[0]
+
+    @property
+    def measurements(self):
+        """(temperature, relative humidity) of a single measurement."""
+        self._perform_measurement()
+        return self._decode()
+
+    def _decode(self):
+        """Temperature and humidity from the measurement in the buffer"""
+        buf = self._buf
+        self._humidity = (((buf[1] << 12) | (buf[2] << 4) | (buf[3] >> 4)) * 100) / 0x100000
+        self._temp = ((((buf[3] & 0xF) << 16) | (buf[4] << 8) | buf[5]) * 200.0) / 0x100000 - 50
+        return self._temp, self._humidity
 
     def _read_to_buffer(self):
         self._i2c.readfrom_into(self._address, self._buf)
@@ -109,8 +119,21 @@ class AHT10:
 
     def _perform_measurement(self):
         self._trigger_measurement()
+        # status polls read the whole frame, the last one holds the measurement
         self._wait_for_idle()
+
+    def start_measurement(self):
+        """Triggers a measurement without waiting for it, returns the conversion time in ms"""
+        self._trigger_measurement()
+        return self.AHTX0_CONVERSION_MS
+
+    def collect_measurement(self):
+        """Reads the measurement started by start_measurement (waits if it is still busy),
+        returns (temperature, relative humidity)"""
         self._read_to_buffer()
+        if self._buf[0] & self.AHTX0_STATUS_BUSY:
+            self._wait_for_idle()
+        return self._decode()
 
 
 class AHT20(AHT10): 
@@ -7,6 +7,7 @@ import logging
 from lenfer_controller import LenferController
 from utils import manage_memory
 from timers import time_tuple_to_seconds
+from deadband import DeadbandFilter
 
 LOG = logging.getLogger("Climate")
 
@@ -14,6 +15,8 @@ LOG = logging.getLogger("Climate")
 class ClimateController(LenferController):
 
     CO2_THRESHOLD = 2500
+    # ms, a read cycle is never shorter: sensors without conversions (or tripped ones) return 0
+    CYCLE_MIN_MS = 100
 
     def __init__(self, device, conf):
         LenferController.__init__(self, device)
@@ -23,8 +26,10 @@ class ClimateController(LenferController):
         self.sensors_titles = conf['sensors_titles']
         self._switches = conf['switches']
         self.switches = {}
-        self._sleep = conf['sleep']
+        # minimal wait of a read cycle, conversions of the sensors may make it longer
+        self._sleep = max(conf.get('sleep', 0), self.CYCLE_MIN_MS)
         self.data = {}
+        self.data_filter = DeadbandFilter()
         self.sensor_devices = []
         self.light = Pin(conf['light'], Pin.OUT) if conf.get('light') else None
         if 'switches' in conf and conf['switches']:
@@ -45,19 +50,27 @@ class ClimateController(LenferController):
 
         self.update_settings()
 
+        i2c = device.i2c_clients('climate')
         for sensor_device_conf in conf['sensor_devices']:
+            self.data_filter.add_sensor_device(sensor_device_conf)
             if sensor_device_conf['type'] == 'bme280':                
                 from sensors import SensorDeviceBME280
-                self.sensor_devices.append(SensorDeviceBME280(sensor_device_conf, self, device.i2c))
+                self.sensor_devices.append(SensorDeviceBME280(sensor_device_conf, self, i2c))
             elif sensor_device_conf['type'] == 'aht20':
                 from sensors import SensorDeviceAHT20
-                self.sensor_devices.append(SensorDeviceAHT20(sensor_device_conf, self, device.i2c))
+                self.sensor_devices.append(SensorDeviceAHT20(sensor_device_conf, self, i2c))
             elif sensor_device_conf['type'] == 'ccs811':
                 from sensors import SensorDeviceCCS811
-                self.sensor_devices.append(SensorDeviceCCS811(sensor_device_conf, self, device.i2c))
+                self.sensor_devices.append(SensorDeviceCCS811(sensor_device_conf, self, i2c))
             elif sensor_device_conf['type'] == 'ds18x20':
                 from sensors import SensorDeviceDS18x20
                 self.sensor_devices.append(SensorDeviceDS18x20(sensor_device_conf, self, device._conf['ow']))
+            elif sensor_device_conf['type'] == 'mq135':
+                from sensors import SensorDeviceMQ135
+                self.sensor_devices.append(SensorDeviceMQ135(sensor_device_conf, self))
+            elif sensor_device_conf['type'] == 'adc_current':
+                from sensors import SensorDeviceADCCurrent
+                self.sensor_devices.append(SensorDeviceADCCurrent(sensor_device_conf, self))
 
     def update_settings(self):
         if self.device.settings.get('switches'):
@@ -72,15 +85,18 @@ class ClimateController(LenferController):
     async def read(self, once=False):
 
         while True:
+            #all conversions run at once, the cycle waits for the longest one only
+            wait = self._sleep
             for sensor_device in self.sensor_devices:
-                if sensor_device.sensor_type == 'ds18x20':
-                    sensor_device.convert()
-            await uasyncio.sleep_ms(self._sleep)
+                await sensor_device.turn()
+                wait = max(wait, sensor_device.convert())
+            await uasyncio.sleep_ms(wait)
             for sensor_device in self.sensor_devices:
+                await sensor_device.turn()
                 sensor_device.read()
             if self.switches:
                 self.adjust_switches()
-            manage_memory()
+            manage_memory('climate_read')
             if once:
                 break
 
@@ -106,6 +122,24 @@ class ClimateController(LenferController):
                 break
             await uasyncio.sleep(59)
 
+    def set_switch(self, switch_type, value):
+        "sets switch pin, records the transition and returns True if the state was changed"
+        switch = self.switches[switch_type]
+        if switch['pin'].value() == value:
+            return False
+        switch['pin'].value(value)
+        self.device.switch_transition(switch['id'], value)
+        return True
+
+    def metrics(self):
+        result = LenferController.metrics(self)
+        for switch_type, switch in self.switches.items():
+            if 'pin' in switch:
+                result.append(('switch_state', {'switch': switch_type}, switch['pin'].value()))
+        if self.light:
+            result.append(('switch_state', {'switch': 'light'}, self.light.value()))
+        return result
+
     def get_schedule_param_idx(self, param):
         return self.schedule['params_list'].index(param)
         
@@ -136,65 +170,54 @@ class ClimateController(LenferController):
         if state.get('temperature') and state['temperature']['value']:
             if self.switches['heat']['enabled'] and state['temperature']['limits']:
                 if state['temperature']['value'][0] < state['temperature']['limits'][0]:
-                    if not self.switches['heat']['pin'].value():
-                        self.switches['heat']['pin'].value(1)
+                    if self.set_switch('heat', 1):
                         LOG.info('Heat on')
                 else:
-                    if self.switches['heat']['pin'].value():
-                        self.switches['heat']['pin'].value(0)
+                    if self.set_switch('heat', 0):
                         LOG.info('Heat off')
             if self.switches['vent_mix']['enabled']:
                 if len(state['temperature']['value']) > 1:
                     if state['temperature']['value'][0] > state['temperature']['value'][1] + 3 or\
                         state['temperature']['value'][0] < state['temperature']['value'][1] - 3:
-                        if not self.switches['vent_mix']['pin'].value():
-                            self.switches['vent_mix']['pin'].value(1)
+                        if self.set_switch('vent_mix', 1):
                             LOG.info('Mix on')
                     elif state['temperature']['value'][0] < state['temperature']['value'][1] + 1 and\
                         state['temperature']['value'][0] > state['temperature']['value'][1] - 1:
-                        if self.switches['vent_mix']['pin'].value():
-                            self.switches['vent_mix']['pin'].value(0)
+                        if self.set_switch('vent_mix', 0):
                             LOG.info('Mix off') 
         if self.switches['vent_mix']['enabled']:
             if not state.get('temperature') or len(state['temperature']['value']) < 2:
-                if self.switches['vent_mix']['pin'].value():
-                    self.switches['vent_mix']['pin'].value(0)
+                if self.set_switch('vent_mix', 0):
                     LOG.info('Mix off')
         if self.switches['vent_out']['enabled']:
             if (state.get('humidity') and state['humidity']['value'] and state['humidity']['limits'] and\
                     state['humidity']['value'][0] > state['humidity']['limits'][1]) or\
                 (state.get('temperature') and state['temperature']['value'] and state['temperature']['limits'] and\
                     state['temperature']['value'][0] > state['temperature']['limits'][1]) or\
-                (state.get('co2') and state['co2']['value'][0] > ClimateController.CO2_THRESHOLD):
-                if not self.switches['vent_out']['pin'].value():
-                    self.switches['vent_out']['pin'].value(1)
+                (state.get('co2') and state['co2']['value'] and state['co2']['value'][0] > ClimateController.CO2_THRESHOLD):
+                if self.set_switch('vent_out', 1):
                     LOG.info('Out on')
             else:
-                if self.switches['vent_out']['pin'].value():
-                    self.switches['vent_out']['pin'].value(0)
+                if self.set_switch('vent_out', 0):
                     LOG.info('Out off')
         if self.switches['humid']['enabled']:
             if state.get('humidity') and state['humidity']['value'] and state['humidity']['limits'] and\
                 state['humidity']['value'][0] < state['humidity']['limits'][0]:
-                if not self.switches['humid']['pin'].value():
-                    self.switches['humid']['pin'].value(1)
+                if self.set_switch('humid', 1):
                     LOG.info('Humid on')
             else:
-                if self.switches['humid']['pin'].value():
-                    self.switches['humid']['pin'].value(0)
+                if self.set_switch('humid', 0):
                     LOG.info('Humid off')
         if self.switches['air_con']['enabled']:
             if state.get('temperature') and state['temperature']['value'] and state['temperature']['limits'] and\
                     state['temperature']['value'][0] > state['temperature']['limits'][1] + 3:
-                if not self.switches['air_con']['pin'].value():
-                    self.switches['air_con']['pin'].value(1)
+                if self.set_switch('air_con', 1):
                     LOG.info('Air con on')
                     if self.switches['vent_out']['enabled'] and self.switches['vent_out']['pin'].value()\
                         and (not state.get('co2') or not state['co2']['value'] or state['co2']['value'][0] < ClimateController.CO2_THRESHOLD):
-                        self.switches['vent_out']['pin'].value(0)
+                        self.set_switch('vent_out', 0)
             else:
-                if self.switches['air_con']['pin'].value():
-                    self.switches['air_con']['pin'].value(0)
+                if self.set_switch('air_con', 0):
                     LOG.info('Air con off')       
 
-        manage_memory()
+        manage_memory('climate_switches')
@@ -0,0 +1,41 @@
+HEARTBEAT_DEFAULT = 900
+
+def parse_deadband(value):
+    "returns (deadband, percent flag); deadband may be number or '<number>%' string"
+    if isinstance(value, str):
+        if value.endswith('%'):
+            return float(value[:-1]), True
+        return float(value), False
+    return value, False
+
+class DeadbandFilter:
+    """passes sensor value when it moved more than the sensor deadband since the last
+    passed value or when heartbeat seconds passed; sensors without deadband always pass"""
+
+    def __init__(self):
+        self._rules = {}
+        self._last = {}
+
+    def add_sensor_device(self, conf):
+        "reads deadband and heartbeat of sensor device conf, both may be lists matching sensors_ids"
+        if conf.get('deadband') is None:
+            return
+        for idx, sensor_id in enumerate(conf['sensors_ids']):
+            deadband = conf['deadband'][idx] if isinstance(conf['deadband'], list) else conf['deadband']
+            heartbeat = conf.get('heartbeat', HEARTBEAT_DEFAULT)
+            if isinstance(heartbeat, list):
+                heartbeat = heartbeat[idx]
+            if deadband is not None:
+                self._rules[sensor_id] = parse_deadband(deadband) + (heartbeat,)
+
+    def check(self, sensor_id, value, tstamp):
+        rule = self._rules.get(sensor_id)
+        if not rule:
+            return True
+        deadband, percent, heartbeat = rule
+        last = self._last.get(sensor_id)
+        if last is None or tstamp - last[1] >= heartbeat or (value is None) != (last[0] is None) or\
+            (value is not None and abs(value - last[0]) > (abs(last[0]) * deadband / 100 if percent else deadband)):
+            self._last[sensor_id] = (value, tstamp)
+            return True
+        return False
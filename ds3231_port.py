@@ -8,7 +8,12 @@ import sys
 import utime
 import machine
 
+import lib.uasyncio as uasyncio
+
 DS3231_I2C_ADDR = 104
+# async transition wait: polling period and polls delayed by the event loop that are tolerated
+AWAIT_POLL_MS = 10
+AWAIT_LATE_POLLS = 3
 
 try:
     rtc = machine.RTC()
@@ -71,17 +76,20 @@ class DS3231:
 
     def save_time(self):
         (YY, MM, mday, hh, mm, ss, wday, yday) = utime.localtime()  # Based on RTC
-        self.ds3231.writeto_mem(DS3231_I2C_ADDR, 0, tobytes(dec2bcd(ss)))
-        self.ds3231.writeto_mem(DS3231_I2C_ADDR, 1, tobytes(dec2bcd(mm)))
-        self.ds3231.writeto_mem(DS3231_I2C_ADDR, 2, tobytes(dec2bcd(hh)))  # Sets to 24hr mode
-        self.ds3231.writeto_mem(DS3231_I2C_ADDR, 3, tobytes(dec2bcd(wday + 1)))  # 1 == Monday, 7 == Sunday
-        self.ds3231.writeto_mem(DS3231_I2C_ADDR, 4, tobytes(dec2bcd(mday)))  # Day of month
+        data = self.timebuf
+        data[0] = dec2bcd(ss)
+        data[1] = dec2bcd(mm)
+        data[2] = dec2bcd(hh)  # Sets to 24hr mode
+        data[3] = dec2bcd(wday + 1)  # 1 == Monday, 7 == Sunday
+        data[4] = dec2bcd(mday)  # Day of month
         if YY >= 2000:
-            self.ds3231.writeto_mem(DS3231_I2C_ADDR, 5, tobytes(dec2bcd(MM) | 0b10000000))  # Century bit
-            self.ds3231.writeto_mem(DS3231_I2C_ADDR, 6, tobytes(dec2bcd(YY-2000)))
+            data[5] = dec2bcd(MM) | 0b10000000  # Century bit
+            data[6] = dec2bcd(YY-2000)
         else:
-            self.ds3231.writeto_mem(DS3231_I2C_ADDR, 5, tobytes(dec2bcd(MM)))
-            self.ds3231.writeto_mem(DS3231_I2C_ADDR, 6, tobytes(dec2bcd(YY-1900)))
+            data[5] = dec2bcd(MM)
+            data[6] = dec2bcd(YY-1900)
+        # One transaction: the registers are written while the seconds counter is held
+        self.ds3231.writeto_mem(DS3231_I2C_ADDR, 0, data)
 
     # Wait until DS3231 seconds value changes before reading and returning data
     def await_transition(self):
@@ -91,6 +99,25 @@ class DS3231:
             self.ds3231.readfrom_mem_into(DS3231_I2C_ADDR, 0, self.timebuf)
         return self.timebuf
 
+    # await_transition yielding to the event loop between polls. A transition seen
+    # after a poll delayed by other tasks is not accurate, the next one is awaited
+    # unless AWAIT_LATE_POLLS delayed polls in a row were seen.
+    async def await_transition_async(self, poll_ms=AWAIT_POLL_MS):
+        late = 0
+        self.ds3231.readfrom_mem_into(DS3231_I2C_ADDR, 0, self.timebuf)
+        ss = self.timebuf[0]
+        polled = utime.ticks_ms()
+        while True:
+            await uasyncio.sleep_ms(poll_ms)
+            now = utime.ticks_ms()
+            self.ds3231.readfrom_mem_into(DS3231_I2C_ADDR, 0, self.timebuf)
+            if ss != self.timebuf[0]:
+                if utime.ticks_diff(now, polled) <= 2 * poll_ms or late >= AWAIT_LATE_POLLS:
+                    return self.timebuf
+                late += 1
+                ss = self.timebuf[0]
+            polled = now
+
     # Test hardware RTC against DS3231. Default runtime 10 min. Return amount
     # by which DS3231 clock leads RTC in PPM or seconds per year.
     # Precision is achieved by starting and ending the measurement on DS3231
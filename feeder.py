@@ -10,6 +10,7 @@ from relay_switch import RelaySwitchController
 from timers import Timer, time_tuple_to_seconds
 
 from utils import manage_memory
+import loop_monitor
 
 LOG = logging.getLogger("Feeder")
 
@@ -38,9 +39,9 @@ class FeederController(GateController):
             self.device.busy = self._active
             RelaySwitchController.on(self, self._active, source == 'manual')            
         if 'manual' in self._active and len(self._active) == 1 and self._power_monitor:
-            uasyncio.get_event_loop().create_task(self.check_current())
+            loop_monitor.create_task(self.check_current(), '%s.check_current' % self._log_prop_name)
         LOG.debug('Feeder state: %s' % self.state)
-        manage_memory()
+        manage_memory('feeder_on')
 
     def log_relay_switch(self, operation, source):
         RelaySwitchController.log_relay_switch(self, operation, source)
@@ -95,7 +96,7 @@ class FeederController(GateController):
                     self.off(source=timer)
                 if timer.time_on > time:
                     break
-            manage_memory()
+            manage_memory('feeder_timers')
             await uasyncio.sleep(60 - machine.RTC().now()[6])
 
     def create_timer(self, conf):
@@ -19,12 +19,20 @@ class GateController(RelaySwitchController):
         RelaySwitchController.__init__(self, device, conf)
         self._power_monitor = None
         if conf.get('power_monitor'): 
-            manage_memory()
+            manage_memory('power_monitor_init', force=True)
             from power_monitor import PowerMonitor
             try: 
-                self._power_monitor = PowerMonitor(conf['power_monitor'], device.i2c)
+                self._power_monitor = PowerMonitor(conf['power_monitor'], device.i2c_clients('power_monitor'))
             except Exception as exc:
                 LOG.exc(exc, 'Power monitor init error')
+        elif conf.get('current_sense'):
+            # hall effect sensor on an ADC input instead of INA219: {"type": "adc", "pin", "zero", "sensitivity"}
+            if conf['current_sense']['type'] == 'adc':
+                from power_monitor import AdcCurrentSense
+                try:
+                    self._power_monitor = AdcCurrentSense(conf['current_sense'])
+                except Exception as exc:
+                    LOG.exc(exc, 'Current sense init error')
 
         self._reverse = Pin(conf['reverse'], Pin.INOUT)
         self.reverse = False
@@ -88,6 +96,7 @@ class GateController(RelaySwitchController):
                 expired += now - prev_time
                 prev_time = now
                 if self._power_monitor and self._reverse_threshold:
+                    await self._power_monitor.turn()
                     current = self._power_monitor.current()
                     if current:
                         self.log_current(current)
@@ -113,6 +122,7 @@ class GateController(RelaySwitchController):
     async def check_current(self):
         if self._power_monitor:
             while self.state:
+                await self._power_monitor.turn()
                 cur = self._power_monitor.current()
                 self.log_current(cur)
                 await uasyncio.sleep(1)
@@ -147,7 +157,7 @@ class GateController(RelaySwitchController):
                         next_time_on = next_timers[0].time_on - last_timer.time_on
             if once:
                 break               
-            manage_memory()
+            manage_memory('gate_adjust')
             if next_time_on:
                 await uasyncio.sleep(next_time_on)
             else:    
@@ -0,0 +1,56 @@
+import gc
+import utime
+
+ALLOC_THRESHOLD = 16384
+FREE_WATERMARK = 24576
+
+_alloc_threshold = ALLOC_THRESHOLD
+_free_watermark = FREE_WATERMARK
+_last_alloc = 0
+_stats = {'collections': 0, 'forced': 0, 'checks': 0, 'time_us': 0, 'max_time_us': 0}
+_sites = {}
+
+def configure(alloc_threshold=None, free_watermark=None):
+    global _alloc_threshold, _free_watermark
+    if alloc_threshold:
+        _alloc_threshold = alloc_threshold
+    if free_watermark:
+        _free_watermark = free_watermark
+
+def collect(site=None, forced=False):
+    "full collection; records its duration and the call site"
+    global _last_alloc
+    start = utime.ticks_us()
+    gc.collect()
+    duration = utime.ticks_diff(utime.ticks_us(), start)
+    _last_alloc = gc.mem_alloc()
+    gc.threshold(gc.mem_free() // 4 + _last_alloc)
+    _stats['collections'] += 1
+    if forced:
+        _stats['forced'] += 1
+    _stats['time_us'] += duration
+    if duration > _stats['max_time_us']:
+        _stats['max_time_us'] = duration
+    _sites[site] = _sites.get(site, 0) + 1
+
+def check(site=None):
+    """collects only if more than alloc_threshold bytes were allocated since the last
+    collection or free heap dropped below free_watermark; returns True if collected"""
+    _stats['checks'] += 1
+    if gc.mem_alloc() - _last_alloc > _alloc_threshold or gc.mem_free() < _free_watermark:
+        collect(site)
+        return True
+    return False
+
+def reserve(size=0, site=None):
+    "forced collection hook to call before allocating size bytes at once (0 - always collect)"
+    if not size or gc.mem_free() < size + _free_watermark:
+        collect(site, forced=True)
+
+def stats():
+    "collection counters, heap state and collections count per call site"
+    result = dict(_stats)
+    result['mem_free'] = gc.mem_free()
+    result['mem_alloc'] = gc.mem_alloc()
+    result['sites'] = dict(_sites)
+    return result
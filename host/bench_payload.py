@@ -0,0 +1,82 @@
+"""Compares legacy and columnar sensors_data payloads for every conf/ profile.
+
+For each profile a backlog of readings (one reading per sensor every post
+cycle) is encoded both ways; payload size and peak heap (tracemalloc) of
+building and JSON encoding the request body are reported.
+
+    python3 -m host.bench_payload [--cycles 60]
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sensors_payload import encode_columnar
+from host.payload import decode_columnar, format_tstamp
+from datetime import datetime
+
+POST_PERIOD = 58
+
+def profile_sensors(conf):
+    "sensor ids of every sensor device in the profile"
+    modules = conf.get('modules') or []
+    if isinstance(modules, dict):
+        modules = list(modules.values())
+    return [sensor_id for module in modules for sensor_device in module.get('sensor_devices', [])
+        for sensor_id in sensor_device.get('sensors_ids', [])]
+
+def backlog(sensors_ids, cycles):
+    start = int(time.time())
+    random.seed(1)
+    return [(sensor_id, start + cycle * POST_PERIOD, round(random.uniform(15, 30), 1))
+        for cycle in range(cycles) for sensor_id in sensors_ids]
+
+def epoch_tstamp(epoch):
+    return format_tstamp(datetime.fromtimestamp(epoch))
+
+def legacy_payload(entries):
+    return json.dumps({'data': [{'sensor_id': entry[0], 'tstamp': epoch_tstamp(entry[1]), 'value': entry[2]}
+        for entry in entries]})
+
+def columnar_payload(entries):
+    data = encode_columnar(entries, epoch_tstamp)
+    for column in ('ids', 'offsets', 'values'):
+        data[column] = list(data[column])
+    return json.dumps(data)
+
+def measure(encoder, entries):
+    tracemalloc.start()
+    payload = encoder(entries)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return payload, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cycles', type=int, default=60, help='post cycles in the backlog')
+    args = parser.parse_args()
+    print('%-28s %8s %10s %10s %10s %10s' %
+        ('profile', 'entries', 'legacy B', 'column B', 'legacy heap', 'column heap'))
+    for path in sorted(glob.glob(os.path.join(ROOT, 'conf', '**', 'conf.json'), recursive=True)):
+        with open(path, encoding='utf-8') as conf_file:
+            sensors_ids = profile_sensors(json.load(conf_file))
+        name = os.path.relpath(os.path.dirname(path), os.path.join(ROOT, 'conf'))
+        if not sensors_ids:
+            print('%-28s no sensors' % name)
+            continue
+        entries = backlog(sensors_ids, args.cycles)
+        legacy, legacy_heap = measure(legacy_payload, entries)
+        columnar, columnar_heap = measure(columnar_payload, entries)
+        assert decode_columnar(json.loads(columnar)) == json.loads(legacy)['data']
+        print('%-28s %8d %10d %10d %10d %10d' % (name, len(entries), len(legacy), len(columnar),
+            legacy_heap, columnar_heap))
+
+if __name__ == '__main__':
+    main()
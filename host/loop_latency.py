@@ -0,0 +1,49 @@
+"""Event loop latency while HttpClient requests are in flight.
+
+Runs on MicroPython next to the device modules (copy it to the board or
+run it with the unix port from the repo root) against a slow stand-in server:
+
+    python3 -m host.stand_in_server --port 8080 --delay 3
+    >>> import loop_latency; loop_latency.run('http://<host>:8080/api/')
+
+A ticker task sleeps TICK_MS in a loop and records how late it wakes up.
+With a non-blocking client the worst lag stays within a few ticks while
+each request takes the whole server delay. tests/test_loop_latency.py makes the same
+check on the simulated board.
+"""
+import utime
+import lib.uasyncio as uasyncio
+
+from http_client import HttpClient
+
+TICK_MS = 10
+MAX_LAG_MS = 100
+
+async def ticker(stats):
+    while stats['running']:
+        start = utime.ticks_ms()
+        await uasyncio.sleep_ms(TICK_MS)
+        lag = utime.ticks_diff(utime.ticks_ms(), start) - TICK_MS
+        stats['ticks'] += 1
+        if lag > stats['max_lag']:
+            stats['max_lag'] = lag
+
+async def requests(url, count, stats):
+    http = HttpClient()
+    for _ in range(count):
+        start = utime.ticks_ms()
+        result = await http.post(url + 'sensors_data', {'data': []})
+        stats['requests'].append((utime.ticks_diff(utime.ticks_ms(), start), result))
+    stats['running'] = False
+    stats['http'] = http.stats
+
+def run(url, count=3):
+    stats = {'running': True, 'ticks': 0, 'max_lag': 0, 'requests': []}
+    loop = uasyncio.get_event_loop()
+    loop.create_task(ticker(stats))
+    loop.run_until_complete(requests(url, count, stats))
+    for duration, result in stats['requests']:
+        print('request: %d ms result: %s' % (duration, result))
+    print('ticks: %d max loop lag: %d ms connections: %s' % (stats['ticks'], stats['max_lag'], stats['http']))
+    print('PASS' if stats['max_lag'] <= MAX_LAG_MS else 'FAIL')
+    return stats['max_lag'] <= MAX_LAG_MS
@@ -0,0 +1,31 @@
+"""host side (CPython) helpers for sensors_data payloads"""
+from datetime import datetime, timedelta
+
+SCALE = 1000
+NULL_VALUE = -0x80000000
+TSTAMP_FORMAT = "{0:0>1d}/{1:0>1d}/{2:0>1d} {3:0>1d}:{4:0>1d}:{5:0>1d}"
+
+def parse_tstamp(tstamp):
+    date, time = tstamp.split(' ')
+    return datetime(*[int(item) for item in date.split('/') + time.split(':')])
+
+def format_tstamp(value):
+    return TSTAMP_FORMAT.format(value.year, value.month, value.day,
+        value.hour, value.minute, value.second)
+
+def decode_columnar(payload):
+    """converts columnar sensors_data payload to the legacy entries list
+    [{'sensor_id', 'tstamp', 'value'}, ...]"""
+    base = parse_tstamp(payload['tstamp'])
+    scale = payload.get('scale', SCALE)
+    return [{
+        'sensor_id': sensor_id,
+        'tstamp': format_tstamp(base + timedelta(seconds=offset)),
+        'value': None if value == NULL_VALUE else value / scale
+        } for sensor_id, offset, value in zip(payload['ids'], payload['offsets'], payload['values'])]
+
+def sensors_data_entries(payload):
+    "sensors_data entries list for either payload format"
+    if payload.get('format') == 'columnar':
+        return decode_columnar(payload)
+    return payload['data']
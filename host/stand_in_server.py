@@ -0,0 +1,87 @@
+"""Local stand-in for the lenfer API server (CPython).
+
+Accepts device posts under /api/ (including combined device_sync), decodes
+sensors_data in either payload format and answers the way the device
+expects. --delay holds every response to emulate a slow (GSM) link.
+
+    python3 -m host.stand_in_server --port 8080 [--delay 3]
+"""
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from host.payload import sensors_data_entries
+
+class StandInHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length).decode('utf-8')) if length else None
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_api(self, method, data):
+        if method == 'sensors_data':
+            entries = sensors_data_entries(data)
+            self.server.sensors_data += entries
+            self.log_message('sensors_data: %d entries', len(entries))
+            return 'OK'
+        if method == 'device_updates':
+            return {}
+        if method == 'device_sync':
+            for part, part_method in (('sensors_data', 'sensors_data'), ('switches_state', 'switches_state'),
+                    ('log', 'devices_log/post')):
+                if part in data:
+                    self.handle_api(part_method, data[part])
+            return {'updates': self.handle_api('device_updates', data.get('updates'))}
+        self.log_message('%s: %s', method, data)
+        return 'OK'
+
+    def do_POST(self):
+        self.server.requests.append((self.server.clock(), self.path, int(self.headers.get('Content-Length') or 0)))
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        if not self.path.startswith('/api/'):
+            self.send_json(None, status=404)
+            return
+        try:
+            data = self.read_json()
+        except ValueError:
+            self.send_json(None, status=400)
+            return
+        self.send_json(self.handle_api(self.path[len('/api/'):], data))
+
+class StandInServer(ThreadingHTTPServer):
+    """requests - (clock(), path, body length) of every post received,
+    clock defaults to host time"""
+
+    daemon_threads = True
+
+    def __init__(self, address, handler=StandInHandler, delay=0, clock=time.time):
+        ThreadingHTTPServer.__init__(self, address, handler)
+        self.sensors_data = []
+        self.requests = []
+        self.delay = delay
+        self.clock = clock
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--delay', type=float, default=0, help='response delay, seconds')
+    args = parser.parse_args()
+    server = StandInServer((args.host, args.port), delay=args.delay)
+    print('Serving on http://%s:%d/api/' % (args.host, args.port))
+    server.serve_forever()
+
+if __name__ == '__main__':
+    main()
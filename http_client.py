@@ -1,22 +1,193 @@
 import ujson
 import logging
 import urequests
+import uerrno
+import uio
 import utime
 import lib.uasyncio as uasyncio
 import machine
 
 from utils import manage_memory
+from json_stream import adump as json_adump, encoded_length as json_length
 
 LOG = logging.getLogger("Main")
 
+BODY_BUF_SIZE = 256
+
 def response_success(rsp):
     return rsp and rsp.status_code == 200
 
+def split_url(url):
+    "returns (proto, host, port, path)"
+    proto, _, host, path = (url + '/' if url.count('/') < 3 else url).split('/', 3)
+    port = 443 if proto == 'https:' else 80
+    if ':' in host:
+        host, port = host.split(':', 1)
+        port = int(port)
+    return proto, host, port, '/' + path
+
+class Response:
+    "urequests compatible response: status_code and body stream in raw"
+
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.raw = uio.BytesIO(body)
+
+    def close(self):
+        self.raw = None
+
+async def read_response(reader):
+    """reads status, headers and body of HTTP/1.1 response
+    returns (Response, keep_alive)"""
+    line = await reader.readline()
+    if not line:
+        raise OSError(uerrno.ECONNRESET)
+    status_line = line.split(None, 2)
+    status_code = int(status_line[1])
+    keep_alive = status_line[0] == b'HTTP/1.1'
+    length, chunked = None, False
+    while True:
+        line = await reader.readline()
+        if not line or line == b'\r\n':
+            break
+        name, value = line.split(b':', 1)
+        name = name.strip().lower()
+        value = value.strip().lower()
+        if name == b'content-length':
+            length = int(value)
+        elif name == b'transfer-encoding':
+            chunked = value == b'chunked'
+        elif name == b'connection':
+            keep_alive = value == b'keep-alive'
+    if chunked:
+        body = b''
+        while True:
+            size = int((await reader.readline()).split(b';', 1)[0], 16)
+            if size:
+                body += await reader.readexactly(size)
+            await reader.readline()
+            if not size:
+                break
+    elif length is not None:
+        body = await reader.readexactly(length) if length else b''
+    else:
+        body = b''
+        while True:
+            chunk = await reader.read(BODY_BUF_SIZE)
+            if not chunk:
+                break
+            body += chunk
+        keep_alive = False
+    return Response(status_code, body), keep_alive
+
+async def close_connection(connection):
+    reader, writer = connection
+    try:
+        await reader.aclose()
+    except Exception:
+        pass
+
+class ConnectionPool:
+    """keeps one HTTP/1.1 keep-alive connection per host on uasyncio streams
+    connections idle longer than idle_timeout seconds are reopened, it has to be longer
+    than the period of the requests for the connection to be reused
+    connect_timeout and read_timeout are in ms
+    stats time_ms and max_time_ms are completed requests durations"""
+
+    def __init__(self, idle_timeout=120, connect_timeout=10000, read_timeout=30000):
+        self._idle_timeout = idle_timeout
+        self._connect_timeout = connect_timeout
+        self._read_timeout = read_timeout
+        self._connections = {}
+        self.stats = {'connects': 0, 'reuses': 0, 'errors': 0, 'timeouts': 0,
+            'requests': 0, 'time_ms': 0, 'max_time_ms': 0}
+
+    async def _connect(self, proto, host, port):
+        try:
+            connection = await uasyncio.wait_for_ms(
+                uasyncio.open_connection(host, port, ssl=proto == 'https:'), self._connect_timeout)
+        except uasyncio.TimeoutError:
+            self.stats['timeouts'] += 1
+            raise OSError(uerrno.ETIMEDOUT)
+        self.stats['connects'] += 1
+        return connection
+
+    async def acquire(self, proto, host, port):
+        "returns ((reader, writer), reused)"
+        pooled = self._connections.pop((proto, host, port), None)
+        if pooled:
+            connection, last_used = pooled
+            if utime.time() - last_used < self._idle_timeout:
+                self.stats['reuses'] += 1
+                return connection, True
+            await close_connection(connection)
+        return await self._connect(proto, host, port), False
+
+    def release(self, proto, host, port, connection):
+        self._connections[(proto, host, port)] = (connection, utime.time())
+
+    async def close(self):
+        for connection, _ in self._connections.values():
+            await close_connection(connection)
+        self._connections = {}
+
+    async def _send(self, connection, method, host, path, data):
+        reader, writer = connection
+        if data is None:
+            await writer.awrite(('%s %s HTTP/1.1\r\nHost: %s\r\nConnection: keep-alive\r\n\r\n' %
+                (method, path, host)).encode())
+        else:
+            await writer.awrite(('%s %s HTTP/1.1\r\nHost: %s\r\nConnection: keep-alive\r\n'
+                'Content-Type: application/json\r\nContent-Length: %d\r\n\r\n' %
+                (method, path, host, json_length(data))).encode())
+            await json_adump(data, writer.awrite, BODY_BUF_SIZE)
+
+    async def request(self, method, url, data=None):
+        """sends request with data as JSON body, the body is encoded while being sent through
+        BODY_BUF_SIZE buffer and Content-Length is calculated by a dry encoding run
+        request that failed on a reused connection before it was fully sent is repeated once
+        on a new one, after that the server may have got it and it is not repeated"""
+        proto, host, port, path = split_url(url)
+        start = utime.ticks_ms()
+        while True:
+            connection, reused = await self.acquire(proto, host, port)
+            sent = False
+            try:
+                sent_at = utime.ticks_ms()
+                await uasyncio.wait_for_ms(self._send(connection, method, host, path, data), self._read_timeout)
+                sent = True
+                rsp, keep_alive = await uasyncio.wait_for_ms(read_response(connection[0]),
+                    max(self._read_timeout - utime.ticks_diff(utime.ticks_ms(), sent_at), 1))
+            except Exception as exc:
+                await close_connection(connection)
+                self.stats['errors'] += 1
+                if isinstance(exc, uasyncio.TimeoutError):
+                    self.stats['timeouts'] += 1
+                    raise OSError(uerrno.ETIMEDOUT)
+                if reused and not sent:
+                    continue
+                raise
+            if keep_alive:
+                self.release(proto, host, port, connection)
+            else:
+                await close_connection(connection)
+            duration = utime.ticks_diff(utime.ticks_ms(), start)
+            self.stats['requests'] += 1
+            self.stats['time_ms'] += duration
+            if duration > self.stats['max_time_ms']:
+                self.stats['max_time_ms'] = duration
+            return rsp
+
 class HttpClient:
 
-    def __init__(self):
+    def __init__(self, idle_timeout=120):
         self._srv_last_contact = utime.time()
         self._srv_req_pending = False
+        self._pool = ConnectionPool(idle_timeout=idle_timeout)
+
+    @property
+    def stats(self):
+        return self._pool.stats
 
     def log_exception(self, exc, url, data=None, status_code=None):
         msg = 'Error loading server data: %s' % url
@@ -26,7 +197,8 @@ class HttpClient:
             LOG.error(msg)
             LOG.error('response status: %s' % status_code)
         if data:
-            LOG.error('Postdata: %s' % data)
+            # the payload itself may be a large backlog, formatting it would take as much heap again
+            LOG.error('Postdata keys: %s' % ', '.join(data))
         if (exc and isinstance(exc, OSError) or (status_code and status_code > 599)):
             LOG.error('server is unreachable')
             if utime.time() - self._srv_last_contact > 300:
@@ -69,15 +241,17 @@ class HttpClient:
                 rsp.close()
         return None
 
-    async def post(self, url, data):
+    async def request(self, method, url, data=None):
+        "returns parsed JSON response or None on failure"
         while self._srv_req_pending:
             await uasyncio.sleep_ms(50)
+        self._srv_req_pending = True
         machine.resetWDT()
         rsp = None
         result = None
         try:
-            LOG.info("url: %s\ndata: %s" % (url, data))
-            rsp = urequests.post(url, json=data)
+            LOG.info("url: %s" % url)
+            rsp = await self._pool.request(method, url, data)
             machine.resetWDT()
             if rsp.status_code != 200:
                 self.log_exception(None, url, data, rsp.status_code)
@@ -88,7 +262,7 @@ class HttpClient:
             self.log_exception(exc, url, data)
         finally:
             self._srv_req_pending = False
-            manage_memory()
+            manage_memory('http_request')
         if rsp:
             try:
                 result = ujson.load(rsp.raw)
@@ -99,4 +273,10 @@ class HttpClient:
                 rsp.close()
                 rsp = None
         LOG.info("return: %s" % result)
-        return result            
+        return result
+
+    async def post(self, url, data):
+        return await self.request('POST', url, data)
+
+    async def get(self, url):
+        return await self.request('GET', url)
@@ -0,0 +1,169 @@
+"""
+I2C bus helpers
+"""
+from machine import Pin
+import utime
+
+import lib.uasyncio as uasyncio
+import lib.uasyncio.core as uasyncio_core
+
+# SCL half period of the recovery clock, 100 kHz
+HALF_PERIOD_US = 5
+
+def recover(i2c, scl, sda):
+    """frees the bus from a slave holding SDA low in the middle of a byte: clocks SCL until the slave
+    lets SDA go (9 pulses at most) and sends STOP; the I2C object is re-inited in place, so the drivers
+    keep their reference
+    returns None if SDA was not held, True if it is released, False if it is still held"""
+    i2c.deinit()
+    scl_pin = Pin(scl, Pin.OUT_OD, value=1)
+    sda_pin = Pin(sda, Pin.INOUT_OD, Pin.PULL_UP, value=1)
+    if sda_pin.value():
+        i2c.init(scl=Pin(scl), sda=Pin(sda))
+        return None
+    for _ in range(9):
+        if sda_pin.value():
+            break
+        scl_pin.value(0)
+        utime.sleep_us(HALF_PERIOD_US)
+        scl_pin.value(1)
+        utime.sleep_us(HALF_PERIOD_US)
+    # STOP: SDA rises while SCL is high
+    scl_pin.value(0)
+    utime.sleep_us(HALF_PERIOD_US)
+    sda_pin.value(0)
+    utime.sleep_us(HALF_PERIOD_US)
+    scl_pin.value(1)
+    utime.sleep_us(HALF_PERIOD_US)
+    sda_pin.value(1)
+    utime.sleep_us(HALF_PERIOD_US)
+    released = sda_pin.value()
+    i2c.init(scl=Pin(scl), sda=Pin(sda))
+    return bool(released)
+
+class _Park:
+    "awaited, the task is not rescheduled until it is call_soon()ed (uasyncio.synchro waits the same way)"
+
+    def __iter__(self):
+        yield False
+
+    __await__ = __iter__
+
+class I2CArbiter:
+    """one I2C bus shared by the device modules, each module talks to it through its own I2CClient
+    bursts are the transfers a driver makes in one call: the event loop cannot switch tasks
+    in the middle of one, so they are atomic. Before a burst a module awaits its turn: the waiters
+    are parked and woken one at a time, by priority (PRIORITIES, lower goes first) and in the order
+    they came within one priority; the loop runs the ready tasks between two turns, so a current
+    reading waits for one climate sensor burst at most, not for the whole climate cycle"""
+
+    PRIORITIES = {'power_monitor': 0, 'rtc': 1}
+    PRIORITY_DEFAULT = 2
+
+    def __init__(self, i2c):
+        self.i2c = i2c
+        self.clients = {}
+        self._waiting = []
+        self._seq = 0
+        self._dispatching = False
+
+    def client(self, module):
+        "I2C interface of the module, its transfers are accounted to it"
+        client = self.clients.get(module)
+        if not client:
+            client = self.clients[module] = I2CClient(self, module,
+                self.PRIORITIES.get(module, self.PRIORITY_DEFAULT))
+        return client
+
+    async def turn(self, client):
+        "returns when the client burst may go"
+        started = utime.ticks_us()
+        self._seq += 1
+        self._waiting.append((client.priority, self._seq, uasyncio_core.cur_task))
+        if not self._dispatching:
+            self._dispatching = True
+            uasyncio.get_event_loop().call_soon(self._dispatch)
+        try:
+            await _Park()
+        finally:
+            client.wait_us += utime.ticks_diff(utime.ticks_us(), started)
+
+    def _dispatch(self):
+        "wakes the first waiter, the next one is woken after its burst"
+        ticket = min(self._waiting)
+        self._waiting.remove(ticket)
+        loop = uasyncio.get_event_loop()
+        loop.call_soon(ticket[2])
+        if self._waiting:
+            loop.call_soon(self._dispatch)
+        else:
+            self._dispatching = False
+
+class I2CClient:
+    "machine.I2C transfers of one module with the bus occupancy counters"
+
+    def __init__(self, arbiter, module, priority):
+        self._arbiter = arbiter
+        self._i2c = arbiter.i2c
+        self.module = module
+        self.priority = priority
+        self.transfers = 0
+        self.busy_us = 0
+        self.wait_us = 0
+
+    def turn(self):
+        "awaitable, the burst is to be made right after it"
+        return self._arbiter.turn(self)
+
+    def _done(self, started):
+        self.transfers += 1
+        self.busy_us += utime.ticks_diff(utime.ticks_us(), started)
+
+    def scan(self):
+        started = utime.ticks_us()
+        try:
+            return self._i2c.scan()
+        finally:
+            self._done(started)
+
+    def readfrom(self, *args):
+        started = utime.ticks_us()
+        try:
+            return self._i2c.readfrom(*args)
+        finally:
+            self._done(started)
+
+    def readfrom_into(self, *args):
+        started = utime.ticks_us()
+        try:
+            return self._i2c.readfrom_into(*args)
+        finally:
+            self._done(started)
+
+    def writeto(self, *args):
+        started = utime.ticks_us()
+        try:
+            return self._i2c.writeto(*args)
+        finally:
+            self._done(started)
+
+    def readfrom_mem(self, *args, **kwargs):
+        started = utime.ticks_us()
+        try:
+            return self._i2c.readfrom_mem(*args, **kwargs)
+        finally:
+            self._done(started)
+
+    def readfrom_mem_into(self, *args, **kwargs):
+        started = utime.ticks_us()
+        try:
+            return self._i2c.readfrom_mem_into(*args, **kwargs)
+        finally:
+            self._done(started)
+
+    def writeto_mem(self, *args, **kwargs):
+        started = utime.ticks_us()
+        try:
+            return self._i2c.writeto_mem(*args, **kwargs)
+        finally:
+            self._done(started)
@@ -0,0 +1,64 @@
+from array import array
+import ujson
+
+def iterencode(obj):
+    "yields JSON encoding of obj in small str chunks"
+    if obj is None:
+        yield 'null'
+    elif obj is True:
+        yield 'true'
+    elif obj is False:
+        yield 'false'
+    elif isinstance(obj, (int, float, str)):
+        yield ujson.dumps(obj)
+    elif isinstance(obj, dict):
+        yield '{'
+        first = True
+        for key, value in obj.items():
+            if first:
+                first = False
+            else:
+                yield ', '
+            yield ujson.dumps(key if isinstance(key, str) else str(key))
+            yield ': '
+            yield from iterencode(value)
+        yield '}'
+    elif isinstance(obj, (list, tuple, array)):
+        yield '['
+        first = True
+        for value in obj:
+            if first:
+                first = False
+            else:
+                yield ', '
+            yield from iterencode(value)
+        yield ']'
+    else:
+        raise TypeError('%s is not JSON serializable' % type(obj))
+
+def encoded_length(obj):
+    "length in bytes of obj JSON encoding"
+    length = 0
+    for chunk in iterencode(obj):
+        length += len(chunk.encode())
+    return length
+
+async def adump(obj, awrite, buf_size=256):
+    "writes obj JSON encoding by awrite coroutine using buf_size buffer"
+    buf = bytearray(buf_size)
+    view = memoryview(buf)
+    length = 0
+    for chunk in iterencode(obj):
+        data = chunk.encode()
+        size = len(data)
+        if length + size > buf_size:
+            if length:
+                await awrite(view[:length])
+                length = 0
+            if size > buf_size:
+                await awrite(data)
+                continue
+        buf[length:length + size] = data
+        length += size
+    if length:
+        await awrite(view[:length])
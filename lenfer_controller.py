@@ -9,3 +9,17 @@ class LenferController:
 
     def update_settings(self):
         pass
+
+    def metrics(self):
+        """module gauges for /metrics as list of (name, labels dict or None, value)
+        sensors values and sensor devices error counters and circuit breakers are reported by default"""
+        result = [('sensor_value', {'sensor_id': sensor_id}, value)
+            for sensor_id, value in getattr(self, 'data', {}).items()]
+        for idx, sensor_device in enumerate(getattr(self, 'sensor_devices', ())):
+            result.append(('sensor_device_errors_total', {'device': idx, 'type': sensor_device.sensor_type},
+                sensor_device.errors))
+            result.append(('sensor_device_trips_total', {'device': idx, 'type': sensor_device.sensor_type},
+                sensor_device.trips))
+            result.append(('sensor_device_tripped', {'device': idx, 'type': sensor_device.sensor_type},
+                sensor_device.tripped))
+        return result
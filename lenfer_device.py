@@ -1,4 +1,3 @@
-import gc
 from network import AP_IF
 import machine
 from machine import WDT, Pin, I2C, RTC
@@ -8,15 +7,24 @@ import lib.uasyncio as uasyncio
 import logging
 
 from utils import load_json, save_json, manage_memory
+import gc_policy
+import loop_monitor
 from software_update import check_software_update, schedule_software_update
 from schedule import Schedule
 from http_client import HttpClient
+from sensor_data_log import SensorDataLog
+from sensors_payload import encode_columnar
+from i2c_bus import I2CArbiter
 
 LOG = logging.getLogger("Device")
 
 SERVER_URI = "http://newmy.lenfer.ru/api/"
 SERVER_URI_DEV = "http://dev-api.lenfer.ru/api/"
 
+SWITCH_TRANSITIONS_LIMIT = 200
+# s between recoveries of an I2C bus
+I2C_RECOVERY_PERIOD = 60
+
 class LenferDevice:
 
     MODULES_TYPES = ["rtc", "climate", "relays", "power_monitor", "feeder"]
@@ -52,8 +60,22 @@ class LenferDevice:
         self.log_queue = []
         self.busy = False
         self._conf = load_json('conf.json')
+        if self._conf.get('gc'):
+            gc_policy.configure(**self._conf['gc'])
+        if self._conf.get('loop_monitor'):
+            loop_monitor.configure(**self._conf['loop_monitor'])
+        elif self._conf.get('loop_monitor') is False:
+            loop_monitor.configure(enabled=False)
+        self.data_log = SensorDataLog('sensor_data.bin', self._conf.get('data_log_size', 2048))
+        self._data_batch = self._conf.get('data_batch', 50)
+        self._software_check = 0
+        self.switch_transitions = []
+        # transitions recorded since the boot, the list keeps the last of them
+        self._transitions_seq = 0
+        self._switches_snapshot = 0
         self.settings = load_json('settings.json')
-        self._http = HttpClient()
+        # the pooled connection outlives the sync window period
+        self._http = HttpClient(idle_timeout=2 * self._conf.get('sync_period', 60))
         if not self.settings:
             self.load_def_settings()
         if self.settings.get('mode'):
@@ -70,6 +92,9 @@ class LenferDevice:
         self.modules = {}
         self.i2c = [I2C(scl=Pin(i2c_conf['scl']), sda=Pin(i2c_conf['sda']))
             for i2c_conf in self._conf['i2c']]
+        self.i2c_arbiters = [I2CArbiter(i2c) for i2c in self.i2c]
+        self.i2c_recoveries = [0] * len(self.i2c)
+        self._i2c_recovered_at = [None] * len(self.i2c)
         LOG.info('I2C init')
 
         self.leds = {led: Pin(pin_no, Pin.OUT) for led, pin_no in self._conf['leds'].items()}
@@ -82,7 +107,7 @@ class LenferDevice:
             led.value(0)
 
         self.schedule = Schedule()
-        manage_memory()
+        manage_memory('device_init', force=True)
         machine.resetWDT()
 
         for module_conf in self._conf['modules']:
@@ -117,7 +142,7 @@ class LenferDevice:
                     self.modules[module_type] = []
                 self.modules[module_type].append(module)
                 machine.resetWDT()
-                manage_memory()
+                manage_memory('module_init', force=True)
 
         LOG.info(self.modules)
 
@@ -135,6 +160,32 @@ class LenferDevice:
         for entry in entries:
             LOG.info(entry)
 
+    def i2c_clients(self, module):
+        "I2C buses for the module drivers, the bus time is accounted to the module"
+        return [arbiter.client(module) for arbiter in self.i2c_arbiters]
+
+    def recover_i2c(self, idx):
+        """re-inits an I2C bus, clocks it free if a slave holds SDA low (once in I2C_RECOVERY_PERIOD),
+        returns True if the bus was stuck and got released"""
+        now = utime.ticks_ms()
+        if self._i2c_recovered_at[idx] is not None and\
+            utime.ticks_diff(now, self._i2c_recovered_at[idx]) < I2C_RECOVERY_PERIOD * 1000:
+            return False
+        self._i2c_recovered_at[idx] = now
+        from i2c_bus import recover
+        i2c_conf = self._conf['i2c'][idx]
+        try:
+            released = recover(self.i2c[idx], i2c_conf['scl'], i2c_conf['sda'])
+        except Exception as exc:
+            LOG.exc(exc, 'I2C bus %d recovery error' % idx)
+            return False
+        if released is None:
+            return False
+        self.i2c_recoveries[idx] += 1
+        if not released:
+            LOG.error('I2C bus %d: SDA is held low' % idx)
+        return released
+
     def wlan_switch_irq(self, pin):
         LOG.info("WLAN switch irq %s" % pin.value())
         if not pin.value():
@@ -199,121 +250,222 @@ class LenferDevice:
             elif self._network.gsm:
                 await self.blink(("status",), 4 if self._network.online() else 3, 100)
             await uasyncio.sleep(2)
-            gc.collect()
+            manage_memory('bg_leds')
 
 
-    async def task_check_software_updates(self, once=False):
-        while True:
-            machine.resetWDT()
-            if check_software_update():
-                schedule_software_update()
-            machine.resetWDT()
-            if once:
-                break
-            await uasyncio.sleep(3600)
+    async def check_software_updates(self):
+        machine.resetWDT()
+        if await check_software_update():
+            schedule_software_update()
+        machine.resetWDT()
+        self._software_check = utime.time()
+
+    def updates_request(self):
+        return {
+            'schedule': {
+                'hash': self.schedule.hash,
+                'start': self.schedule.start
+            },
+            'props': self.settings
+        }
+
+    def apply_updates(self, updates):
+        deepsleep = bool(self.deepsleep())
+        timezone = self.settings.get('timezone')
+        if updates:
+            if updates.get('schedule'):
+                self.schedule.update(updates['schedule'])
+            if updates.get('props'):
+                self.settings = updates['props']
+                self.save_settings()
+                for ctrl_type in self.modules.values():
+                    for ctrl in ctrl_type:
+                        ctrl.update_settings()
+            if deepsleep != bool(self.deepsleep()):
+                machine.reset()           
+            if timezone != self.settings.get('timezone'):
+                self.ntp_sync()
+            if 'mode' in self.settings and self.mode != self.settings['mode']:
+                machine.reset()
 
     async def check_updates(self, once=False):
+        try:
+            updates = await self.srv_post('device_updates', self.updates_request(), retry=once)
+            self.apply_updates(updates)
+        except Exception as exc:
+            LOG.exc(exc, 'Server updates check error')
+        manage_memory('check_updates')
+
+    def collect_sensor_data(self):
+        """appends current data of controllers without own data log to the device data log
+        values rejected by controller's data_filter (deadband) are skipped"""
+        tstamp = utime.time()
+        for ctrl_type in self.modules.values():
+            for ctrl in ctrl_type:
+                if hasattr(ctrl, 'data') and not hasattr(ctrl, 'data_log'):
+                    data_filter = getattr(ctrl, 'data_filter', None)
+                    self.data_log.append([(_id, tstamp, value) for _id, value in ctrl.data.items()
+                        if not data_filter or data_filter.check(_id, value, tstamp)])
+
+    def sensor_data_payload(self, entries):
+        if self.id.get('compact_sensors_data'):
+            return encode_columnar(entries, self.epoch_tstamp)
+        return {'data': [{'sensor_id': entry[0], 'tstamp': self.epoch_tstamp(entry[1]),
+            'value': entry[2]} for entry in entries]}
+
+    def switch_transition(self, switch_id, state):
+        "records switch state change to be sent with the next switches_state post"
+        self.switch_transitions.append((switch_id, utime.time(), bool(state)))
+        self._transitions_seq += 1
+        if len(self.switch_transitions) > SWITCH_TRANSITIONS_LIMIT:
+            self.switch_transitions = self.switch_transitions[-SWITCH_TRANSITIONS_LIMIT:]
+
+    def switches_state_payload(self):
+        """returns (payload, transitions sequence number, snapshot flag)
+        payload holds recorded transitions and full switches state once in switches_snapshot_period"""
+        data = {'data': [{'device_type_switch_id': switch_id, 'tstamp': self.epoch_tstamp(tstamp), 'state': state}\
+            for switch_id, tstamp, state in self.switch_transitions]}
+        snapshot = utime.time() - self._switches_snapshot >= self._conf.get('switches_snapshot_period', 3600)
+        if snapshot:
+            tstamp = self.post_tstamp()
+            for ctrl_type in self.modules.values():
+                for ctrl in ctrl_type:
+                    if hasattr(ctrl, 'switches'):
+                        data['data'] += [{'device_type_switch_id': switch['id'], 'tstamp': tstamp, 'state': switch['pin'].value() == 1}\
+                            for switch in ctrl.switches.values() if switch['enabled']]
+                    elif getattr(ctrl, 'switch_id', None):
+                        data['data'].append({'device_type_switch_id': ctrl.switch_id, 'tstamp': tstamp, 'state': bool(ctrl.state)})
+        return data, self._transitions_seq, snapshot
+
+    def switches_state_posted(self, transitions_seq, snapshot):
+        "drops the posted transitions, the list may have been trimmed or appended to during the post"
+        unsent = self._transitions_seq - transitions_seq
+        self.switch_transitions = self.switch_transitions[-unsent:] if unsent else []
+        if snapshot:
+            self._switches_snapshot = utime.time()
+
+    async def drain_sensor_data(self, once=False):
         while True:
-            deepsleep = bool(self.deepsleep())
-            timezone = self.settings.get('timezone')
-            try:
-                data = {
-                    'schedule': {
-                        'hash': self.schedule.hash,
-                        'start': self.schedule.start
-                    },
-                    'props': self.settings
-                }
-                updates = await self.srv_post('device_updates', data, retry=once)
-                if updates:
-                    if updates.get('schedule'):
-                        self.schedule.update(updates['schedule'])
-                    if updates.get('props'):
-                        self.settings = updates['props']
-                        self.save_settings()
-                        for ctrl_type in self.modules.values():
-                            for ctrl in ctrl_type:
-                                ctrl.update_settings()
-                    if deepsleep != bool(self.deepsleep()):
-                        machine.reset()           
-                    if timezone != self.settings.get('timezone'):
-                        self.ntp_sync()
-                    if 'mode' in self.settings and self.mode != self.settings['mode']:
-                        machine.reset()
-            except Exception as exc:
-                LOG.exc(exc, 'Server updates check error')
-            manage_memory()
-            if once:
+            entries = self.data_log.read(self._data_batch)
+            if not entries:
                 break
-            await uasyncio.sleep(30)
+            rsp = await self.srv_post('sensors_data', self.sensor_data_payload(entries), retry=once)
+            if once and not rsp:
+                machine.reset()
+            if not rsp:
+                break
+            self.data_log.ack(len(entries))
+            manage_memory('sensor_data_batch')
 
     async def post_sensor_data(self, once=False):
-        while True:
-            if not once:
-                await uasyncio.sleep(58)
-            try:
-                data = {'data': []}
-                tstamp = self.post_tstamp()
-                for ctrl_type in self.modules.values():
-                    for ctrl in ctrl_type:
-                        if hasattr(ctrl, 'data_log'):
-                            data['data'] += [{'sensor_id': entry[0], 'tstamp': entry[1], 'value': entry[2]}\
-                                for entry in ctrl.data_log]
-                        elif hasattr(ctrl, 'data'):
-                            data['data'] += [{'sensor_id': _id, 'tstamp': tstamp, 'value': value}\
-                                for _id, value in ctrl.data.items()]
-                if data['data']:
-                    rsp = await self.srv_post('sensors_data', data, retry=once)
-                    if once and not rsp:
-                        machine.reset()
-                    if rsp:
-                        for ctrl_type in self.modules.values():                  
-                            for ctrl in ctrl_type:
-                                if hasattr(ctrl, 'data_log'):
-                                    ctrl.data_log = []
-                data = {'data': []}
-                tstamp = self.post_tstamp()
-                for ctrl_type in self.modules.values():
-                    for ctrl in ctrl_type:
-                        if hasattr(ctrl, 'switches'):
-                            data['data'] += [{'device_type_switch_id': switch['id'], 'tstamp': tstamp, 'state': switch['pin'].value() == 1}\
-                                for switch in ctrl.switches.values() if switch['enabled']]
-                if data['data']:
-                    await self.srv_post('switches_state', data, retry=once)
-            except Exception as exc:
-                LOG.exc(exc, 'Server sensors data post error')
-            manage_memory()
-            if once:
-                break
+        try:
+            self.collect_sensor_data()
+            await self.drain_sensor_data(once=once)
+        except Exception as exc:
+            LOG.exc(exc, 'Server sensors data post error')
+        manage_memory('post_sensor_data')
+
+    async def post_switches_state(self, once=False):
+        try:
+            data, transitions_seq, snapshot = self.switches_state_payload()
+            if data['data'] and await self.srv_post('switches_state', data, retry=once):
+                self.switches_state_posted(transitions_seq, snapshot)
+        except Exception as exc:
+            LOG.exc(exc, 'Server switches state post error')
+        manage_memory('post_switches_state')
 
     async def post_log(self):
+        try:
+            if self.log_queue and not self.status['srv_req_pending']:
+                while self.log_queue:
+                    entries_count = 10 if len(self.log_queue) > 10 else len(self.log_queue)
+                    entries = self.log_queue[:entries_count]
+                    rsp = await self.srv_post('devices_log/post', {'entries': entries})
+                    if rsp:
+                        self.log_queue = self.log_queue[entries_count:] if entries_count < len(self.log_queue) else []
+                    else: 
+                        break
+        except Exception as exc:
+            LOG.exc(exc, 'Server log post error')
+        manage_memory('post_log')
+
+    async def post_sync(self, sensor_data, updates):
+        """sends all pending exchanges in one device_sync request,
+        with nothing queued only the updates are checked (if they are enabled)"""
+        try:
+            data = {}
+            entries = None
+            if sensor_data:
+                self.collect_sensor_data()
+                entries = self.data_log.read(self._data_batch)
+                if entries:
+                    data['sensors_data'] = self.sensor_data_payload(entries)
+            switches_state, transitions_seq, snapshot = self.switches_state_payload()
+            if switches_state['data']:
+                data['switches_state'] = switches_state
+            log_count = 0
+            if updates:
+                log_count = 10 if len(self.log_queue) > 10 else len(self.log_queue)
+                if log_count:
+                    data['log'] = {'entries': self.log_queue[:log_count]}
+            if not data:
+                # nothing queued: no device_sync request, the updates query alone
+                if updates:
+                    await self.check_updates()
+                return
+            if updates:
+                data['updates'] = self.updates_request()
+            rsp = await self.srv_post('device_sync', data)
+            if rsp:
+                if entries:
+                    self.data_log.ack(len(entries))
+                if switches_state['data']:
+                    self.switches_state_posted(transitions_seq, snapshot)
+                if log_count:
+                    self.log_queue = self.log_queue[log_count:]
+                if updates:
+                    self.apply_updates(rsp.get('updates'))
+                if sensor_data and len(self.data_log):
+                    await self.drain_sensor_data()
+                if updates and self.log_queue:
+                    await self.post_log()
+        except Exception as exc:
+            LOG.exc(exc, 'Server sync error')
+        manage_memory('post_sync')
+
+    async def sync(self, sensor_data=False, updates=False, software_updates=False):
+        """single periodic server exchange window aligned to sync_period (seconds)
+        with combined_sync in id.json everything goes in one device_sync request"""
+        period = self._conf.get('sync_period', 60)
         while True:
-            await uasyncio.sleep(59)
-            try:
-                if self.log_queue and not self.status['srv_req_pending']:
-                    while self.log_queue:
-                        entries_count = 10 if len(self.log_queue) > 10 else len(self.log_queue)
-                        entries = self.log_queue[:entries_count]
-                        rsp = await self.srv_post('devices_log/post', {'entries': entries})
-                        if rsp:
-                            self.log_queue = self.log_queue[entries_count:] if entries_count < len(self.log_queue) else []
-                        else: 
-                            break
-            except Exception as exc:
-                LOG.exc(exc, 'Server log post error')
-            manage_memory()
+            await uasyncio.sleep(period - utime.time() % period)
+            if self.id.get('combined_sync'):
+                await self.post_sync(sensor_data, updates)
+            else:
+                if sensor_data:
+                    await self.post_sensor_data()
+                await self.post_switches_state()
+                if updates:
+                    await self.post_log()
+                    await self.check_updates()
+            if software_updates and utime.time() - self._software_check >= 3600:
+                await self.check_software_updates()
+            manage_memory('sync')
 
     def post_tstamp(self, time_tuple=None):
         if not time_tuple:
             time_tuple = machine.RTC().now()
         return "{0:0>1d}/{1:0>1d}/{2:0>1d} {3:0>1d}:{4:0>1d}:{5:0>1d}".format(*time_tuple) if time_tuple else None
 
+    def epoch_tstamp(self, epoch):
+        return self.post_tstamp(utime.localtime(epoch))
+
     async def srv_post(self, url, data, retry=False):
         if self.busy:
             return False        
         data['device_id'] = self.id['id']
         data['token'] = self.id['token']
-        manage_memory()
+        manage_memory('srv_post')
         machine.resetWDT()
         result = await self._http.post(self.server_uri + url, data)
         if retry:
@@ -321,7 +473,7 @@ class LenferDevice:
                 machine.resetWDT()
                 result = await self._http.post(self.server_uri + url, data)
         machine.resetWDT()
-        manage_memory()
+        manage_memory('srv_post')
         return result
 
     def online(self):
@@ -350,7 +502,8 @@ class LenferDevice:
                 print('')
             print('Time:', self.post_tstamp())
             if self.modules.get('rtc'):
-                self.modules['rtc'].save_time()
+                # the DS3231 is written on the next internal RTC seconds transition
+                uasyncio.get_event_loop().create_task(self.modules['rtc'][0].save_time())
 
     def start(self):
         WDT(True)        
@@ -371,13 +524,15 @@ class LenferDevice:
                     if self.online():
                         loop.run_until_complete(self.post_sensor_data(once=True))
                         machine.resetWDT()
+                        loop.run_until_complete(self.post_switches_state(once=True))
+                        machine.resetWDT()
                             
             if self.online():
                 if self.id.get('updates'):
                     loop.run_until_complete(self.check_updates(once=True))
                     machine.resetWDT()
                 if not self.id.get('disable_software_updates'):
-                    loop.run_until_complete(self.task_check_software_updates(once=True))
+                    loop.run_until_complete(self.check_software_updates())
                     machine.resetWDT()
             if self.deepsleep():
                 if self._network:
@@ -387,31 +542,28 @@ class LenferDevice:
         self.start_async()
 
     def start_async(self):
-        loop = uasyncio.get_event_loop()     
-        loop.create_task(self.bg_leds())
-        loop.create_task(self.check_wlan_switch())
+        create_task = loop_monitor.create_task
+        create_task(self.bg_leds(), 'bg_leds')
+        create_task(self.check_wlan_switch(), 'check_wlan_switch')
         if self._network._wlan and (self._network._wlan.mode == AP_IF and self._network._wlan.conf['ssid']):
-            loop.create_task(self.delayed_ssid_switch())
+            create_task(self.delayed_ssid_switch(), 'delayed_ssid_switch')
+        sensor_data = False
         for module_type, modules in self.modules.items():
             if module_type in ('climate', 'power_monitor'):
-                for module in modules:
-                    loop.create_task(module.read())
-                if self.online():
-                    loop.create_task(self.post_sensor_data())
+                for idx, module in enumerate(modules):
+                    create_task(module.read(), '%s%d.read' % (module_type, idx))
+                sensor_data = True
             elif module_type in ('relay_switch', 'gate'):
-                for module in modules:
-                    loop.create_task(module.adjust_switch())                
+                for idx, module in enumerate(modules):
+                    create_task(module.adjust_switch(), '%s%d.adjust_switch' % (module_type, idx))
             elif module_type == 'rtc':
-                loop.create_task(modules[0].adjust_time())
+                create_task(modules[0].adjust_time(), 'rtc.adjust_time')
             elif module_type == 'feeder':
-                for module in modules:
-                    loop.create_task(module.check_timers())
+                for idx, module in enumerate(modules):
+                    create_task(module.check_timers(), 'feeder%d.check_timers' % idx)
         if self.online():
-            if self.id.get('updates'):
-                loop.create_task(self.post_log())
-                loop.create_task(self.check_updates())
-            if not self.id.get('disable_software_updates'):
-                loop.create_task(self.task_check_software_updates())
+            create_task(self.sync(sensor_data=sensor_data, updates=bool(self.id.get('updates')),
+                software_updates=not self.id.get('disable_software_updates')), 'sync')
 
         self.append_log_entries('device start')
 
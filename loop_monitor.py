@@ -0,0 +1,102 @@
+from array import array
+import utime
+import logging
+
+import lib.uasyncio as uasyncio
+
+LOG = logging.getLogger("LoopMonitor")
+
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+STALLS_LIMIT = 8
+
+_enabled = True
+_threshold = 100
+_step_hist = array('I', bytes(4 * (len(BUCKETS_MS) + 1)))
+_lag_hist = array('I', bytes(4 * (len(BUCKETS_MS) + 1)))
+_tasks = {}
+_stalls = []
+
+def configure(enabled=True, threshold=None):
+    "threshold - ms a single task step may hold the loop before it is reported as a stall"
+    global _enabled, _threshold
+    _enabled = enabled
+    if threshold:
+        _threshold = threshold
+
+def _bucket(value):
+    for idx, edge in enumerate(BUCKETS_MS):
+        if value <= edge:
+            return idx
+    return len(BUCKETS_MS)
+
+def _sleep_delay(ret):
+    "ms the yielded syscall asks the loop to wait or None"
+    if isinstance(ret, bool):
+        # yield False parks the task until it is woken up, it is no sleep
+        return None
+    if isinstance(ret, int):
+        return ret
+    if isinstance(ret, uasyncio.SleepMs):
+        return ret.arg
+    return None
+
+def monitored(coro, name):
+    """runs coro step by step, records how long each step holds the loop
+    and how late the task is resumed after sleeps"""
+    task = _tasks.get(name)
+    if not task:
+        task = _tasks[name] = {'steps': 0, 'step_total': 0, 'max_step': 0, 'stalls': 0, 'max_lag': 0, 'lag_total': 0, 'lag_count': 0}
+    value, exc = None, None
+    while True:
+        start = utime.ticks_ms()
+        try:
+            ret = coro.throw(exc) if exc else coro.send(value)
+        except StopIteration:
+            return
+        finally:
+            step = utime.ticks_diff(utime.ticks_ms(), start)
+            task['steps'] += 1
+            task['step_total'] += step
+            _step_hist[_bucket(step)] += 1
+            if step > task['max_step']:
+                task['max_step'] = step
+            if step > _threshold:
+                task['stalls'] += 1
+                _stalls.append((name, step, utime.time()))
+                if len(_stalls) > STALLS_LIMIT:
+                    _stalls.pop(0)
+                LOG.warning('%s held the loop for %d ms' % (name, step))
+        delay = _sleep_delay(ret)
+        resume = utime.ticks_add(utime.ticks_ms(), delay) if delay is not None else None
+        value, exc = None, None
+        try:
+            value = yield ret
+        except GeneratorExit:
+            coro.close()
+            raise
+        except Exception as _exc:
+            exc = _exc
+        if resume is not None and not exc:
+            lag = utime.ticks_diff(utime.ticks_ms(), resume)
+            if lag < 0:
+                lag = 0
+            _lag_hist[_bucket(lag)] += 1
+            task['lag_total'] += lag
+            task['lag_count'] += 1
+            if lag > task['max_lag']:
+                task['max_lag'] = lag
+
+def create_task(coro, name):
+    "creates loop task, monitored if monitoring is enabled"
+    uasyncio.get_event_loop().create_task(monitored(coro, name) if _enabled else coro)
+
+def stats():
+    "histograms bucket upper bounds are BUCKETS_MS, the last bucket is for larger values"
+    return {
+        'threshold': _threshold,
+        'buckets': BUCKETS_MS,
+        'step': list(_step_hist),
+        'lag': list(_lag_hist),
+        'tasks': _tasks,
+        'stalls': _stalls
+    }
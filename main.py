@@ -11,6 +11,8 @@ from utils import manage_memory, load_json
 LOOP = uasyncio.get_event_loop()
 LOG = logging.getLogger("Main")
 
+METRICS_CHUNK_SIZE = 512
+
 async def wdt_feed():
     await uasyncio.sleep(10)
     machine.resetWDT()
@@ -27,10 +29,10 @@ if NETWORK_CONTROLLER.online():
         perform_software_update()
         machine.reset()
 
-manage_memory()
+manage_memory('main_network', force=True)
 
 DEVICE = LenferDevice(NETWORK_CONTROLLER)
-manage_memory()
+manage_memory('main_device', force=True)
 
 import lib.picoweb as picoweb
 APP = picoweb.WebApp(__name__)
@@ -38,7 +40,7 @@ APP = picoweb.WebApp(__name__)
 async def send_json(rsp, data):
     await picoweb.start_response(rsp, 'application/json', "200", {'cache-control': 'no-store'})
     await rsp.awrite(ujson.dumps(data).encode('UTF-8'))
-    manage_memory()
+    manage_memory('send_json')
 
 @APP.route('/api/settings/wlan')
 async def get_wlan_settings(req, rsp):
@@ -61,10 +63,10 @@ async def delayed_reset(delay):
 @APP.route('/api/time')
 async def get_time(req, rsp):
     if req.method == 'POST':
-        ctrl = DEVICE.modules['rtc']
+        ctrl = DEVICE.modules.get('rtc')
         await req.read_json()
         if ctrl:
-            ctrl.set_time(req.json)
+            await ctrl[0].set_time(req.json)
         else:
             machine.RTC().init(req.json)
     await send_json(rsp, machine.RTC().now())
@@ -72,14 +74,27 @@ async def get_time(req, rsp):
 @APP.route('/')
 async def get_index(req, rsp):
     await APP.sendfile(rsp, 'html/index.html', content_type="text/html; charset=utf-8")
-    manage_memory()
+    manage_memory('get_index')
 
 @APP.route('/api/modules')
 async def get_modules(req, rsp):
-    pin_no = int(module_type = req.url_match.group(1))
-    await send_json(rsp, machine.Pin(pin_no, )
+    await send_json(rsp,
         {module_type: [module.name if module.name else idx for idx, module in enumerate(modules)] for module_type, modules in DEVICE.modules.items()})
 
+@APP.route('/metrics')
+async def get_metrics(req, rsp):
+    import metrics
+    await picoweb.start_response(rsp, 'text/plain; version=0.0.4', "200", {'cache-control': 'no-store'})
+    chunk = ''
+    for line in metrics.lines(DEVICE):
+        chunk += line
+        if len(chunk) >= METRICS_CHUNK_SIZE:
+            await rsp.awrite(chunk.encode('UTF-8'))
+            chunk = ''
+    if chunk:
+        await rsp.awrite(chunk.encode('UTF-8'))
+    manage_memory('get_metrics')
+
 @APP.route('/api/device_hash')
 async def get_device_hash(req, rsp):
     await send_json(rsp, DEVICE.id['hash'])
@@ -108,7 +123,7 @@ async def api(req, rsp):
 
 try:
     DEVICE.start()
-    manage_memory()
+    manage_memory('main_start', force=True)
     if NETWORK_CONTROLLER._wlan:
         APP.run(debug=True, host=NETWORK_CONTROLLER._wlan.host, port=80)
     else:
@@ -0,0 +1,98 @@
+import gc_policy
+import loop_monitor
+
+PREFIX = 'lenfer_'
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join('%s="%s"' % (key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for key, value in labels.items()) + '}'
+
+def _value(value):
+    if value is None:
+        return 'NaN'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    return str(value)
+
+def _family(name, metric_type, samples):
+    "exposition lines of one metric family; samples - iterable of (labels, value)"
+    yield '# TYPE %s%s %s\n' % (PREFIX, name, metric_type)
+    for labels, value in samples:
+        yield '%s%s%s %s\n' % (PREFIX, name, _labels(labels), _value(value))
+
+def _histogram(name, buckets, counts, total):
+    "counts are per bucket with the overflow bucket last; exposed cumulative"
+    yield '# TYPE %s%s histogram\n' % (PREFIX, name)
+    cumulative = 0
+    for idx, edge in enumerate(buckets):
+        cumulative += counts[idx]
+        yield '%s%s_bucket{le="%s"} %d\n' % (PREFIX, name, edge, cumulative)
+    cumulative += counts[-1]
+    yield '%s%s_bucket{le="+Inf"} %d\n' % (PREFIX, name, cumulative)
+    yield '%s%s_sum %d\n' % (PREFIX, name, total)
+    yield '%s%s_count %d\n' % (PREFIX, name, cumulative)
+
+def _modules_metrics(device):
+    "module gauges grouped by metric name, so every family is exposed in one block"
+    families = {}
+    for module_type, modules in device.modules.items():
+        for idx, module in enumerate(modules):
+            for name, labels, value in module.metrics():
+                module_labels = {'module': module_type, 'idx': idx}
+                if module.name:
+                    module_labels['name'] = module.name
+                if labels:
+                    module_labels.update(labels)
+                families.setdefault(name, []).append((module_labels, value))
+    return families
+
+def lines(device):
+    "generator of Prometheus text exposition format lines"
+    gc_stats = gc_policy.stats()
+    yield from _family('heap_free_bytes', 'gauge', ((None, gc_stats['mem_free']),))
+    yield from _family('heap_alloc_bytes', 'gauge', ((None, gc_stats['mem_alloc']),))
+    yield from _family('gc_collections_total', 'counter', ((None, gc_stats['collections']),))
+    yield from _family('gc_forced_collections_total', 'counter', ((None, gc_stats['forced']),))
+    yield from _family('gc_checks_total', 'counter', ((None, gc_stats['checks']),))
+    yield from _family('gc_time_us_total', 'counter', ((None, gc_stats['time_us']),))
+    yield from _family('gc_max_time_us', 'gauge', ((None, gc_stats['max_time_us']),))
+    yield from _family('gc_site_collections_total', 'counter',
+        (({'site': site}, count) for site, count in gc_stats['sites'].items()))
+    del gc_stats
+
+    loop_stats = loop_monitor.stats()
+    tasks = loop_stats['tasks']
+    yield from _histogram('loop_step_ms', loop_stats['buckets'], loop_stats['step'],
+        sum(task['step_total'] for task in tasks.values()))
+    yield from _histogram('loop_lag_ms', loop_stats['buckets'], loop_stats['lag'],
+        sum(task['lag_total'] for task in tasks.values()))
+    yield from _family('loop_stall_threshold_ms', 'gauge', ((None, loop_stats['threshold']),))
+    for name, key, metric_type in (('task_steps_total', 'steps', 'counter'),
+            ('task_step_ms_total', 'step_total', 'counter'), ('task_max_step_ms', 'max_step', 'gauge'),
+            ('task_stalls_total', 'stalls', 'counter'), ('task_max_lag_ms', 'max_lag', 'gauge')):
+        yield from _family(name, metric_type, (({'task': task_name}, task[key]) for task_name, task in tasks.items()))
+    del loop_stats, tasks
+
+    http_stats = device._http.stats
+    for name, key, metric_type in (('http_requests_total', 'requests', 'counter'),
+            ('http_request_ms_total', 'time_ms', 'counter'), ('http_request_max_ms', 'max_time_ms', 'gauge'),
+            ('http_connects_total', 'connects', 'counter'), ('http_reuses_total', 'reuses', 'counter'),
+            ('http_errors_total', 'errors', 'counter'), ('http_timeouts_total', 'timeouts', 'counter')):
+        yield from _family(name, metric_type, ((None, http_stats[key]),))
+
+    for name, key in (('i2c_bus_transfers_total', 'transfers'), ('i2c_bus_busy_us_total', 'busy_us'),
+            ('i2c_bus_wait_us_total', 'wait_us')):
+        yield from _family(name, 'counter', (({'bus': idx, 'module': module}, getattr(client, key))
+            for idx, arbiter in enumerate(device.i2c_arbiters) for module, client in arbiter.clients.items()))
+    yield from _family('i2c_bus_recoveries_total', 'counter',
+        (({'bus': idx}, count) for idx, count in enumerate(device.i2c_recoveries)))
+
+    yield from _family('upload_backlog', 'gauge', (
+        ({'queue': 'sensors_data'}, len(device.data_log)),
+        ({'queue': 'switch_transitions'}, len(device.switch_transitions)),
+        ({'queue': 'log'}, len(device.log_queue))))
+
+    for name, samples in _modules_metrics(device).items():
+        yield from _family(name, 'counter' if name.endswith('_total') else 'gauge', samples)
@@ -1,14 +1,40 @@
-from ina219 import INA219
-
 class PowerMonitor:
 
     def __init__(self, conf, _i2c):
-        i2c = _i2c[conf["i2c"]]
-        self._ina219 = INA219(conf["shunt_ohms"], i2c)
+        from ina219 import INA219
+        self._i2c = _i2c[conf["i2c"]]
+        self._ina219 = INA219(conf["shunt_ohms"], self._i2c)
         self._ina219.configure()
 
+    def turn(self):
+        "awaited before a reading, the bus is shared"
+        return self._i2c.turn()
+
     def voltage(self):
         return self._ina219.voltage()
 
     def current(self):
-        return self._ina219.current()
\ No newline at end of file
+        return self._ina219.current()
+
+class AdcCurrentSense:
+    """hall effect current sensor (ACS712 and alike) on an ADC input, current is in mA as INA219 gives it
+    conf: {pin, zero: output V at no current, sensitivity: V per A, samples: burst length},
+    the calibration depends on the sensor and the divider in front of the input and has no default"""
+
+    def __init__(self, conf):
+        from machine import ADC
+        from adc_sampler import AdcSampler
+        self._sampler = AdcSampler(conf['pin'], conf.get('samples', 32), atten=ADC.ATTN_11DB)
+        self._volts = 3.9 / self._sampler.full_scale
+        self._zero = conf['zero']
+        self._sensitivity = conf['sensitivity']
+
+    async def turn(self):
+        pass
+
+    def voltage(self):
+        "V on the input"
+        return self._sampler.mean() * self._volts
+
+    def current(self):
+        return (self.voltage() - self._zero) / self._sensitivity * 1000
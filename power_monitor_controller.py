@@ -1,10 +1,12 @@
 import machine
+import utime
 
 import lib.uasyncio as uasyncio
 import logging
 
 from lenfer_controller import LenferController
 from utils import manage_memory
+from deadband import DeadbandFilter
 
 LOG = logging.getLogger("PowerMonitor")
 
@@ -13,24 +15,40 @@ class PowerMonitor(LenferController):
     def __init__(self, device, conf):
         LenferController.__init__(self, device)
         self.data = {}
-        self.data_log = []
+        self.data_log = device.data_log
+        self.data_filter = DeadbandFilter()
         self.sensor_devices = []
         for sensor_device_conf in conf['sensor_devices']:
+            self.data_filter.add_sensor_device(sensor_device_conf)
             if sensor_device_conf['type'] == 'pzem004t':                
                 from sensors import SensorDevicePZEM004T
                 self.sensor_devices.append(SensorDevicePZEM004T(sensor_device_conf, self))
         LOG.info(self.sensor_devices)
         self._uart_id = conf['uart_id']
-        self._uart = machine.UART(self._uart_id, baudrate=9600, timeout=3, 
-            tx=self.sensor_devices[0]._uart_conf['tx'], rx=self.sensor_devices[0]._uart_conf['rx'])
+        self._uart_pins = (self.sensor_devices[0]._uart_conf['tx'], self.sensor_devices[0]._uart_conf['rx'])
+        self._uart = machine.UART(self._uart_id, baudrate=9600, timeout=3,
+            tx=self._uart_pins[0], rx=self._uart_pins[1])
+
+    def select_line(self, sensor_device):
+        "re-pins the UART to the sensor device line, meters sharing a line are polled without it"
+        pins = (sensor_device._uart_conf['tx'], sensor_device._uart_conf['rx'])
+        if pins != self._uart_pins:
+            self._uart.init(tx=pins[0], rx=pins[1])
+            self._uart_pins = pins
 
     async def read(self, once=False):
+        "polls the meters in turn, each one is limited by its time budget"
         while True:
-            tstamp = self.device.post_tstamp()
+            tstamp = utime.time()
             for sensor_device in self.sensor_devices:
-                data_read = sensor_device.read()
+                self.select_line(sensor_device)
+                data_read = await sensor_device.read()
+                entries = []
                 for sensor_id in sensor_device._sensors_ids:
-                    self.data_log.append([sensor_id, tstamp, self.data[sensor_id] if data_read else None])                    
+                    value = self.data[sensor_id] if data_read else None
+                    if self.data_filter.check(sensor_id, value, tstamp):
+                        entries.append((sensor_id, tstamp, value))
+                self.data_log.append(entries)
             if once:
                 return
             await uasyncio.sleep(self.device.settings['sleep'])
@@ -0,0 +1,120 @@
+"""
+Async driver for the PZEM-004T v3.0 energy meter: Modbus-RTU over a UART read with uasyncio streams
+"""
+import ustruct
+
+import lib.uasyncio as uasyncio
+
+BROADCAST = 0xF8  # any single meter on the line answers
+READ_INPUT = 0x04
+WRITE_SINGLE = 0x06
+INPUT_REGISTERS = 10
+ADDRESS_REGISTER = 0x0002
+# the meter answers in ~20 ms, a 25 bytes reply takes 26 ms at 9600 baud
+TIMEOUT_MS = 300
+
+def crc16(buf, length):
+    "Modbus CRC of the first length bytes of buf"
+    crc = 0xFFFF
+    for idx in range(length):
+        crc ^= buf[idx]
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+    return crc
+
+class PZEM004T:
+    """one meter on a Modbus line; measurements of the last successful read are kept in
+    voltage (V), current (A), power (W), energy (Wh), frequency (Hz), power_factor and alarm"""
+
+    FIELDS = ('voltage', 'current', 'power', 'energy', 'frequency', 'power_factor')
+
+    def __init__(self, uart, address=BROADCAST, timeout_ms=TIMEOUT_MS):
+        self._uart = uart
+        self._reader = uasyncio.StreamReader(uart)
+        self.address = address
+        self.timeout_ms = timeout_ms
+        self._request = self._frame(READ_INPUT, 0, INPUT_REGISTERS)
+        self._buf = bytearray(5 + 2 * INPUT_REGISTERS)
+        self.voltage = None
+        self.current = None
+        self.power = None
+        self.energy = None
+        self.frequency = None
+        self.power_factor = None
+        self.alarm = None
+
+    def _frame(self, func, register, value):
+        frame = bytearray(8)
+        ustruct.pack_into('>BBHH', frame, 0, self.address, func, register, value)
+        crc = crc16(frame, 6)
+        frame[6] = crc & 0xFF
+        frame[7] = crc >> 8
+        return frame
+
+    async def _receive(self, start, end):
+        "reads reply bytes start..end into the buffer"
+        buf = memoryview(self._buf)
+        while start < end:
+            chunk = await self._reader.read(end - start)
+            if not chunk:
+                raise OSError('PZEM UART closed')
+            buf[start:start + len(chunk)] = chunk
+            start += len(chunk)
+
+    async def _receive_reply(self, func):
+        "reads the reply frame, returns its length"
+        await self._receive(0, 3)
+        buf = self._buf
+        if self.address != BROADCAST and buf[0] != self.address:
+            # another meter answered, its frame is drained before the next request
+            raise OSError('PZEM %d reply from %d' % (self.address, buf[0]))
+        if buf[1] == func | 0x80:
+            await self._receive(3, 5)
+            length = 5
+        elif buf[1] == func == WRITE_SINGLE:
+            # echo of the request
+            length = 8
+            await self._receive(3, length)
+        elif buf[1] == func and 5 + buf[2] <= len(buf):
+            length = 5 + buf[2]
+            await self._receive(3, length)
+        else:
+            raise OSError('PZEM invalid reply')
+        if crc16(buf, length - 2) != buf[length - 2] | (buf[length - 1] << 8):
+            raise OSError('PZEM CRC error')
+        if buf[1] & 0x80:
+            raise OSError('PZEM exception %d' % buf[2])
+        return length
+
+    async def _transaction(self, request, func):
+        "sends the request, the reply is left in the buffer"
+        while self._uart.any():
+            # the tail of a reply that came after a timeout
+            self._uart.read()
+        self._uart.write(request)
+        try:
+            return await uasyncio.wait_for_ms(self._receive_reply(func), self.timeout_ms)
+        except uasyncio.TimeoutError:
+            # bytes of the late reply may be buffered by the stream
+            self._reader = uasyncio.StreamReader(self._uart)
+            raise OSError('PZEM %d timeout' % self.address)
+
+    async def read(self):
+        "reads all measurements from a single frame"
+        await self._transaction(self._request, READ_INPUT)
+        voltage, current_low, current_high, power_low, power_high, energy_low, energy_high,\
+            frequency, power_factor, alarm = ustruct.unpack_from('>10H', self._buf, 3)
+        self.voltage = voltage / 10
+        self.current = ((current_high << 16) | current_low) / 1000
+        self.power = ((power_high << 16) | power_low) / 10
+        self.energy = (energy_high << 16) | energy_low
+        self.frequency = frequency / 10
+        self.power_factor = power_factor / 100
+        self.alarm = alarm == 0xFFFF
+
+    async def set_address(self, address):
+        """sets the meter Modbus slave address (1..0xF7), use a BROADCAST instance
+        with a single meter connected to address a new one"""
+        await self._transaction(self._frame(WRITE_SINGLE, ADDRESS_REGISTER, address), WRITE_SINGLE)
+        self.address = address
+        self._request = self._frame(READ_INPUT, 0, INPUT_REGISTERS)
@@ -9,6 +9,7 @@ from Suntime import Sun
 
 from lenfer_controller import LenferController
 from utils import manage_memory
+import loop_monitor
 from timers import time_tuple_to_seconds, Timer
 
 LOG = logging.getLogger("Relay")
@@ -27,6 +28,7 @@ class RelaySwitchController(LenferController):
         self._schedule_params = None
         self._timers_param = None
         self._pulse_interval = conf.get('pulse_interval')
+        self.switch_id = conf.get('switch_id')
         self._pulse_length = conf.get('pulse_length')
         if conf.get('schedule_params'):
             self._schedule_params = conf['schedule_params']
@@ -37,7 +39,7 @@ class RelaySwitchController(LenferController):
                 self.init_timers()
         if self._pulse_length:
             self._on = False
-            uasyncio.get_event_loop().create_task(self.pulse_task())
+            loop_monitor.create_task(self.pulse_task(), '%s.pulse_task' % (self.name or 'relay'))
         self._log_prop_name = conf.get('log_prop_name') or self._timers_param
         self.api = {'on': self.api_on, 'http_post': self.api_http_post, 'pin': self.api_pin}
         if conf.get('api_buttons'):
@@ -105,6 +107,9 @@ class RelaySwitchController(LenferController):
     def state(self, value):
         self.on(value=value)
 
+    def metrics(self):
+        return [('relay_state', None, self.state), ('relay_timers', None, len(self.timers))]
+
     def init_timers(self):
         self.timers = []
         sun_data = None
@@ -139,8 +144,10 @@ class RelaySwitchController(LenferController):
                 self.pin.value(value)
             if self.led:
                 self.led.value(value)
+            if self.switch_id:
+                self.device.switch_transition(self.switch_id, value)
             self.log_relay_switch('start' if value else 'stop', 'manual' if manual else 'timer')
-        manage_memory()
+        manage_memory('relay_on')
 
     def log_relay_switch(self, operation, source):
         self.device.append_log_entries("%s %s %s" % (
@@ -179,7 +186,7 @@ class RelaySwitchController(LenferController):
                         next_time_on = next_timers[0].time_on - last_timer.time_on
             if once:
                 break               
-            manage_memory()
+            manage_memory('relay_adjust')
             if next_time_on:
                 await uasyncio.sleep(next_time_on)
             else:    
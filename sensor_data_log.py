@@ -0,0 +1,124 @@
+import ustruct
+import logging
+
+LOG = logging.getLogger("SensorDataLog")
+
+HEADER_FORMAT = '<4sIII'
+HEADER_SIZE = ustruct.calcsize(HEADER_FORMAT)
+HEADER_MAGIC = b'LSD2'
+# record: absolute counter + 1 (0 - never written slot), sensor id, epoch, value
+RECORD_FORMAT = '<IIIf'
+RECORD_SIZE = ustruct.calcsize(RECORD_FORMAT)
+# records appended between the header writes, the head is recovered by a scan on boot
+HEADER_PERIOD = 16
+
+class SensorDataLog:
+    """fixed size ring file of sensor readings (sensor id, epoch, value)
+    head and tail are absolute record counters, tail is moved only by ack();
+    the header is written on ack() and every HEADER_PERIOD appended records"""
+
+    def __init__(self, path, capacity=2048):
+        self._path = path
+        self._capacity = capacity
+        self._head = 0
+        self._tail = 0
+        self._saved_head = 0
+        self._read_tail = 0
+        self._buf = bytearray(RECORD_SIZE)
+        self._header_buf = bytearray(HEADER_SIZE)
+        if not self._load_header():
+            self._create()
+
+    def _load_header(self):
+        try:
+            with open(self._path, 'rb') as _file:
+                if _file.readinto(self._header_buf) != HEADER_SIZE:
+                    return False
+            magic, capacity, head, tail = ustruct.unpack(HEADER_FORMAT, self._header_buf)
+            if magic != HEADER_MAGIC or capacity != self._capacity or head - tail > capacity:
+                LOG.warning('Sensor data log reset: %s' % self._path)
+                return False
+            self._head, self._tail = head, tail
+            self._scan_head()
+            self._saved_head = head
+            return True
+        except OSError:
+            return False
+
+    def _scan_head(self):
+        """moves the head past the records appended after the last header write:
+        the slot of each one keeps its own counter, the slot past them an older one (or zero)"""
+        with open(self._path, 'rb') as _file:
+            for _ in range(self._capacity):
+                if self._counter(_file, self._head) != self._head + 1:
+                    break
+                self._head += 1
+        if self._head - self._tail > self._capacity:
+            self._tail = self._head - self._capacity
+
+    def _counter(self, _file, idx):
+        _file.seek(self._offset(idx))
+        _file.readinto(self._buf)
+        return ustruct.unpack(RECORD_FORMAT, self._buf)[0]
+
+    def _create(self):
+        self._head, self._tail = 0, 0
+        with open(self._path, 'wb') as _file:
+            self._write_header(_file)
+            chunk = bytes(RECORD_SIZE * 32)
+            for _ in range(self._capacity // 32):
+                _file.write(chunk)
+            _file.write(bytes(RECORD_SIZE * (self._capacity % 32)))
+
+    def _write_header(self, _file):
+        ustruct.pack_into(HEADER_FORMAT, self._header_buf, 0, HEADER_MAGIC, self._capacity,
+            self._head, self._tail)
+        self._saved_head = self._head
+        _file.seek(0)
+        _file.write(self._header_buf)
+
+    def _offset(self, idx):
+        return HEADER_SIZE + (idx % self._capacity) * RECORD_SIZE
+
+    def __len__(self):
+        return self._head - self._tail
+
+    def append(self, entries):
+        "entries: list of (sensor_id, epoch, value); value None is stored as NaN"
+        if not entries:
+            return
+        with open(self._path, 'r+b') as _file:
+            for sensor_id, epoch, value in entries:
+                ustruct.pack_into(RECORD_FORMAT, self._buf, 0, self._head + 1, sensor_id, epoch,
+                    float('nan') if value is None else value)
+                _file.seek(self._offset(self._head))
+                _file.write(self._buf)
+                self._head += 1
+            if self._head - self._tail > self._capacity:
+                LOG.warning('Sensor data log overflow: %d entries dropped' %
+                    (self._head - self._tail - self._capacity))
+                self._tail = self._head - self._capacity
+            if self._head - self._saved_head >= HEADER_PERIOD:
+                self._write_header(_file)
+
+    def read(self, count):
+        "returns up to count oldest unacknowledged entries"
+        self._read_tail = self._tail
+        count = min(count, self._head - self._tail)
+        result = []
+        if count:
+            with open(self._path, 'rb') as _file:
+                for idx in range(self._tail, self._tail + count):
+                    _file.seek(self._offset(idx))
+                    _file.readinto(self._buf)
+                    _, sensor_id, epoch, value = ustruct.unpack(RECORD_FORMAT, self._buf)
+                    result.append((sensor_id, epoch, None if value != value else round(value, 3)))
+        return result
+
+    def ack(self, count):
+        "moves read cursor past count entries returned by the last read()"
+        tail = self._read_tail + count
+        if tail > self._tail:
+            self._tail = min(tail, self._head)
+            with open(self._path, 'r+b') as _file:
+                self._write_header(_file)
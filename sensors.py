@@ -1,168 +1,417 @@
 from machine import Pin, Onewire, UART
-import ubinascii
 import utime
 import logging
 
 LOG = logging.getLogger("Sensors")
 
 class SensorDevice:
-    "generic sensor handler"
+    """generic sensor handler
+    circuit breaker: after FAILURES_TRIP failures in a row the device is tripped, it is probed again
+    in BACKOFF_MIN seconds, the interval doubles with every failed probe up to BACKOFF_MAX"""
+
+    FAILURES_TRIP = 3
+    BACKOFF_MIN = 10
+    BACKOFF_MAX = 640
 
     def __init__(self, conf, controller):
         self.sensor_type = conf['type']
         self._controller = controller
         self._sensors_ids = conf['sensors_ids']
+        self.errors = 0
+        self.failures = 0
+        self.trips = 0
+        self._retry_at = None
         if controller:
             for sensor_id in self._sensors_ids:
                 if not sensor_id in controller.data:
                     controller.data[sensor_id] = None
 
+    def convert(self):
+        "starts a measurement collected by read, returns its duration in ms (0 - read measures itself)"
+        return 0
+
+    async def turn(self):
+        "awaited before convert and read, the sensor bus may be busy"
+        pass
+
+    @property
+    def tripped(self):
+        return self._retry_at is not None
+
+    def available(self):
+        "the device is not tripped or its next probe is due"
+        return self._retry_at is None or utime.ticks_diff(utime.ticks_ms(), self._retry_at) >= 0
+
+    def succeeded(self):
+        if self._retry_at is not None:
+            LOG.info('%s sensor device is back after %d failures' % (self.sensor_type, self.failures))
+        self.failures = 0
+        self._retry_at = None
+
+    def failed(self):
+        "counts a failure, returns True if the device is tripped"
+        self.errors += 1
+        self.failures += 1
+        if self.failures < self.FAILURES_TRIP:
+            return False
+        if self.failures == self.FAILURES_TRIP:
+            self.trips += 1
+            LOG.error('%s sensor device tripped' % self.sensor_type)
+        backoff = min(self.BACKOFF_MIN << min(self.failures - self.FAILURES_TRIP, 6), self.BACKOFF_MAX)
+        self._retry_at = utime.ticks_add(utime.ticks_ms(), backoff * 1000)
+        return True
+
+class SensorDeviceI2C(SensorDevice):
+    "sensor on a device I2C bus, the bus is recovered when the sensor trips"
+
+    def __init__(self, conf, controller, i2c_list):
+        SensorDevice.__init__(self, conf, controller)
+        self._i2c_idx = conf['i2c']
+        self._i2c = i2c_list[conf['i2c']]
+
+    def turn(self):
+        return self._i2c.turn()
+
+    def failed(self):
+        if SensorDevice.failed(self):
+            # a slave holding SDA low takes down every device of the bus
+            self._controller.device.recover_i2c(self._i2c_idx)
+            return True
+        return False
+
 class SensorDevicePZEM004T(SensorDevice):
-    "PZEM-004T sensor handler"
+    """PZEM-004T sensor handler
+    sensors_ids: voltage, current and optionally power, energy, frequency, power factor
+    address: Modbus slave address, meters sharing the uart pins need distinct ones (default - broadcast)
+    timeout: reply timeout ms, budget: ms the meter may take per reading with retries"""
 
     def __init__(self, conf, controller):
         SensorDevice.__init__(self, conf, controller)
         self._uart_conf = conf['uart']
+        self._conf = conf
+        self.budget = conf.get('budget', 600)
+        self._pzem = None
 
-    def read(self):
-        "reads sensors data and stores in into controller data field"
-        uart = self._controller._uart
-        uart.init(tx=self._uart_conf['tx'], rx=self._uart_conf['rx'])        
-        msg_raw = None
-        retries = 0
-        while retries < 3 and not msg_raw:
-            uart.write(b"\xf8\x04\x00\x00\x00\x0a\x64\x64")   
-            msg_raw = uart.read(25)
-            retries += 1
-            utime.sleep(1)
-        uart.flush()
-        if msg_raw:
+    async def read(self):
+        "reads sensors data within the time budget and stores in into controller data field"
+        if not self._pzem:
+            from pzem004t import PZEM004T, BROADCAST, TIMEOUT_MS
+            self._pzem = PZEM004T(self._controller._uart, address=self._conf.get('address', BROADCAST),
+                timeout_ms=self._conf.get('timeout', TIMEOUT_MS))
+        started = utime.ticks_ms()
+        while True:
             try:
-                msg = ubinascii.hexlify(msg_raw).decode()
-                self._controller.data[self._sensors_ids[0]] = int(msg[6:10], 16) / 10 #voltage
-                self._controller.data[self._sensors_ids[1]] = int(msg[10:14], 16) / 1000 #current
+                await self._pzem.read()
+                for sensor_id, field in zip(self._sensors_ids, self._pzem.FIELDS):
+                    self._controller.data[sensor_id] = getattr(self._pzem, field)
                 return True
-            except Exception as exc:
-                LOG.exc(exc, 'PZEM UART reading error')
+            except OSError as exc:
+                error = exc
+            if utime.ticks_diff(utime.ticks_ms(), started) + self._pzem.timeout_ms > self.budget:
+                break
+        LOG.exc(error, 'PZEM UART reading error')
+        self.errors += 1
         return False
 
-class SensorDeviceBME280(SensorDevice):
-    "BME280 sensor handler"
+class SensorDeviceBME280(SensorDeviceI2C):
+    """BME280 sensor handler
+    sensors_ids: temperature, humidity and optional pressure (hPa)"""
 
     def __init__(self, conf, controller, i2c_list):
-        SensorDevice.__init__(self, conf, controller)
-        self._i2c = i2c_list[conf['i2c']]
+        SensorDeviceI2C.__init__(self, conf, controller, i2c_list)
+        self._bme = None
+        # None - no convert this cycle, False - it failed
+        self._convert = None
+
+    def _driver(self):
+        if not self._bme:
+            import BME280
+            self._bme = BME280.BME280(i2c=self._i2c)
+        return self._bme
+
+    def convert(self):
+        "starts forced mode measurement, returns its duration in ms"
+        if not self.available():
+            return 0
+        self._convert = False
+        try:
+            measure_us = self._driver().start_measurement()
+            self._convert = True
+            return measure_us // 1000 + 1
+        except Exception as exc:
+            self.failed()
+            self._bme = None
+        return 0
 
     def read(self):
-        "reads sensors data and stores in into controller data field"
-        humid, temp = None, None
+        "collects the measurement started by convert (measures if none was) and stores it into controller data field"
+        humid, temp, pressure = None, None, None
         try:
-            import BME280
-            bme = BME280.BME280(i2c=self._i2c)
-            temp = round((bme.read_temperature() / 100), 1)
-            humid = int(bme.read_humidity() // 1024)
+            if self._convert:
+                temp, pressure, humid = self._bme.collect_compensated_data()
+            elif self._convert is None and self.available():
+                temp, pressure, humid = self._driver().read_compensated_data()
+            if temp is not None:
+                temp = round(temp / 100, 1)
+                pressure = round(pressure / 25600, 1)
+                humid = int(humid // 1024)
+                self.succeeded()
         except Exception as exc:
-            pass
+            self.failed()
+            #calibration is reloaded on the next read, the sensor may have been reconnected
+            self._bme = None
             #LOG.exc(exc, 'BME280 error')
         finally:
+            self._convert = None
             self._controller.data[self._sensors_ids[0]] = temp
             self._controller.data[self._sensors_ids[1]] = humid
+            if len(self._sensors_ids) > 2:
+                self._controller.data[self._sensors_ids[2]] = pressure
 
-class SensorDeviceAHT20(SensorDevice):
+class SensorDeviceAHT20(SensorDeviceI2C):
     "AHT20 sensor handler"
 
     def __init__(self, conf, controller, i2c_list):
-        SensorDevice.__init__(self, conf, controller)
+        SensorDeviceI2C.__init__(self, conf, controller, i2c_list)
+        self._ahtx0 = None
+        # None - no convert this cycle, False - it failed
+        self._convert = None
         try:
-            import ahtx0
-            self._ahtx0 = ahtx0.AHT20(i2c_list[conf['i2c']])
+            self._driver()
         except Exception as exc:
+            self.failed()
             LOG.exc(exc, 'AHTX0 initialization error')
 
+    def _driver(self):
+        if not self._ahtx0:
+            import ahtx0
+            self._ahtx0 = ahtx0.AHT20(self._i2c)
+        return self._ahtx0
+
+    def convert(self):
+        "triggers measurement, returns its duration in ms"
+        if not self.available():
+            return 0
+        self._convert = False
+        try:
+            conversion_ms = self._driver().start_measurement()
+            self._convert = True
+            return conversion_ms
+        except Exception as exc:
+            self.failed()
+            self._ahtx0 = None
+        return 0
+
     def read(self):
-        "reads sensors data and stores in into controller data field"
+        "collects the measurement started by convert (measures if none was) and stores it into controller data field"
         humid, temp = None, None
         try:
-            temp = self._ahtx0.temperature
-            humid = self._ahtx0.relative_humidity
+            if self._convert:
+                temp, humid = self._ahtx0.collect_measurement()
+                self.succeeded()
+            elif self._convert is None and self.available():
+                temp, humid = self._driver().measurements
+                self.succeeded()
         except Exception as exc:
-            pass
+            self.failed()
+            self._ahtx0 = None
             #LOG.exc(exc, 'BME280 error')
         finally:
+            self._convert = None
             self._controller.data[self._sensors_ids[0]] = temp
             self._controller.data[self._sensors_ids[1]] = humid
 
-class SensorDeviceCCS811(SensorDevice):
-    "CCS811 sensor handler"
+class SensorDeviceCCS811(SensorDeviceI2C):
+    """CCS811 sensor handler
+    int_pin: nINT pin, the data is read when the sensor signals it (otherwise at the drive mode period)
+    the algorithm baseline is restored from flash on init and saved hourly when it changes"""
+
+    BASELINE_FILE = 'ccs811_baseline.json'
+    BASELINE_SAVE_PERIOD = 3600
 
     def __init__(self, conf, controller, i2c_list):
-        SensorDevice.__init__(self, conf, controller)
+        SensorDeviceI2C.__init__(self, conf, controller, i2c_list)
         self._ccs811 = None
+        self._int_pin = Pin(conf['int_pin'], Pin.IN, Pin.PULL_UP) if conf.get('int_pin') is not None else None
+        self._read_at = None
+        self._envdata = None
+        self._baseline = None
+        self._baseline_at = utime.ticks_ms()
         try:
-            from CCS811 import CCS811
-            self._ccs811 = CCS811(i2c_list[conf['i2c']])
+            self._driver()
         except Exception as exc:
+            self.failed()
             LOG.exc(exc, 'CCS811 initialization error')
 
+    def _driver(self):
+        if not self._ccs811:
+            from CCS811 import CCS811
+            self._ccs811 = CCS811(self._i2c)
+            self.restore_baseline()
+        return self._ccs811
+
+    def restore_baseline(self):
+        "a saved baseline spares the sensor the burn-in after a reboot"
+        from utils import load_json, file_exists
+        if not file_exists(self.BASELINE_FILE):
+            return
+        baseline = load_json(self.BASELINE_FILE)
+        if baseline:
+            self._ccs811.put_baseline(*baseline)
+            self._baseline = tuple(baseline)
+
+    def save_baseline(self):
+        baseline = self._ccs811.get_baseline()
+        if baseline != self._baseline:
+            from utils import save_json
+            save_json(list(baseline), self.BASELINE_FILE)
+            self._baseline = baseline
+
     def read(self):
         "reads sensors data and stores in into controller data field"
+        if not self.available():
+            self._controller.data[self._sensors_ids[0]] = None
+            return
+        now = utime.ticks_ms()
         if self._ccs811:
-            co2 = None
-            try:
-                if self._ccs811.data_ready():
-                    co2 = self._ccs811.eCO2
-                    temp = self._controller.data[self._controller.sensors_roles['temperature'][0]]
-                    humid = self._controller.data[self._controller.sensors_roles['humidity'][0]]
-                    if temp != None and humid != None:
-                        self._ccs811.put_envdata(humid, temp)
-            except Exception as exc:
-                pass
-                #LOG.exc(exc, 'BME280 error')
-            finally:
-                if co2:
-                    self._controller.data[self._sensors_ids[0]] = co2
+            if self._int_pin:
+                # nINT is low while there is unread data
+                if self._int_pin.value():
+                    return
+            elif self._read_at is not None and utime.ticks_diff(now, self._read_at) < self._ccs811.period_ms:
+                return
+        self._read_at = now
+        co2 = None
+        try:
+            if self._driver().read_algorithm_data():
+                co2 = self._ccs811.eCO2
+                temp = self._controller.data[self._controller.sensors_roles['temperature'][0]]
+                humid = self._controller.data[self._controller.sensors_roles['humidity'][0]]
+                if temp != None and humid != None and (humid, temp) != self._envdata:
+                    self._ccs811.put_envdata(humid, temp)
+                    self._envdata = (humid, temp)
+            if utime.ticks_diff(now, self._baseline_at) >= self.BASELINE_SAVE_PERIOD * 1000:
+                self._baseline_at = now
+                self.save_baseline()
+            self.succeeded()
+        except Exception as exc:
+            self.failed()
+            #LOG.exc(exc, 'BME280 error')
+        finally:
+            if co2:
+                self._controller.data[self._sensors_ids[0]] = co2
 
 class SensorDeviceDS18x20(SensorDevice):
-    "ds18x20 sensor handler"
+    """ds18x20 sensor handler: all probes of a onewire bus converted at once
+    sensors_ids follow the bus scan order or the conf 'roms' list (rom codes as printed on init)
+    resolution: 9 - 12 bits, a number or a list matching sensors_ids (default 12)"""
+
+    CONVERSION_MS = {9: 94, 10: 188, 11: 375, 12: 750}
 
     def __init__(self, conf, controller, ow_list):
         SensorDevice.__init__(self, conf, controller)
         print('ds18x20 init')
-        self.rom = None
         self._ow = None
-        self._ds = None
+        self._probes = []
+        self._conversion_ms = 0
+        self._convert = False
         _ow = ow_list[conf['ow']]
         if _ow:
-            self._ow = Onewire(Pin(ow_list[conf['ow']]))
+            self._ow = Onewire(Pin(_ow))
             ow_roms = self._ow.scan()
             if ow_roms:
-                self.rom = ow_roms[0]
-                print('ds18x20 rom found ' + str(self.rom))
-                self._ds = Onewire.ds18x20(self._ow, 0)
+                roms = conf.get('roms') or ow_roms
+                resolution = conf.get('resolution', 12)
+                for idx, sensor_id in enumerate(self._sensors_ids):
+                    if idx < len(roms) and roms[idx] in ow_roms:
+                        print('ds18x20 rom found ' + str(roms[idx]))
+                        self._add_probe(sensor_id, ow_roms.index(roms[idx]),
+                            resolution[idx] if isinstance(resolution, list) else resolution)
+                    else:
+                        print('no ds18x20 rom found for sensor ' + str(sensor_id))
             else:
                 print('no ds18x20 rom found')
         else:
             print('invalid onewire settings')
-        self._convert = False
+
+    def _add_probe(self, sensor_id, dev, resolution):
+        try:
+            _ds = Onewire.ds18x20(self._ow, dev)
+            if _ds.get_res() != resolution:
+                _ds.set_res(resolution)
+            self._probes.append((sensor_id, _ds))
+            self._conversion_ms = max(self._conversion_ms, self.CONVERSION_MS[resolution])
+        except Exception as exc:
+            self.errors += 1
+            LOG.exc(exc, 'onewire error')
 
     def convert(self):
-        "requests sensor readings"
-        if self.rom:
+        """requests all probes readings (skip rom), returns the conversion time in ms
+        of the slowest (highest resolution) probe"""
+        if self._probes:
             try:
-                self._ds.convert(False)
+                self._ow.reset()
+                self._ow.writebyte(0xCC)
+                self._ow.writebyte(0x44)
                 self._convert = True
+                return self._conversion_ms
             except Exception as exc:
+                self.errors += 1
                 LOG.exc(exc, 'onewire error')
+        return 0
 
     def read(self):
         "reads sensors data and stores in into controller data field"
         if self._convert:
+            for sensor_id, _ds in self._probes:
+                try:
+                    self._controller.data[sensor_id] = round(_ds.read_temp(), 1)
+                except Exception as exc:
+                    self.errors += 1
+                    LOG.exc(exc, 'onewire error')
+                    self._controller.data[sensor_id] = None
+            self._convert = False
+
+class SensorDeviceMQ135(SensorDevice):
+    """MQ135 sensor handler: CO2 ppm from a burst of ADC readings, corrected by the controller
+    temperature and humidity when they are known
+    pin: ADC pin, samples: burst length (default 32)"""
+
+    def __init__(self, conf, controller):
+        SensorDevice.__init__(self, conf, controller)
+        self._mq135 = None
+        try:
+            from MQ135 import MQ135
+            self._mq135 = MQ135(conf['pin'], conf.get('samples', 32))
+        except Exception as exc:
+            LOG.exc(exc, 'MQ135 initialization error')
+
+    def read(self):
+        "reads sensor data and stores in into controller data field"
+        co2 = None
+        if self._mq135:
             try:
-                self._controller.data[self._sensors_ids[0]] =\
-                    round(self._ds.read_temp(), 1)
+                roles = self._controller.sensors_roles
+                temp = self._controller.data[roles['temperature'][0]] if roles and roles.get('temperature') else None
+                humid = self._controller.data[roles['humidity'][0]] if roles and roles.get('humidity') else None
+                if temp != None and humid != None:
+                    co2 = round(self._mq135.get_corrected_ppm(temp, humid))
+                else:
+                    co2 = round(self._mq135.get_ppm())
             except Exception as exc:
-                LOG.exc(exc, 'onewire error')
-                self._controller.data[self._sensors_ids[0]] = None
-            finally:
-                self._convert = False
+                self.errors += 1
+                LOG.exc(exc, 'MQ135 error')
+        self._controller.data[self._sensors_ids[0]] = co2
+
+class SensorDeviceADCCurrent(SensorDevice):
+    """current sensor on an ADC input (see power_monitor.AdcCurrentSense)
+    sensors_ids: current (A); pin, zero, sensitivity, samples as in AdcCurrentSense"""
 
+    def __init__(self, conf, controller):
+        SensorDevice.__init__(self, conf, controller)
+        from power_monitor import AdcCurrentSense
+        self._sense = AdcCurrentSense(conf)
+
+    def read(self):
+        "reads sensor data and stores in into controller data field"
+        self._controller.data[self._sensors_ids[0]] = round(self._sense.current() / 1000, 3)
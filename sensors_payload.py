@@ -0,0 +1,25 @@
+from array import array
+
+SCALE = 1000
+NULL_VALUE = -0x80000000
+
+def encode_columnar(entries, tstamp_format):
+    """packs (sensor_id, epoch, value) entries into sensors_data columnar payload:
+    ids, base timestamp with per entry offsets in seconds and fixed point values"""
+    count = len(entries)
+    ids = array('H', bytes(2 * count))
+    offsets = array('i', bytes(4 * count))
+    values = array('i', bytes(4 * count))
+    base = min(entry[1] for entry in entries) if count else 0
+    for idx, entry in enumerate(entries):
+        ids[idx] = entry[0]
+        offsets[idx] = entry[1] - base
+        values[idx] = NULL_VALUE if entry[2] is None else int(round(entry[2] * SCALE))
+    return {
+        'format': 'columnar',
+        'scale': SCALE,
+        'tstamp': tstamp_format(base),
+        'ids': ids,
+        'offsets': offsets,
+        'values': values
+    }
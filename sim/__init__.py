@@ -0,0 +1,3 @@
+"""Host-side simulator of the Lenfer device hardware: stand-ins of the MicroPython
+modules the firmware imports, models of its sensors and buses, and a runner
+that boots main.py on them (python3 -m sim)."""
@@ -0,0 +1,65 @@
+"""Runs the device firmware on the simulated board.
+
+    python3 -m sim climate_info --duration 600 [--http-port 8081] [--fs /tmp/dev]
+    python3 -m sim relay_switch --virtual --live-heap --duration 30d --start 2026-03-01 --record run.jsonl
+
+A virtual run still executes every read cycle on the host. With --live-heap a sim day of
+relay_switch takes about 4 s, of climate_info (a read every 750 ms) about 30 s, so 30 days of it
+take ~15 minutes. Without it the heap is traced and runs are about 8x slower: ~25 s per
+relay_switch day, ~10 s per climate_info hour.
+"""
+import argparse
+import calendar
+import json
+import logging
+from datetime import datetime
+
+from sim.clock import Clock, VirtualClock
+from sim.recorder import Recorder
+from sim.runner import Simulation, SimTimeFilter
+
+UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+def duration(value):
+    "seconds, or a number with s/m/h/d suffix"
+    if value and value[-1] in UNITS:
+        return float(value[:-1]) * UNITS[value[-1]]
+    return float(value)
+
+def start_epoch(value):
+    "UTC ISO date or date and time"
+    return calendar.timegm(datetime.fromisoformat(value).timetuple())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('profile', help='conf/ profile name, directory or conf.json path')
+    parser.add_argument('--fs', help='device flash directory (kept between runs), default - a temporary one')
+    parser.add_argument('--server', default='stand-in',
+        help="'stand-in', host:port of the API server or 'none' for the real server")
+    parser.add_argument('--http-port', type=int, help='serve the device web app on this port')
+    parser.add_argument('--duration', type=duration, help='sim time to run: seconds or 90m, 12h, 30d')
+    parser.add_argument('--reboots', type=int, default=10, help='stop after this many resets')
+    parser.add_argument('--seed', type=int, default=0, help='environment noise seed')
+    parser.add_argument('--virtual', action='store_true',
+        help='virtual time: waits take no host time, the run goes as fast as the host allows')
+    parser.add_argument('--start', type=start_epoch, help='sim start time, UTC ISO date[Thh:mm], default - now')
+    parser.add_argument('--live-heap', action='store_true',
+        help='size the heap by live host memory instead of tracing allocations (faster, no garbage build-up)')
+    parser.add_argument('--record', help='save relay transitions, uploads, collections and resets (JSON lines)')
+    parser.add_argument('--log-level', default='INFO')
+    args = parser.parse_args()
+    handler = logging.StreamHandler()
+    handler.addFilter(SimTimeFilter())
+    handler.setFormatter(logging.Formatter('%(sim_time)10.3f %(levelname)s %(name)s: %(message)s'))
+    logging.basicConfig(level=args.log_level.upper(), handlers=[handler])
+    clock = (VirtualClock if args.virtual else Clock)(args.start)
+    simulation = Simulation(args.profile, fs=args.fs, server=None if args.server == 'none' else args.server,
+        http_port=args.http_port, seed=args.seed, reboots=args.reboots, clock=clock, traced_heap=not args.live_heap)
+    recorder = Recorder(simulation).run(args.duration)
+    if args.record:
+        recorder.save(args.record)
+    print(json.dumps(recorder.summary(), indent=2))
+    print('flash: %s' % simulation.fs)
+
+if __name__ == '__main__':
+    main()
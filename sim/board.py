@@ -0,0 +1,313 @@
+"""Simulated ESP32 board: pins, I2C buses, UART lines, 1-Wire buses, ADC inputs,
+watchdog, heap and the device models wired to them."""
+import errno
+import heapq
+import sys
+import tracemalloc
+
+from sim.environment import Environment
+from sim import devices
+
+HEAP_SIZE = 4 * 1024 * 1024
+# average host memory block, sizes the untraced heap
+BLOCK_SIZE = 64
+WDT_TIMEOUT = 30
+UTC_OFFSET = 3 * 3600
+I2C_ADDRESSES = {'bme280': 0x76, 'aht20': 0x38, 'ccs811': 0x5A}
+PULL_UP = 1
+IRQ_RISING, IRQ_FALLING, IRQ_ANYEDGE, IRQ_LOWLEVEL, IRQ_HILEVEL = 1, 2, 3, 4, 5
+
+class PinState:
+
+    def __init__(self, number):
+        self.number = number
+        self.mode = None
+        self.pull = None
+        self.level = 0
+        self.driven = False
+        self.handler = None
+        self.trigger = 0
+        self.irq_pin = None
+
+    def fires(self, level):
+        "irq trigger matches the new level"
+        if self.trigger == IRQ_ANYEDGE:
+            return True
+        return self.trigger == (IRQ_RISING if level else IRQ_FALLING) or\
+            self.trigger == (IRQ_HILEVEL if level else IRQ_LOWLEVEL)
+
+class I2CBus:
+    """devices by address; transfers to a missing address fail like an unacknowledged address
+    stuck - SCL clocks a slave holding SDA low needs to let it go, every transfer fails meanwhile"""
+
+    def __init__(self, scl, sda):
+        self.scl = scl
+        self.sda = sda
+        self.devices = {}
+        self.transfers = 0
+        self.errors = 0
+        self.fail = 0
+        self.stuck = 0
+
+    def attach(self, device):
+        self.devices[device.address] = device
+        return device
+
+    def device(self, address):
+        self.transfers += 1
+        device = self.devices.get(address)
+        if self.fail or self.stuck or not device:
+            if self.fail:
+                self.fail -= 1
+            self.errors += 1
+            raise OSError(errno.ENODEV, 'I2C bus error')
+        return device
+
+class UartLine:
+    """devices wired to a tx/rx pin pair; every device sees every frame (multidrop),
+    replies are queued with the time their last byte arrives"""
+
+    def __init__(self, tx, rx):
+        self.tx = tx
+        self.rx = rx
+        self.devices = []
+        self.frames = 0
+
+class Heap:
+    """host stand-in for the MicroPython heap, sized by tracemalloc
+    MicroPython keeps garbage until a collection, so allocated memory is the traced
+    peak since the last gc.collect()
+    traced=False counts live host memory blocks instead: leaks show, garbage does not,
+    and the run is several times faster"""
+
+    def __init__(self, board, size=HEAP_SIZE, traced=True):
+        self._board = board
+        self.size = size
+        self.traced = traced
+        self._base = 0
+        self._threshold = -1
+        if traced and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _used(self):
+        if self.traced:
+            return tracemalloc.get_traced_memory()[1]
+        return sys.getallocatedblocks() * BLOCK_SIZE
+
+    def reset(self):
+        "heap of a freshly booted device"
+        if self.traced:
+            tracemalloc.reset_peak()
+        self._base = self._used()
+
+    def mem_alloc(self):
+        return max(self._used() - self._base, 0)
+
+    def mem_free(self):
+        return max(self.size - self.mem_alloc(), 0)
+
+    def threshold(self, value=None):
+        if value is None:
+            return self._threshold
+        self._threshold = value
+
+    def collect(self):
+        import gc
+        alloc = self.mem_alloc()
+        collected = gc.host_collect()
+        if self.traced:
+            tracemalloc.reset_peak()
+        self._board.emit('gc', alloc=alloc, free=self.mem_free())
+        return collected
+
+class Board:
+
+    def __init__(self, clock, environment=None, heap_size=HEAP_SIZE, wdt_timeout=WDT_TIMEOUT,
+            utc_offset=UTC_OFFSET, traced_heap=True):
+        self.clock = clock
+        self.utc_offset = utc_offset
+        self.env = environment or Environment(clock, utc_offset=utc_offset)
+        self.heap = Heap(self, heap_size, traced_heap)
+        self.pins = {}
+        self.i2c_buses = {}
+        self.uart_lines = {}
+        self.onewire_buses = {}
+        self.adc_inputs = {}
+        self.listeners = []
+        self._timers = []
+        self._timers_seq = 0
+        self.wdt_timeout = wdt_timeout
+        self.wdt_enabled = False
+        self.wdt_fed = 0
+        # internal RTC: local epoch = clock.time() + rtc_offset, runs rtc_drift_ppm fast
+        self.rtc_offset = float(utc_offset)
+        self.rtc_drift_ppm = 0.0
+        self.rtc_synced = False
+        self.wlan_ssid = None
+        self.gsm_operator = 'MTS'
+
+    def emit(self, kind, **data):
+        "reports a board event (pin level change, reset, gc, ...) to the listeners"
+        for listener in self.listeners:
+            listener(kind, self.clock.monotonic(), data)
+
+    def call_at(self, when, callback):
+        "runs callback at clock.monotonic() == when (device models' own activity, scenario steps)"
+        self._timers_seq += 1
+        heapq.heappush(self._timers, (when, self._timers_seq, callback))
+
+    def run_due(self):
+        "runs due callbacks, returns the time of the next one or None"
+        while self._timers and self._timers[0][0] <= self.clock.monotonic():
+            heapq.heappop(self._timers)[2]()
+        return self._timers[0][0] if self._timers else None
+
+    # pins
+
+    def pin(self, number):
+        state = self.pins.get(number)
+        if not state:
+            state = self.pins[number] = PinState(number)
+        return state
+
+    def drive(self, number, level):
+        "device code drives an output pin"
+        state = self.pin(number)
+        state.driven = True
+        if state.level != level:
+            state.level = level
+            self.emit('pin', pin=number, level=level)
+            if level:
+                for bus in self.i2c_buses.values():
+                    if bus.scl == number and bus.stuck:
+                        bus.stuck -= 1
+
+    def level(self, number):
+        "pin level, SDA of a stuck I2C bus is held low"
+        for bus in self.i2c_buses.values():
+            if bus.sda == number and bus.stuck:
+                return 0
+        return self.pin(number).level
+
+    def set_input(self, number, level):
+        "external circuit changes an input pin level, fires its irq handler"
+        state = self.pin(number)
+        if state.level == level:
+            return
+        state.level = level
+        if state.handler and state.fires(level):
+            state.handler(state.irq_pin)
+
+    # buses
+
+    def i2c_bus(self, scl, sda):
+        bus = self.i2c_buses.get((scl, sda))
+        if not bus:
+            bus = self.i2c_buses[(scl, sda)] = I2CBus(scl, sda)
+        return bus
+
+    def uart_line(self, tx, rx):
+        line = self.uart_lines.get((tx, rx))
+        if not line:
+            line = self.uart_lines[(tx, rx)] = UartLine(tx, rx)
+        return line
+
+    def onewire_bus(self, pin):
+        bus = self.onewire_buses.get(pin)
+        if bus is None:
+            bus = self.onewire_buses[pin] = devices.OneWireBus()
+        return bus
+
+    # internal RTC
+
+    def rtc_time(self):
+        "internal RTC local epoch seconds"
+        return self.clock.time() + self.clock.monotonic() * self.rtc_drift_ppm / 1e6 + self.rtc_offset
+
+    def rtc_set(self, epoch):
+        self.rtc_offset = epoch - self.clock.time() - self.clock.monotonic() * self.rtc_drift_ppm / 1e6
+
+    # watchdog
+
+    def feed_watchdog(self):
+        self.wdt_fed = self.clock.monotonic()
+
+    def enable_watchdog(self):
+        self.wdt_enabled = True
+        self.feed_watchdog()
+
+    def check_watchdog(self):
+        if self.wdt_enabled and self.clock.monotonic() - self.wdt_fed > self.wdt_timeout:
+            from sim.runtime import MachineReset
+            raise MachineReset('watchdog')
+
+    def reset(self, reason):
+        "device reset: the chip peripherals return to defaults, external devices keep their state"
+        self.emit('reset', reason=reason)
+        self.wdt_enabled = False
+        for state in self.pins.values():
+            state.handler = None
+            state.trigger = 0
+            state.irq_pin = None
+            if state.driven:
+                state.driven = False
+                state.level = 1 if state.pull == PULL_UP else 0
+
+    @classmethod
+    def from_conf(cls, conf, clock, **kwargs):
+        "board with the device models the conf.json modules expect"
+        board = cls(clock, **kwargs)
+        modules = conf['modules']
+        if isinstance(modules, dict):
+            modules = [dict(module_conf, type=module_type) for module_type, module_conf in modules.items()]
+        i2c = [board.i2c_bus(bus['scl'], bus['sda']) for bus in conf.get('i2c') or []]
+        onewire = conf.get('ow') or []
+        for module_conf in modules:
+            module_type = module_conf.get('type')
+            if module_type in ('climate', 'power_monitor'):
+                for idx, sensor_device_conf in enumerate(module_conf.get('sensor_devices') or []):
+                    board.attach_sensor_device(sensor_device_conf, i2c, onewire, idx)
+            elif module_type == 'rtc':
+                bus = i2c[module_conf['i2c']]
+                if devices.DS3231.ADDRESS not in bus.devices:
+                    bus.attach(devices.DS3231(board))
+            if module_conf.get('power_monitor'):
+                pm_conf = module_conf['power_monitor']
+                motor_pin = module_conf.get('pin')
+                i2c[pm_conf['i2c']].attach(devices.INA219(board, pm_conf['shunt_ohms'],
+                    load=lambda pin=motor_pin: board.env.motor_current() if board.pin(pin).level else 0.0))
+            elif module_conf.get('current_sense'):
+                motor_pin = module_conf.get('pin')
+                board.attach_current_sense(module_conf['current_sense'],
+                    lambda pin=motor_pin: board.env.motor_current() if board.pin(pin).level else 0.0)
+        return board
+
+    def attach_sensor_device(self, conf, i2c, onewire, idx=0):
+        sensor_type = conf['type']
+        if sensor_type in I2C_ADDRESSES:
+            bus = i2c[conf['i2c']]
+            if I2C_ADDRESSES[sensor_type] in bus.devices:
+                return
+            if sensor_type == 'bme280':
+                bus.attach(devices.BME280(self, place=idx))
+            elif sensor_type == 'aht20':
+                bus.attach(devices.AHT20(self, place=idx))
+            elif sensor_type == 'ccs811':
+                bus.attach(devices.CCS811(self, int_pin=conf.get('int_pin')))
+        elif sensor_type == 'ds18x20':
+            if conf['ow'] < len(onewire) and onewire[conf['ow']] is not None:
+                bus = self.onewire_bus(onewire[conf['ow']])
+                for _ in range(max(len(conf['sensors_ids']) - len(bus), 0)):
+                    bus.append(devices.DS18X20(self, serial=len(bus) + 1 + 16 * onewire[conf['ow']],
+                        place=idx + len(bus)))
+        elif sensor_type == 'mq135':
+            self.adc_inputs[conf['pin']] = devices.MQ135(self)
+        elif sensor_type == 'adc_current':
+            self.attach_current_sense(conf, lambda phase=idx: self.env.mains_current(phase))
+        elif sensor_type == 'pzem004t':
+            line = self.uart_line(conf['uart']['tx'], conf['uart']['rx'])
+            line.devices.append(devices.PZEM004T(self, address=conf.get('address', 0x01), phase=idx))
+
+    def attach_current_sense(self, conf, load):
+        kwargs = {key: conf[key] for key in ('zero', 'sensitivity') if key in conf}
+        self.adc_inputs[conf['pin']] = devices.CurrentSense(self, load, **kwargs)
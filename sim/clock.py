@@ -0,0 +1,54 @@
+"""Sim clock: the time base behind utime, machine.RTC, device models and the event loop."""
+import time
+
+class Clock:
+    """follows host time; blocking sleeps of the device code (utime.sleep during boot,
+    UART reads waiting for a reply) move the clock forward instead of blocking the host"""
+
+    def __init__(self, epoch=None):
+        self._start = time.monotonic()
+        self._skipped = 0.0
+        self.epoch = time.time() if epoch is None else epoch
+
+    def monotonic(self):
+        "seconds since the start of the run"
+        return time.monotonic() - self._start + self._skipped
+
+    def time(self):
+        "UTC epoch seconds"
+        return self.epoch + self.monotonic()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self._skipped += seconds
+
+    def idle(self, timeout, poll, io_pending=False):
+        """event loop has nothing to run for timeout seconds (None - until IO)
+        poll(timeout) waits for IO at most timeout host seconds and tells if any is ready
+        io_pending - device network exchanges are in flight"""
+        poll(timeout)
+
+IO_WAIT = 5.0
+
+class VirtualClock(Clock):
+    """runs ahead of host time: blocking sleeps and idle event loop waits jump straight
+    to their deadline, device code runs in no time. Network exchanges in flight are
+    waited for in host time with the clock stopped, so runs are repeatable; after
+    IO_WAIT host seconds without an answer the clock moves on and device timeouts fire"""
+
+    def __init__(self, epoch=None):
+        Clock.__init__(self, epoch)
+        self._now = 0.0
+
+    def monotonic(self):
+        return self._now
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self._now += seconds
+
+    def idle(self, timeout, poll, io_pending=False):
+        if poll(IO_WAIT if io_pending else 0):
+            return
+        if timeout is not None:
+            self._now += timeout
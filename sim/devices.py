@@ -0,0 +1,720 @@
+"""Behavioural models of the chips the device talks to.
+
+I2C chips answer register transfers the way the datasheets describe them,
+DS18x20 probes take part in 1-Wire bus transactions and PZEM-004T meters
+answer Modbus-RTU frames with proper CRCs. Measured values come from the
+board environment at the time a conversion is made.
+"""
+import calendar
+import math
+import struct
+import time
+
+def _crc8_dallas_table():
+    table = []
+    for byte in range(256):
+        crc = 0
+        for _ in range(8):
+            mix = (crc ^ byte) & 1
+            crc >>= 1
+            if mix:
+                crc ^= 0x8C
+            byte >>= 1
+        table.append(crc)
+    return bytes(table)
+
+_CRC8_DALLAS = _crc8_dallas_table()
+
+def crc8_dallas(data):
+    "1-Wire CRC (x^8 + x^5 + x^4 + 1, reflected), every probe scratchpad read is checked"
+    crc = 0
+    for byte in data:
+        crc = _CRC8_DALLAS[crc ^ byte]
+    return crc
+
+def crc8_aht(data):
+    "AHT20 CRC (x^8 + x^5 + x^4 + 1, init 0xFF)"
+    crc = 0xFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x31) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+def crc16_modbus(data):
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+    return crc
+
+def bcd(value):
+    return ((value // 10) << 4) | (value % 10)
+
+def from_bcd(value):
+    return (value >> 4) * 10 + (value & 0x0F)
+
+class I2CDevice:
+    """register file chip: the first written byte selects a register,
+    reads and writes auto-increment the register pointer"""
+
+    ADDRESS = None
+
+    def __init__(self, board, address=None):
+        self.board = board
+        self.address = address or self.ADDRESS
+        self.ptr = 0
+        self.regs = bytearray(256)
+
+    @property
+    def now(self):
+        return self.board.clock.monotonic()
+
+    def begin(self):
+        "start of a bus transfer addressed to the chip"
+
+    def write(self, data):
+        if not data:
+            return
+        self.ptr = data[0]
+        for value in data[1:]:
+            self.write_reg(self.ptr, value)
+            self.ptr = (self.ptr + 1) & 0xFF
+
+    def read(self, count):
+        result = bytearray(count)
+        for idx in range(count):
+            result[idx] = self.read_reg(self.ptr)
+            self.ptr = (self.ptr + 1) & 0xFF
+        return bytes(result)
+
+    def read_reg(self, reg):
+        return self.regs[reg]
+
+    def write_reg(self, reg, value):
+        self.regs[reg] = value
+
+class BME280(I2CDevice):
+    "BME280 with the datasheet example trimming, forced and normal modes"
+
+    ADDRESS = 0x76
+    CHIP_ID = 0x60
+    TRIM_T = (27504, 26435, -1000)
+    TRIM_P = (36477, -10685, 3024, 2855, 140, -7, 15500, -14600, 6000)
+    TRIM_H = (75, 362, 0, 313, 50, 30)
+    OVERSAMPLING = (0, 1, 2, 4, 8, 16, 16, 16)
+
+    def __init__(self, board, address=None, place=0):
+        I2CDevice.__init__(self, board, address)
+        self.place = place
+        self.conversions = 0
+        self._converting = False
+        self._ready_at = 0
+        self._sample = None
+        self.regs[0xD0] = self.CHIP_ID
+        struct.pack_into('<HhhHhhhhhhhh', self.regs, 0x88, *(self.TRIM_T + self.TRIM_P))
+        h1, h2, h3, h4, h5, h6 = self.TRIM_H
+        self.regs[0xA1] = h1
+        struct.pack_into('<hB', self.regs, 0xE1, h2, h3)
+        self.regs[0xE4] = (h4 >> 4) & 0xFF
+        self.regs[0xE5] = (h4 & 0x0F) | ((h5 & 0x0F) << 4)
+        self.regs[0xE6] = (h5 >> 4) & 0xFF
+        struct.pack_into('<b', self.regs, 0xE7, h6)
+        self.regs[0xF7:0xFF] = bytes((0x80, 0, 0, 0x80, 0, 0, 0x80, 0))
+
+    def _compensate_t(self, adc):
+        t1, t2, t3 = self.TRIM_T
+        var1 = (((adc >> 3) - (t1 << 1)) * t2) >> 11
+        var2 = (((((adc >> 4) - t1) * ((adc >> 4) - t1)) >> 12) * t3) >> 14
+        t_fine = var1 + var2
+        return (t_fine * 5 + 128) >> 8, t_fine
+
+    def _compensate_p(self, adc, t_fine):
+        p1, p2, p3, p4, p5, p6, p7, p8, p9 = self.TRIM_P
+        var1 = t_fine - 128000
+        var2 = var1 * var1 * p6
+        var2 = var2 + ((var1 * p5) << 17)
+        var2 = var2 + (p4 << 35)
+        var1 = ((var1 * var1 * p3) >> 8) + ((var1 * p2) << 12)
+        var1 = (((1 << 47) + var1) * p1) >> 33
+        if var1 == 0:
+            return 0
+        p = 1048576 - adc
+        p = (((p << 31) - var2) * 3125) // var1
+        var1 = (p9 * (p >> 13) * (p >> 13)) >> 25
+        var2 = (p8 * p) >> 19
+        return ((p + var1 + var2) >> 8) + (p7 << 4)
+
+    def _compensate_h(self, adc, t_fine):
+        h1, h2, h3, h4, h5, h6 = self.TRIM_H
+        v = t_fine - 76800
+        v = (((((adc << 14) - (h4 << 20) - (h5 * v)) + 16384) >> 15) *
+            (((((((v * h6) >> 10) * (((v * h3) >> 11) + 32768)) >> 10) + 2097152) * h2 + 8192) >> 14))
+        v = v - (((((v >> 15) * (v >> 15)) >> 7) * h1) >> 4)
+        v = min(max(v, 0), 419430400)
+        return v >> 12
+
+    @staticmethod
+    def _search(func, target, bits, increasing=True, hint=None):
+        """raw ADC value the compensation formula maps closest to target;
+        hint - the value of the last conversion, the range is narrowed around it first"""
+        low, high = 0, (1 << bits) - 1
+        if hint is not None:
+            below = lambda adc: (func(adc) < target) == increasing
+            step = 1
+            if below(hint):
+                low = min(hint + 1, high)
+                while hint + step < high:
+                    if not below(hint + step):
+                        high = hint + step
+                        break
+                    low = hint + step + 1
+                    step <<= 1
+            else:
+                high = hint
+                while hint - step > low:
+                    if below(hint - step):
+                        low = hint - step + 1
+                        break
+                    high = hint - step
+                    step <<= 1
+        while low < high:
+            mid = (low + high) // 2
+            if (func(mid) < target) == increasing:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def _measure(self):
+        "raw ADC values of the current environment (20 bit T/P, 16 bit H)"
+        env = self.board.env
+        hint_t, hint_p, hint_h = self._sample or (None, None, None)
+        adc_t = self._search(lambda adc: self._compensate_t(adc)[0], round(env.temperature(self.place) * 100), 20,
+            hint=hint_t)
+        t_fine = self._compensate_t(adc_t)[1]
+        adc_p = self._search(lambda adc: self._compensate_p(adc, t_fine), round(env.pressure() * 256), 20,
+            increasing=False, hint=hint_p)
+        adc_h = self._search(lambda adc: self._compensate_h(adc, t_fine), round(env.humidity(self.place) * 1024), 16,
+            hint=hint_h)
+        return adc_t, adc_p, adc_h
+
+    def _measurement_time(self):
+        osrs_t = self.OVERSAMPLING[self.regs[0xF4] >> 5]
+        osrs_p = self.OVERSAMPLING[(self.regs[0xF4] >> 2) & 7]
+        osrs_h = self.OVERSAMPLING[self.regs[0xF2] & 7]
+        return (1.25 + 2.3 * osrs_t + (2.3 * osrs_p + 0.575 if osrs_p else 0) +
+            (2.3 * osrs_h + 0.575 if osrs_h else 0)) / 1000
+
+    def _start(self):
+        self._converting = True
+        self._ready_at = self.now + self._measurement_time()
+        self._sample = self._measure()
+        self.conversions += 1
+
+    def _update(self):
+        if self._converting and self.now >= self._ready_at:
+            self._converting = False
+            adc_t, adc_p, adc_h = self._sample
+            ctrl = self.regs[0xF4]
+            if not ctrl >> 5:
+                adc_t = 0x80000
+            if not (ctrl >> 2) & 7:
+                adc_p = 0x80000
+            if not self.regs[0xF2] & 7:
+                adc_h = 0x8000
+            self.regs[0xF7:0xFF] = bytes((adc_p >> 12, (adc_p >> 4) & 0xFF, (adc_p & 0x0F) << 4,
+                adc_t >> 12, (adc_t >> 4) & 0xFF, (adc_t & 0x0F) << 4, adc_h >> 8, adc_h & 0xFF))
+            if ctrl & 3 == 3:
+                self._start()
+            else:
+                self.regs[0xF4] &= 0xFC
+
+    def begin(self):
+        self._update()
+
+    def read_reg(self, reg):
+        if reg == 0xF3:
+            return 0x08 if self._converting and self.now < self._ready_at else 0
+        return self.regs[reg]
+
+    def write_reg(self, reg, value):
+        if reg == 0xE0:
+            if value == 0xB6:
+                self.regs[0xF2] = self.regs[0xF4] = self.regs[0xF5] = 0
+                self._converting = False
+            return
+        if reg in (0xD0, 0xF3) or 0xF7 <= reg:
+            return
+        self.regs[reg] = value
+        if reg == 0xF4 and value & 3:
+            self._start()
+
+class AHT20(I2CDevice):
+    "AHT20 command interface: trigger 0xAC, 80 ms conversion, status + 5 data bytes + CRC"
+
+    ADDRESS = 0x38
+    CONVERSION_TIME = 0.08
+
+    def __init__(self, board, address=None, place=0):
+        I2CDevice.__init__(self, board, address)
+        self.place = place
+        self.conversions = 0
+        self.calibrated = True
+        self._busy_until = 0
+        self._data = bytes(5)
+
+    def write(self, data):
+        if not data:
+            return
+        cmd = data[0]
+        if cmd == 0xBA:
+            self._busy_until = self.now + 0.02
+        elif cmd in (0xBE, 0xE1):
+            self.calibrated = True
+            self._busy_until = self.now + 0.01
+        elif cmd == 0xAC:
+            env = self.board.env
+            humid = min(int(env.humidity(self.place) / 100 * 0x100000), 0xFFFFF)
+            temp = min(max(int((env.temperature(self.place) + 50) / 200 * 0x100000), 0), 0xFFFFF)
+            self._data = bytes((humid >> 12, (humid >> 4) & 0xFF, ((humid & 0x0F) << 4) | (temp >> 16),
+                (temp >> 8) & 0xFF, temp & 0xFF))
+            self._busy_until = self.now + self.CONVERSION_TIME
+            self.conversions += 1
+
+    def read(self, count):
+        status = (0x80 if self.now < self._busy_until else 0) | (0x08 if self.calibrated else 0) | 0x10
+        frame = bytes((status,)) + self._data
+        frame += bytes((crc8_aht(frame),))
+        return frame[:count] + bytes(max(count - len(frame), 0))
+
+class CCS811(I2CDevice):
+    """CCS811 mailbox registers in application mode; DATA_READY follows the drive mode,
+    a learned baseline converges to the chip's true one unless it is written back"""
+
+    ADDRESS = 0x5A
+    HW_ID = 0x81
+    DRIVE_PERIODS = {1: 1.0, 2: 10.0, 3: 60.0, 4: 0.25}
+    TRUE_BASELINE = 0x847B
+    BURN_IN_OFFSET = 0x0600
+    LEARNING_TIME = 3600.0
+
+    def __init__(self, board, address=None, int_pin=None):
+        I2CDevice.__init__(self, board, address)
+        self.int_pin = int_pin
+        self.env_writes = 0
+        self.baseline_writes = 0
+        self.samples = 0
+        self.power_on()
+
+    def power_on(self):
+        self.app_mode = False
+        self.meas_mode = 0
+        self.data_ready = False
+        self.result = bytes(8)
+        self.env_data = None
+        self._next_sample = None
+        self._baseline = self.TRUE_BASELINE + self.BURN_IN_OFFSET
+        self._baseline_at = self.now
+
+    @property
+    def baseline(self):
+        "the learned baseline approaches the true one exponentially"
+        decay = math.exp(-(self.now - self._baseline_at) / self.LEARNING_TIME)
+        return int(self.TRUE_BASELINE + (self._baseline - self.TRUE_BASELINE) * decay)
+
+    def _set_baseline(self, value):
+        self._baseline = value
+        self._baseline_at = self.now
+
+    def _period(self):
+        return self.DRIVE_PERIODS.get((self.meas_mode >> 4) & 7)
+
+    def _schedule(self):
+        period = self._period()
+        if period is None:
+            self._next_sample = None
+            return
+        self._next_sample = self.now + period
+        self.board.call_at(self._next_sample, self._sample)
+
+    def _sample(self):
+        if self._next_sample is None or self.now < self._next_sample - 1e-9:
+            return
+        env = self.board.env
+        error = (self.baseline - self.TRUE_BASELINE) / 4
+        eco2 = min(max(int(env.co2() + error), 400), 8192)
+        tvoc = min(max(int(env.tvoc() + error / 5), 0), 1187)
+        self.result = struct.pack('>HHBBH', eco2, tvoc, self._status(), 0, 0)
+        self.data_ready = True
+        self.samples += 1
+        if self.int_pin is not None and self.meas_mode & 0x08:
+            self.board.set_input(self.int_pin, 0)
+        self._schedule()
+
+    def _status(self):
+        return (0x80 if self.app_mode else 0) | 0x10 | (0x08 if self.data_ready else 0)
+
+    def write(self, data):
+        if not data:
+            return
+        self.ptr = data[0]
+        payload = data[1:]
+        if self.ptr == 0xF4 and not payload:
+            self.app_mode = True
+        elif self.ptr == 0x01 and payload and self.app_mode:
+            changed = payload[0] != self.meas_mode
+            self.meas_mode = payload[0]
+            if changed:
+                self._schedule()
+        elif self.ptr == 0x05 and len(payload) >= 4:
+            self.env_data = bytes(payload[:4])
+            self.env_writes += 1
+        elif self.ptr == 0x11 and len(payload) >= 2:
+            self._set_baseline((payload[0] << 8) | payload[1])
+            self.baseline_writes += 1
+        elif self.ptr == 0xFF and bytes(payload[:4]) == b'\x11\xe5\x72\x8a':
+            self.power_on()
+
+    def read(self, count):
+        reg = self.ptr
+        if reg == 0x00:
+            data = bytes((self._status(),))
+        elif reg == 0x01:
+            data = bytes((self.meas_mode,))
+        elif reg == 0x02:
+            data = self.result[:4] + bytes((self._status(),)) + self.result[5:]
+            self.data_ready = False
+            if self.int_pin is not None:
+                self.board.set_input(self.int_pin, 1)
+        elif reg == 0x11:
+            baseline = self.baseline
+            data = bytes((baseline >> 8, baseline & 0xFF))
+        elif reg == 0x20:
+            data = bytes((self.HW_ID,))
+        elif reg == 0x21:
+            data = b'\x12'
+        else:
+            data = b''
+        return data[:count] + bytes(max(count - len(data), 0))
+
+class DS3231(I2CDevice):
+    "DS3231 time registers (BCD, 24 h, century bit), control/status and temperature"
+
+    ADDRESS = 0x68
+
+    def __init__(self, board, address=None, drift_ppm=0.0):
+        I2CDevice.__init__(self, board, address)
+        self.drift_ppm = drift_ppm
+        self._offset = board.utc_offset
+        self.regs[0x0E] = 0x1C
+
+    def epoch(self):
+        "local epoch seconds kept by the chip"
+        clock = self.board.clock
+        return clock.time() + clock.monotonic() * self.drift_ppm / 1e6 + self._offset
+
+    def set_epoch(self, epoch):
+        clock = self.board.clock
+        self._offset = epoch - clock.time() - clock.monotonic() * self.drift_ppm / 1e6
+
+    def begin(self):
+        "time registers are copied to the user buffer at the start of a transfer"
+        tm = time.gmtime(int(self.epoch()))
+        year = tm.tm_year
+        self.regs[0:7] = bytes((bcd(tm.tm_sec), bcd(tm.tm_min), bcd(tm.tm_hour), tm.tm_wday + 1,
+            bcd(tm.tm_mday), bcd(tm.tm_mon) | (0x80 if year >= 2000 else 0), bcd(year % 100)))
+        temp = round(self.board.env.temperature() * 4)
+        self.regs[0x11] = (temp >> 2) & 0xFF
+        self.regs[0x12] = (temp & 3) << 6
+
+    def write(self, data):
+        I2CDevice.write(self, data)
+        if len(data) > 1 and data[0] < 7:
+            regs = self.regs
+            hour = regs[2]
+            if hour & 0x40:
+                hour = from_bcd(hour & 0x1F) % 12 + (12 if hour & 0x20 else 0)
+            else:
+                hour = from_bcd(hour & 0x3F)
+            year = from_bcd(regs[6]) + (2000 if regs[5] & 0x80 else 1900)
+            fraction = self.epoch() % 1 if data[0] else 0
+            self.set_epoch(calendar.timegm((year, from_bcd(regs[5] & 0x1F), from_bcd(regs[4]), hour,
+                from_bcd(regs[1]), from_bcd(regs[0]))) + fraction)
+            self.regs[0x0F] &= 0x7F
+
+class INA219(I2CDevice):
+    "INA219 16 bit big-endian registers; shunt voltage and bus voltage follow the load"
+
+    ADDRESS = 0x40
+
+    def __init__(self, board, shunt_ohms, address=None, load=None, bus_voltage=12.0):
+        I2CDevice.__init__(self, board, address)
+        self.shunt_ohms = shunt_ohms
+        self.load = load or (lambda: 0.0)
+        self.bus_voltage = bus_voltage
+        self.words = {0x00: 0x399F, 0x05: 0}
+
+    def _word(self, reg):
+        if reg in (0x00, 0x05):
+            return self.words[reg]
+        current = self.load()
+        shunt = max(min(int(round(current * self.shunt_ohms / 10e-6)), 32767), -32768)
+        if reg == 0x01:
+            return shunt & 0xFFFF
+        bus = int(round((self.bus_voltage - current * 0.05) / 0.004))
+        if reg == 0x02:
+            return ((bus << 3) | 0x02) & 0xFFFF
+        calibration = self.words[0x05]
+        current_reg = max(min(shunt * calibration // 4096, 32767), -32768)
+        if reg == 0x04:
+            return current_reg & 0xFFFF
+        if reg == 0x03:
+            return (abs(current_reg) * bus // 5000) & 0xFFFF
+        return 0
+
+    def write(self, data):
+        if not data:
+            return
+        self.ptr = data[0]
+        if len(data) >= 3 and self.ptr in (0x00, 0x05):
+            self.words[self.ptr] = (data[1] << 8) | data[2]
+
+    def read(self, count):
+        word = self._word(self.ptr)
+        data = bytes((word >> 8, word & 0xFF))
+        return data[:count] + bytes(max(count - len(data), 0))
+
+class MQ135(object):
+    "MQ135 module analog output (10k load) for the environment CO2, an ADC input source"
+
+    RLOAD = 10.0
+    RZERO = 76.63
+    PARA = 116.6020682
+    PARB = 2.769034857
+
+    def __init__(self, board):
+        self.board = board
+
+    def __call__(self):
+        env = self.board.env
+        resistance = self.RZERO * math.pow(env.co2() / self.PARA, -1 / self.PARB)
+        # the firmware scales 10 bit 11 dB readings by 1.44
+        return 3.9 / 1.44 * self.RLOAD / (resistance + self.RLOAD) + env.adc_noise()
+
+class CurrentSense(object):
+    "hall effect current sensor output, an ADC input source; load - A"
+
+    def __init__(self, board, load, zero=1.65, sensitivity=0.122):
+        self.board = board
+        self.load = load
+        self.zero = zero
+        self.sensitivity = sensitivity
+
+    def __call__(self):
+        return self.zero + self.load() * self.sensitivity + self.board.env.adc_noise()
+
+class OneWireBus:
+    """1-Wire transactions between a reset and the next one: ROM command
+    (skip, match, read), then function command of the selected probes"""
+
+    def __init__(self):
+        self.devices = []
+        self._selected = []
+        self._state = 'idle'
+        self._match = b''
+        self._out = b''
+        self._write = None
+
+    def __len__(self):
+        return len(self.devices)
+
+    def append(self, device):
+        self.devices.append(device)
+
+    def reset(self):
+        "returns presence pulse"
+        self._state = 'rom'
+        self._selected = []
+        self._out = b''
+        return bool(self.devices)
+
+    def roms(self):
+        return [device.rom for device in self.devices]
+
+    def write_byte(self, value):
+        if self._state == 'rom':
+            if value == 0xCC:
+                self._selected = list(self.devices)
+                self._state = 'function'
+            elif value == 0x55:
+                self._match = b''
+                self._state = 'match'
+            elif value == 0x33 and len(self.devices) == 1:
+                self._selected = list(self.devices)
+                self._out = self.devices[0].rom
+                self._state = 'function'
+        elif self._state == 'match':
+            self._match += bytes((value,))
+            if len(self._match) == 8:
+                self._selected = [device for device in self.devices if device.rom == self._match]
+                self._state = 'function'
+        elif self._state == 'function':
+            self._out = b''
+            if value == 0x44:
+                for device in self._selected:
+                    device.convert()
+                self._state = 'convert'
+            elif value == 0xBE and self._selected:
+                self._out = bytes(self._and(device.scratchpad() for device in self._selected))
+                self._state = 'read'
+            elif value == 0x4E:
+                self._write = bytearray()
+                self._state = 'write'
+            elif value == 0xB4:
+                self._out = b'\xff'
+        elif self._state == 'write':
+            self._write.append(value)
+            if len(self._write) == 3:
+                for device in self._selected:
+                    device.write_scratchpad(self._write)
+                self._state = 'idle'
+
+    @staticmethod
+    def _and(frames):
+        "open drain bus: simultaneous answers are wired-AND"
+        result = None
+        for frame in frames:
+            result = frame if result is None else bytes(a & b for a, b in zip(result, frame))
+        return result or b''
+
+    def read_byte(self):
+        if self._out:
+            value, self._out = self._out[0], self._out[1:]
+            return value
+        if self._state == 'convert':
+            return 0xFF if all(device.ready() for device in self._selected) else 0x00
+        return 0xFF
+
+class DS18X20(object):
+    "DS18B20 probe: 64 bit ROM, scratchpad with resolution config, 85 C power-on value"
+
+    FAMILY = 0x28
+
+    def __init__(self, board, serial, place=0):
+        self.board = board
+        self.place = place
+        rom = bytes((self.FAMILY,)) + serial.to_bytes(6, 'little')
+        self.rom = rom + bytes((crc8_dallas(rom),))
+        self.conversions = 0
+        self._pad = bytearray((0x50, 0x05, 0x4B, 0x46, 0x7F, 0xFF, 0x0C, 0x10))
+        self._ready_at = 0
+        self._sample = None
+
+    @property
+    def now(self):
+        return self.board.clock.monotonic()
+
+    @property
+    def resolution(self):
+        return 9 + ((self._pad[4] >> 5) & 3)
+
+    def conversion_time(self):
+        return 0.09375 * (1 << (self.resolution - 9))
+
+    def convert(self):
+        temp = self.board.env.temperature(self.place)
+        raw = int(round(temp * 16)) & ~((1 << (12 - self.resolution)) - 1)
+        self._sample = raw
+        self._ready_at = self.now + self.conversion_time()
+        self.conversions += 1
+
+    def ready(self):
+        return self.now >= self._ready_at
+
+    def _update(self):
+        if self._sample is not None and self.ready():
+            struct.pack_into('<h', self._pad, 0, self._sample)
+            self._sample = None
+
+    def scratchpad(self):
+        self._update()
+        return bytes(self._pad) + bytes((crc8_dallas(self._pad),))
+
+    def write_scratchpad(self, data):
+        self._pad[2] = data[0]
+        self._pad[3] = data[1]
+        self._pad[4] = (data[2] & 0x60) | 0x1F
+
+class PZEM004T(object):
+    "PZEM-004T v3 Modbus-RTU slave: input registers 0-9, slave address in holding register 2"
+
+    BROADCAST = 0xF8
+    LATENCY = 0.02
+
+    def __init__(self, board, address=0x01, phase=0):
+        self.board = board
+        self.address = address
+        self.phase = phase
+        self.alarm_threshold = 2300
+        self.frames = 0
+        self.crc_errors = 0
+        self._energy = 0.0
+        self._energy_at = board.clock.monotonic()
+
+    def _measure(self):
+        env = self.board.env
+        now = self.board.clock.monotonic()
+        voltage = env.mains_voltage()
+        current = env.mains_current(self.phase)
+        pf = 0.92
+        power = voltage * current * pf
+        self._energy += power * (now - self._energy_at) / 3600
+        self._energy_at = now
+        return voltage, current, power, env.mains_frequency(), pf
+
+    def _registers(self):
+        voltage, current, power, frequency, pf = self._measure()
+        current, power, energy = int(current * 1000), int(power * 10), int(self._energy)
+        return (int(voltage * 10), current & 0xFFFF, current >> 16, power & 0xFFFF, power >> 16,
+            energy & 0xFFFF, energy >> 16, int(frequency * 10), int(pf * 100),
+            0xFFFF if power / 10 > self.alarm_threshold else 0)
+
+    def _frame(self, body):
+        crc = crc16_modbus(body)
+        return bytes(body) + bytes((crc & 0xFF, crc >> 8))
+
+    def receive(self, frame):
+        "returns (reply bytes, latency seconds) or None"
+        if len(frame) < 4 or frame[0] not in (self.address, self.BROADCAST):
+            return None
+        self.frames += 1
+        if crc16_modbus(frame[:-2]) != frame[-2] | (frame[-1] << 8):
+            self.crc_errors += 1
+            return None
+        func = frame[1]
+        if func in (0x03, 0x04) and len(frame) == 8:
+            start, count = struct.unpack('>HH', frame[2:6])
+            if func == 0x04:
+                regs = self._registers()
+            else:
+                regs = (0, self.alarm_threshold, self.address)
+            if not count or start + count > len(regs):
+                return self._frame((self.address, func | 0x80, 0x02)), self.LATENCY
+            body = struct.pack('>BBB%dH' % count, self.address, func, count * 2, *regs[start:start + count])
+            return self._frame(body), self.LATENCY
+        if func == 0x06 and len(frame) == 8:
+            reg, value = struct.unpack('>HH', frame[2:6])
+            if reg == 0x0002 and 1 <= value <= 0xF7:
+                reply = self._frame(frame[:6])
+                self.address = value
+                return reply, self.LATENCY
+            if reg == 0x0001:
+                self.alarm_threshold = value
+                return self._frame(frame[:6]), self.LATENCY
+            return self._frame((self.address, func | 0x80, 0x02)), self.LATENCY
+        if func == 0x42 and len(frame) == 4:
+            self._energy = 0.0
+            return self._frame((self.address, 0x42)), self.LATENCY
+        return self._frame((self.address, func | 0x80, 0x01)), self.LATENCY
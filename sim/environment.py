@@ -0,0 +1,65 @@
+"""Physical surroundings the device models measure: daily climate cycles and
+mains/motor loads as functions of the sim clock, with a little noise."""
+import math
+import random
+
+DAY = 86400
+
+class Environment:
+
+    def __init__(self, clock, seed=0, utc_offset=3 * 3600):
+        self._clock = clock
+        self._random = random.Random(seed)
+        self._utc_offset = utc_offset
+
+    def _day_phase(self):
+        "0 at local midnight, 1 at the next one"
+        return ((self._clock.time() + self._utc_offset) % DAY) / DAY
+
+    def _noise(self, amplitude):
+        return self._random.uniform(-amplitude, amplitude)
+
+    def temperature(self, place=0):
+        "degrees C, coldest before dawn; place shifts the level a bit per sensor"
+        return 20 + place * 1.5 + 4 * math.sin(2 * math.pi * (self._day_phase() - 0.375)) + self._noise(0.05)
+
+    def humidity(self, place=0):
+        "%RH, opposite to the temperature cycle"
+        value = 60 - place * 2 - 12 * math.sin(2 * math.pi * (self._day_phase() - 0.375)) + self._noise(0.3)
+        return min(max(value, 0), 100)
+
+    def pressure(self):
+        "Pa, slow weather swing"
+        return 100500 + 600 * math.sin(2 * math.pi * self._clock.time() / (3.5 * DAY)) + self._noise(3)
+
+    def co2(self):
+        "ppm, higher while the room is occupied in the daytime"
+        return 500 + 350 * max(math.sin(2 * math.pi * (self._day_phase() - 0.25)), 0) + self._noise(10)
+
+    def tvoc(self):
+        "ppb"
+        return (self.co2() - 400) / 5
+
+    def mains_voltage(self):
+        return 228 + 5 * math.sin(2 * math.pi * self._day_phase()) + self._noise(0.5)
+
+    def mains_frequency(self):
+        return 50 + self._noise(0.05)
+
+    def mains_current(self, phase=0):
+        "A, evening peak of the household load"
+        return 1.5 + phase * 0.5 + 3 * max(math.sin(2 * math.pi * (self._day_phase() - 0.55)), 0) + self._noise(0.05)
+
+    def motor_current(self):
+        "A drawn by a running feeder/gate motor"
+        return 0.8 + self._noise(0.05)
+
+    def adc_noise(self):
+        "V of ESP32 ADC reading noise, a few readings are way off (WiFi bursts, motor switching)"
+        if self._random.random() < 0.03:
+            return self._random.choice((-0.6, 0.6))
+        return self._noise(0.005)
+
+    def analog(self, pin):
+        "V on an ADC input"
+        return 0.4 + 0.2 * math.sin(2 * math.pi * self._day_phase()) + self._noise(0.01)
@@ -0,0 +1,49 @@
+"""Suntime stand-in: sunrise/sunset by the Almanac for Computers algorithm,
+times are local tuples in utime.localtime() order for today's RTC date"""
+import math
+
+import utime
+
+ZENITH = 90.8333
+
+class SunTimeException(Exception):
+    pass
+
+class Sun:
+
+    def __init__(self, lat, lon, tz=0):
+        self._lat = lat
+        self._lon = lon
+        self._tz = tz
+
+    def _utc_hours(self, day_of_year, rise):
+        lng_hour = self._lon / 15
+        t = day_of_year + ((6 if rise else 18) - lng_hour) / 24
+        anomaly = 0.9856 * t - 3.289
+        longitude = (anomaly + 1.916 * math.sin(math.radians(anomaly)) +
+            0.020 * math.sin(2 * math.radians(anomaly)) + 282.634) % 360
+        ascension = math.degrees(math.atan(0.91764 * math.tan(math.radians(longitude)))) % 360
+        ascension = (ascension + (longitude // 90) * 90 - (ascension // 90) * 90) / 15
+        sin_dec = 0.39782 * math.sin(math.radians(longitude))
+        cos_dec = math.cos(math.asin(sin_dec))
+        cos_h = (math.cos(math.radians(ZENITH)) - sin_dec * math.sin(math.radians(self._lat))) /\
+            (cos_dec * math.cos(math.radians(self._lat)))
+        if not -1 <= cos_h <= 1:
+            raise SunTimeException('The sun never rises or sets on this location on this date')
+        hour_angle = (360 - math.degrees(math.acos(cos_h)) if rise else math.degrees(math.acos(cos_h))) / 15
+        return (hour_angle + ascension - 0.06571 * t - 6.622 - lng_hour) % 24
+
+    def _time(self, rise, date=None):
+        date = date or utime.localtime()
+        hours = (self._utc_hours(date[7], rise) + self._tz) % 24
+        minutes = int(round(hours * 60)) % 1440
+        return (date[0], date[1], date[2], minutes // 60, minutes % 60, 0, date[6], date[7])
+
+    def get_sunrise_time(self, date=None):
+        return self._time(True, date)
+
+    def get_sunset_time(self, date=None):
+        return self._time(False, date)
+
+    get_local_sunrise_time = get_sunrise_time
+    get_local_sunset_time = get_sunset_time
@@ -0,0 +1,46 @@
+"""gsm stand-in (LoBo PPPoS modem module): the modem registers with the
+board.gsm_operator network and the data link comes up on connect()"""
+import sim.runtime as runtime
+
+EXITED, CONNECTED, IDLE = 0, 1, 89
+
+_state = {'started': False, 'status': IDLE, 'apn': None}
+
+def debug(value):
+    pass
+
+def start(tx=None, rx=None, apn='', user='', password='', **kwargs):
+    _state['started'] = True
+    _state['status'] = IDLE
+    _state['apn'] = apn
+    runtime.clock.sleep(2)
+
+def stop():
+    _state['started'] = False
+    _state['status'] = EXITED
+
+def atcmd(cmd, timeout=500, response='OK', **kwargs):
+    "modem reply text or None when the modem is not started"
+    if not _state['started']:
+        runtime.clock.sleep(timeout / 1000)
+        return None
+    runtime.clock.sleep(0.05)
+    if cmd.upper().startswith('AT+COPS?'):
+        return '\r\n+COPS: 0,0,"%s"\r\n\r\nOK\r\n' % runtime.board.gsm_operator
+    return '\r\nOK\r\n'
+
+def connect():
+    if _state['started']:
+        runtime.clock.sleep(3)
+        _state['status'] = CONNECTED
+
+def disconnect():
+    if _state['status'] == CONNECTED:
+        _state['status'] = IDLE
+
+def status():
+    return (_state['status'], 'Connected' if _state['status'] == CONNECTED else 'Disconnected')
+
+def ifconfig():
+    return ('10.64.0.2', '255.255.255.255', '10.64.64.64') if _state['status'] == CONNECTED else\
+        ('0.0.0.0', '0.0.0.0', '0.0.0.0')
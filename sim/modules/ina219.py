@@ -0,0 +1,70 @@
+"""ina219 stand-in with the API of the pi-ina219 MicroPython port the device
+ships as ina219.mpy; registers are read over the machine.I2C stand-in"""
+
+RANGE_16V, RANGE_32V = 0, 1
+GAIN_1_40MV, GAIN_2_80MV, GAIN_4_160MV, GAIN_8_320MV, GAIN_AUTO = 0, 1, 2, 3, -1
+ADC_9BIT, ADC_10BIT, ADC_11BIT, ADC_12BIT = 0, 1, 2, 3
+
+_REG_CONFIG = 0x00
+_REG_SHUNTVOLTAGE = 0x01
+_REG_BUSVOLTAGE = 0x02
+_REG_POWER = 0x03
+_REG_CURRENT = 0x04
+_REG_CALIBRATION = 0x05
+_CALIBRATION_FACTOR = 0.04096
+_CURRENT_LSB = 0.0001
+
+class DeviceRangeError(Exception):
+    pass
+
+class INA219:
+
+    RANGE_16V, RANGE_32V = RANGE_16V, RANGE_32V
+    GAIN_1_40MV, GAIN_2_80MV, GAIN_4_160MV, GAIN_8_320MV, GAIN_AUTO =\
+        GAIN_1_40MV, GAIN_2_80MV, GAIN_4_160MV, GAIN_8_320MV, GAIN_AUTO
+    ADC_9BIT, ADC_10BIT, ADC_11BIT, ADC_12BIT = ADC_9BIT, ADC_10BIT, ADC_11BIT, ADC_12BIT
+
+    def __init__(self, shunt_ohms, i2c, max_expected_amps=None, address=0x40, log_level=None):
+        self._i2c = i2c
+        self._address = address
+        self._shunt_ohms = shunt_ohms
+        self._max_expected_amps = max_expected_amps
+
+    def _read(self, reg, signed=False):
+        return int.from_bytes(self._i2c.readfrom_mem(self._address, reg, 2), 'big', signed=signed)
+
+    def _write(self, reg, value):
+        self._i2c.writeto_mem(self._address, reg, value.to_bytes(2, 'big'))
+
+    def configure(self, voltage_range=RANGE_32V, gain=GAIN_AUTO, bus_adc=ADC_12BIT, shunt_adc=ADC_12BIT):
+        gain = GAIN_8_320MV if gain == GAIN_AUTO else gain
+        self._write(_REG_CALIBRATION, int(_CALIBRATION_FACTOR / (_CURRENT_LSB * self._shunt_ohms)))
+        self._write(_REG_CONFIG, (voltage_range << 13) | (gain << 11) | (bus_adc << 7) | (shunt_adc << 3) | 7)
+
+    def voltage(self):
+        "bus voltage, V"
+        return (self._read(_REG_BUSVOLTAGE) >> 3) * 0.004
+
+    def shunt_voltage(self):
+        "mV"
+        return self._read(_REG_SHUNTVOLTAGE, signed=True) * 0.01
+
+    def supply_voltage(self):
+        return self.voltage() + self.shunt_voltage() / 1000
+
+    def current(self):
+        "mA"
+        return self._read(_REG_CURRENT, signed=True) * _CURRENT_LSB * 1000
+
+    def power(self):
+        "mW"
+        return self._read(_REG_POWER) * _CURRENT_LSB * 20 * 1000
+
+    def sleep(self):
+        pass
+
+    def wake(self):
+        pass
+
+    def reset(self):
+        self._write(_REG_CONFIG, 0x8000)
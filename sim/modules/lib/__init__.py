@@ -0,0 +1 @@
+"stand-ins of the device lib/ packages that ship as .mpy"
@@ -0,0 +1,117 @@
+"""picoweb stand-in: the WebApp routing, request and response helpers main.py uses,
+served on runtime.http_address instead of the device address"""
+import json
+import logging
+
+import sim.runtime as runtime
+import lib.uasyncio as uasyncio
+
+LOG = logging.getLogger('picoweb')
+
+def get_mime_type(fname):
+    if fname.endswith('.html'):
+        return 'text/html'
+    if fname.endswith('.css'):
+        return 'text/css'
+    if fname.endswith('.js'):
+        return 'application/javascript'
+    if fname.endswith('.png') or fname.endswith('.jpg'):
+        return 'image'
+    return 'text/plain'
+
+async def start_response(writer, content_type='text/html; charset=utf-8', status='200', headers=None):
+    await writer.awrite(('HTTP/1.0 %s NA\r\n' % status).encode())
+    await writer.awrite(('Content-Type: %s\r\n' % content_type).encode())
+    for name, value in (headers or {}).items():
+        await writer.awrite(('%s: %s\r\n' % (name, value)).encode())
+    await writer.awrite(b'\r\n')
+
+async def http_error(writer, status):
+    await start_response(writer, status=status)
+    await writer.awrite(status.encode())
+
+class HTTPRequest:
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.method = None
+        self.path = None
+        self.qs = ''
+        self.headers = {}
+        self.url_match = None
+        self.json = None
+
+    async def read_json(self):
+        size = int(self.headers.get(b'Content-Length', 0))
+        data = await self.reader.readexactly(size)
+        self.json = json.loads(data)
+        return self.json
+
+class WebApp:
+
+    def __init__(self, pkg, routes=None, serve_static=True):
+        self.pkg = pkg
+        self.url_map = list(routes or [])
+        self.debug = False
+
+    def route(self, url, **kwargs):
+        def _route(func):
+            self.url_map.append((url, func, kwargs))
+            return func
+        return _route
+
+    def _find(self, path):
+        for pattern, handler, opts in self.url_map:
+            if isinstance(pattern, str):
+                if pattern == path:
+                    return handler, opts, None
+            else:
+                match = pattern.match(path)
+                if match:
+                    return handler, opts, match
+        return None, None, None
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+            method, path, _ = request_line.decode().split(None, 2)
+            req = HTTPRequest(reader)
+            req.method = method
+            req.path, _, req.qs = path.partition('?')
+            while True:
+                line = await reader.readline()
+                if not line or line == b'\r\n':
+                    break
+                name, value = line.split(b':', 1)
+                req.headers[name.strip()] = value.strip()
+            handler, opts, req.url_match = self._find(req.path)
+            if handler and method in opts.get('methods', (method,)):
+                await handler(req, writer)
+            else:
+                await http_error(writer, '404')
+        except Exception as exc:
+            LOG.exc(exc, 'Error handling request')
+            await http_error(writer, '500')
+        finally:
+            await writer.aclose()
+
+    async def sendfile(self, writer, fname, content_type=None, headers=None):
+        await start_response(writer, content_type or get_mime_type(fname), '200', headers)
+        with open(fname, 'rb') as file:
+            while True:
+                buf = file.read(512)
+                if not buf:
+                    break
+                await writer.awrite(buf)
+
+    def run(self, host='127.0.0.1', port=8081, debug=False, lazy_init=False, log=None):
+        """serves on runtime.http_address, device host and port are ignored;
+        without an address only the event loop runs"""
+        self.debug = debug
+        loop = uasyncio.get_event_loop()
+        if runtime.http_address:
+            LOG.info('* Running on http://%s:%s/' % runtime.http_address)
+            loop.create_task(uasyncio.start_server(self._handle, *runtime.http_address))
+        loop.run_forever()
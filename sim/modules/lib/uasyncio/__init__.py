@@ -0,0 +1,467 @@
+"""uasyncio stand-in: the pfalcon uasyncio 2.x API the device code uses.
+
+Coroutines yield the same syscalls as on the device: sleep() yields int ms,
+sleep_ms() a SleepMs object, stream waits IORead/IOWrite. Timeouts are
+pending exceptions thrown into the task at its next resumption, exceptions
+other than CancelledError leave run_forever(). Waiting for timers, sockets,
+UARTs and board device activity goes through runtime.clock.idle().
+"""
+import errno
+import heapq
+import select
+import socket
+import types
+import weakref
+from collections import deque
+
+import sim.runtime as runtime
+
+READ_SIZE = 512
+
+_listening = weakref.WeakSet()
+
+class CancelledError(Exception):
+    pass
+
+class TimeoutError(CancelledError):
+    pass
+
+class SysCall:
+
+    def __init__(self, arg=None):
+        self.arg = arg
+
+    def __await__(self):
+        return (yield self)
+
+    __iter__ = __await__
+
+class SleepMs(SysCall):
+    pass
+
+class IORead(SysCall):
+    pass
+
+class IOWrite(SysCall):
+    pass
+
+class IOReadDone(SysCall):
+    pass
+
+class IOWriteDone(SysCall):
+    pass
+
+class Task:
+    """coroutine scheduled by the loop; token changes on every wake-up,
+    so timer entries of a task woken by an exception are ignored"""
+
+    def __init__(self, coro):
+        self.coro = coro
+        self.pending = None
+        self.wait = None
+        self.token = 0
+        self.done = False
+        self.result = None
+
+    def pend_throw(self, exc):
+        "throws exc into the task at its next resumption, wakes the task if it waits"
+        self.pending = exc
+        if self.wait is not None:
+            _event_loop._unpark(self)
+            _event_loop.call_soon(self)
+
+def _ready_at(obj, kind):
+    "time a simulated stream (UART) becomes readable/writable or None"
+    return obj.sim_ready_at(kind)
+
+class EventLoop:
+
+    def __init__(self):
+        self.runq = deque()
+        self.timers = []
+        self.readers = {}
+        self.writers = {}
+        self.cur_task = None
+        self._seq = 0
+
+    def time(self):
+        return int(runtime.clock.monotonic() * 1000)
+
+    def create_task(self, coro):
+        task = coro if isinstance(coro, Task) else Task(coro)
+        self.call_soon(task)
+        return task
+
+    def call_soon(self, callback, *args):
+        if not isinstance(callback, Task) and hasattr(callback, 'send'):
+            callback = Task(callback)
+        self.runq.append((callback, args))
+
+    def call_later_ms(self, delay, callback, *args):
+        self._seq += 1
+        heapq.heappush(self.timers, (runtime.clock.monotonic() + delay / 1000, self._seq, None, callback, args))
+
+    def call_later(self, delay, callback, *args):
+        self.call_later_ms(int(delay * 1000), callback, *args)
+
+    def call_at_(self, time, callback, *args):
+        self.call_later_ms(time - self.time(), callback, *args)
+
+    def _park_timer(self, task, delay):
+        task.token += 1
+        task.wait = ('timer',)
+        self._seq += 1
+        heapq.heappush(self.timers, (runtime.clock.monotonic() + delay, self._seq, task, task.token, ()))
+
+    def _park_io(self, task, waits, obj):
+        task.wait = ('io', waits, obj)
+        waits[obj] = task
+
+    def _unpark(self, task):
+        if task.wait and task.wait[0] == 'io':
+            task.wait[1].pop(task.wait[2], None)
+        task.wait = None
+        task.token += 1
+
+    def _step(self, task, args=()):
+        if task.done:
+            return
+        self.cur_task = task
+        try:
+            if task.pending is not None:
+                exc, task.pending = task.pending, None
+                ret = task.coro.throw(exc)
+            else:
+                ret = task.coro.send(args[0] if args else None)
+        except StopIteration as exc:
+            task.done = True
+            task.result = exc.value
+            return
+        except CancelledError:
+            task.done = True
+            return
+        except BaseException:
+            task.done = True
+            raise
+        finally:
+            self.cur_task = None
+        if ret is None:
+            self.call_soon(task)
+        elif ret is False:
+            # parked until someone call_soon()s the task (uasyncio.synchro style waits)
+            pass
+        elif isinstance(ret, (int, float)) and not isinstance(ret, bool):
+            self._park_timer(task, ret / 1000)
+        elif isinstance(ret, SleepMs):
+            self._park_timer(task, ret.arg / 1000)
+        elif isinstance(ret, IORead):
+            self._park_io(task, self.readers, ret.arg)
+        elif isinstance(ret, IOWrite):
+            self._park_io(task, self.writers, ret.arg)
+        elif isinstance(ret, (IOReadDone, IOWriteDone)):
+            self.call_soon(task)
+        elif isinstance(ret, Task) or hasattr(ret, 'send'):
+            self.create_task(ret)
+            self.call_soon(task)
+        else:
+            raise RuntimeError('Unsupported coroutine yield value: %r' % (ret,))
+
+    def _run_callback(self, callback, args):
+        if isinstance(callback, Task):
+            self._step(callback, args)
+        else:
+            callback(*args)
+
+    def _run_timers(self):
+        now = runtime.clock.monotonic()
+        while self.timers and self.timers[0][0] <= now:
+            _, _, task, data, args = heapq.heappop(self.timers)
+            if task is None:
+                self.runq.append((data, args))
+            elif task.token == data and task.wait:
+                task.wait = None
+                self.runq.append((task, ()))
+
+    def _wake(self, waits, obj):
+        task = waits.pop(obj)
+        task.wait = None
+        task.token += 1
+        self.runq.append((task, ()))
+
+    def _run_streams(self):
+        "wakes tasks waiting for simulated streams that became ready"
+        now = runtime.clock.monotonic()
+        for waits, kind in ((self.readers, 'r'), (self.writers, 'w')):
+            for obj in [obj for obj in waits if hasattr(obj, 'sim_ready_at')]:
+                ready_at = _ready_at(obj, kind)
+                if ready_at is not None and ready_at <= now:
+                    self._wake(waits, obj)
+
+    def _poll(self, timeout):
+        "select() on the sockets tasks wait for, timeout in host seconds or None"
+        readers = [obj for obj in self.readers if not hasattr(obj, 'sim_ready_at')]
+        writers = [obj for obj in self.writers if not hasattr(obj, 'sim_ready_at')]
+        if not readers and not writers:
+            return False
+        readable, writable, _ = select.select(readers, writers, [], timeout)
+        for obj in readable:
+            self._wake(self.readers, obj)
+        for obj in writable:
+            self._wake(self.writers, obj)
+        return bool(readable or writable)
+
+    def sockets_waiting(self):
+        return any(not hasattr(obj, 'sim_ready_at') for waits in (self.readers, self.writers) for obj in waits)
+
+    def io_pending(self):
+        "connections (not listening server sockets) are waited for"
+        return any(isinstance(obj, socket.socket) and obj not in _listening
+            for waits in (self.readers, self.writers) for obj in waits)
+
+    def _deadline(self, board_next):
+        deadlines = [board_next, runtime.stop_at]
+        if self.timers:
+            deadlines.append(self.timers[0][0])
+        for waits, kind in ((self.readers, 'r'), (self.writers, 'w')):
+            deadlines.extend(_ready_at(obj, kind) for obj in waits if hasattr(obj, 'sim_ready_at'))
+        board = runtime.board
+        if board.wdt_enabled:
+            deadlines.append(board.wdt_fed + board.wdt_timeout + 0.001)
+        deadlines = [deadline for deadline in deadlines if deadline is not None]
+        return min(deadlines) if deadlines else None
+
+    def _wait(self, board_next):
+        deadline = self._deadline(board_next)
+        if deadline is None and not self.sockets_waiting():
+            raise RuntimeError('event loop has nothing to wait for')
+        timeout = None if deadline is None else max(deadline - runtime.clock.monotonic(), 0)
+        runtime.clock.idle(timeout, self._poll, self.io_pending())
+
+    def _run_once(self):
+        runtime.tick()
+        board_next = runtime.board.run_due()
+        self._run_timers()
+        if self.readers or self.writers:
+            self._run_streams()
+            if self.sockets_waiting():
+                self._poll(0)
+        if not self.runq:
+            self._wait(board_next)
+            return
+        for _ in range(len(self.runq)):
+            callback, args = self.runq.popleft()
+            self._run_callback(callback, args)
+
+    def run_forever(self):
+        while True:
+            self._run_once()
+
+    def run_until_complete(self, coro):
+        task = self.create_task(coro)
+        while not task.done:
+            self._run_once()
+        return task.result
+
+    def close(self):
+        "closes the tasks left in the loop and the sockets they wait for"
+        tasks = [callback for callback, _ in self.runq if isinstance(callback, Task)]
+        tasks += [entry[2] for entry in self.timers if entry[2] is not None]
+        for waits in (self.readers, self.writers):
+            for obj, task in waits.items():
+                tasks.append(task)
+                if isinstance(obj, socket.socket):
+                    obj.close()
+            waits.clear()
+        for task in tasks:
+            task.coro.close()
+        self.runq.clear()
+        self.timers = []
+
+_event_loop = None
+
+def get_event_loop(runq_len=16, waitq_len=16):
+    global _event_loop
+    if _event_loop is None:
+        _event_loop = EventLoop()
+    return _event_loop
+
+@types.coroutine
+def sleep(secs):
+    yield int(secs * 1000)
+
+def sleep_ms(ms):
+    return SleepMs(ms)
+
+def cancel(task):
+    task.pend_throw(CancelledError())
+
+async def wait_for_ms(coro, timeout):
+    "awaits coro, TimeoutError is thrown into the waiting task after timeout ms"
+    loop = get_event_loop()
+    waiting = [loop.cur_task]
+
+    def timeout_func():
+        if waiting[0]:
+            waiting[0].pend_throw(TimeoutError())
+
+    loop.call_later_ms(timeout, timeout_func)
+    try:
+        return await coro
+    finally:
+        waiting[0] = None
+
+def wait_for(coro, timeout):
+    return wait_for_ms(coro, int(timeout * 1000))
+
+def _read(ios, size):
+    "available bytes, b'' at EOF or None if nothing has arrived yet"
+    if isinstance(ios, socket.socket):
+        try:
+            return ios.recv(size)
+        except (BlockingIOError, InterruptedError):
+            return None
+    available = ios.any()
+    return ios.read(min(available, size)) if available else None
+
+class StreamReader:
+
+    def __init__(self, polls, ios=None):
+        self.polls = polls
+        self.ios = ios if ios is not None else polls
+        self._buf = b''
+        self._eof = False
+
+    @types.coroutine
+    def _fill(self):
+        "appends the next arrived bytes to the buffer, False at EOF"
+        if self._eof:
+            return False
+        while True:
+            data = _read(self.ios, READ_SIZE)
+            if data is not None:
+                break
+            yield IORead(self.polls)
+        if not data:
+            self._eof = True
+            return False
+        self._buf += data
+        return True
+
+    def _take(self, size):
+        data, self._buf = self._buf[:size], self._buf[size:]
+        return data
+
+    @types.coroutine
+    def read(self, n=-1):
+        if not self._buf:
+            yield from self._fill()
+        return self._take(len(self._buf) if n < 0 else n)
+
+    @types.coroutine
+    def readexactly(self, n):
+        while len(self._buf) < n:
+            if not (yield from self._fill()):
+                break
+        return self._take(n)
+
+    @types.coroutine
+    def readline(self):
+        while b'\n' not in self._buf:
+            if not (yield from self._fill()):
+                return self._take(len(self._buf))
+        return self._take(self._buf.index(b'\n') + 1)
+
+    @types.coroutine
+    def aclose(self):
+        yield IOReadDone(self.polls)
+        self.ios.close()
+
+    def __repr__(self):
+        return '<StreamReader %r %r>' % (self.polls, self.ios)
+
+class StreamWriter:
+
+    def __init__(self, s, extra=None):
+        self.s = s
+        self.extra = extra or {}
+
+    @types.coroutine
+    def awrite(self, buf, off=0, sz=-1):
+        if sz == -1:
+            sz = len(buf) - off
+        data = memoryview(buf)[off:off + sz]
+        while data:
+            if isinstance(self.s, socket.socket):
+                try:
+                    sent = self.s.send(data)
+                except (BlockingIOError, InterruptedError):
+                    sent = 0
+            else:
+                sent = self.s.write(data)
+            data = data[sent:]
+            if data:
+                yield IOWrite(self.s)
+        yield IOWriteDone(self.s)
+
+    @types.coroutine
+    def awritestr(self, buf):
+        yield from self.awrite(buf.encode())
+
+    @types.coroutine
+    def aclose(self):
+        yield IOWriteDone(self.s)
+        self.s.close()
+
+    def get_extra_info(self, name, default=None):
+        return self.extra.get(name, default)
+
+    def __repr__(self):
+        return '<StreamWriter %r>' % self.s
+
+@types.coroutine
+def open_connection(host, port, ssl=False):
+    address = runtime.resolve(host, port)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setblocking(False)
+    try:
+        sock.connect(address)
+    except (BlockingIOError, InterruptedError):
+        pass
+    except OSError:
+        sock.close()
+        raise
+    try:
+        yield IOWrite(sock)
+    except BaseException:
+        sock.close()
+        raise
+    error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+    if error:
+        sock.close()
+        raise OSError(error, errno.errorcode.get(error, 'connect error'))
+    if ssl and address == (host, port):
+        import ssl as _ssl
+        sock.setblocking(True)
+        sock = _ssl.create_default_context().wrap_socket(sock, server_hostname=host)
+        sock.setblocking(False)
+    return StreamReader(sock), StreamWriter(sock, {})
+
+@types.coroutine
+def start_server(client_coro, host, port, backlog=10):
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((host, port))
+    server.listen(backlog)
+    server.setblocking(False)
+    _listening.add(server)
+    try:
+        while True:
+            yield IORead(server)
+            try:
+                client, address = server.accept()
+            except (BlockingIOError, InterruptedError):
+                continue
+            client.setblocking(False)
+            yield client_coro(StreamReader(client), StreamWriter(client, {'peername': address}))
+    finally:
+        server.close()
@@ -0,0 +1,8 @@
+"""lib.uasyncio.core stand-in: cur_task is the task being run, as the device core keeps it."""
+import sys
+
+def __getattr__(name):
+    if name == 'cur_task':
+        loop = sys.modules['lib.uasyncio']._event_loop
+        return loop.cur_task if loop else None
+    raise AttributeError(name)
@@ -0,0 +1,418 @@
+"""machine stand-in: the LoBo MicroPython ESP32 API on the simulated board.
+
+Bus transfers take their wire time on the sim clock, resets raise
+sim.runtime.MachineReset for the runner to reboot the device.
+"""
+import calendar
+import re
+from collections import deque
+
+import sim.runtime as runtime
+from sim import board as _board
+from utime import localtime
+
+ONEWIRE_RESET_TIME = 0.00096
+ONEWIRE_BYTE_TIME = 0.00056
+
+def _pin_number(pin):
+    return pin if isinstance(pin, int) else pin.number
+
+class Pin:
+
+    IN, OUT, INOUT, OUT_OD, INOUT_OD = 1, 2, 3, 6, 7
+    OPEN_DRAIN = OUT_OD
+    PULL_UP, PULL_DOWN, PULL_FLOAT = _board.PULL_UP, 2, 3
+    IRQ_DISABLE = 0
+    IRQ_RISING = _board.IRQ_RISING
+    IRQ_FALLING = _board.IRQ_FALLING
+    IRQ_ANYEDGE = _board.IRQ_ANYEDGE
+    IRQ_LOWLEVEL = _board.IRQ_LOWLEVEL
+    IRQ_HILEVEL = _board.IRQ_HILEVEL
+
+    def __init__(self, number, mode=None, pull=None, value=None, handler=None, trigger=None, debounce=0, acttime=0):
+        self.number = number
+        self.init(mode, pull, value, handler, trigger)
+
+    def init(self, mode=None, pull=None, value=None, handler=None, trigger=None, debounce=0, acttime=0):
+        state = runtime.board.pin(self.number)
+        if mode is not None:
+            state.mode = mode
+        if pull is not None:
+            state.pull = pull
+            if not state.driven:
+                state.level = 1 if pull == Pin.PULL_UP else 0
+        if value is not None:
+            self.value(value)
+        if handler is not None:
+            state.handler = handler
+            state.trigger = trigger or Pin.IRQ_ANYEDGE
+            state.irq_pin = self
+
+    def value(self, value=None):
+        state = runtime.board.pin(self.number)
+        if value is None:
+            return runtime.board.level(self.number)
+        if state.mode != Pin.IN:
+            runtime.board.drive(self.number, 1 if value else 0)
+
+    __call__ = value
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def irq(self, handler=None, trigger=IRQ_ANYEDGE):
+        self.init(handler=handler, trigger=trigger)
+
+    def __repr__(self):
+        return 'Pin(%d)' % self.number
+
+class I2C:
+    "MicroPython I2C master API, transfers go to the board bus of the scl/sda pins"
+
+    MASTER = 1
+
+    def __init__(self, id=0, mode=MASTER, speed=100000, sda=None, scl=None, freq=None, **kwargs):
+        self.init(mode, speed, sda, scl, freq)
+
+    def init(self, mode=MASTER, speed=100000, sda=None, scl=None, freq=None, **kwargs):
+        self._speed = freq or speed
+        self._bus = runtime.board.i2c_bus(_pin_number(scl), _pin_number(sda))
+
+    def deinit(self):
+        pass
+
+    def _device(self, addr, nbytes):
+        runtime.clock.sleep((nbytes + 2) * 9 / self._speed)
+        device = self._bus.device(addr)
+        device.begin()
+        return device
+
+    def scan(self):
+        runtime.clock.sleep(len(range(0x08, 0x78)) * 18 / self._speed)
+        return sorted(self._bus.devices)
+
+    def readfrom(self, addr, nbytes, stop=True):
+        return self._device(addr, nbytes).read(nbytes)
+
+    def readfrom_into(self, addr, buf, stop=True):
+        buf[:] = self._device(addr, len(buf)).read(len(buf))
+
+    def writeto(self, addr, buf, stop=True):
+        data = memoryview(buf).tobytes()
+        self._device(addr, len(data)).write(data)
+        return len(data)
+
+    def readfrom_mem(self, addr, memaddr, nbytes, addrsize=8):
+        device = self._device(addr, nbytes + 2)
+        device.write(bytes((memaddr,)))
+        return device.read(nbytes)
+
+    def readfrom_mem_into(self, addr, memaddr, buf, addrsize=8):
+        buf[:] = self.readfrom_mem(addr, memaddr, len(buf))
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        data = memoryview(buf).tobytes()
+        self._device(addr, len(data) + 1).write(bytes((memaddr,)) + data)
+
+class UART:
+    """UART on a board line: written frames reach the devices wired to the tx/rx pins,
+    their replies arrive byte by byte at the line baudrate; timeout is in ms"""
+
+    def __init__(self, id, baudrate=115200, bits=8, parity=None, stop=1, tx=None, rx=None, timeout=0, **kwargs):
+        self.id = id
+        self._baudrate = baudrate
+        self._tx = tx
+        self._rx = rx
+        self._timeout = timeout
+        self._tx_busy = 0
+        self._rx_queue = deque()
+
+    def init(self, baudrate=None, bits=8, parity=None, stop=1, tx=None, rx=None, timeout=None, **kwargs):
+        if baudrate:
+            self._baudrate = baudrate
+        if tx is not None:
+            self._tx = tx
+        if rx is not None:
+            self._rx = rx
+        if timeout is not None:
+            self._timeout = timeout
+
+    def deinit(self):
+        self._rx_queue.clear()
+
+    def _byte_time(self):
+        return 10 / self._baudrate
+
+    def write(self, buf):
+        data = memoryview(buf).tobytes()
+        now = runtime.clock.monotonic()
+        start = max(now, self._tx_busy)
+        self._tx_busy = start + len(data) * self._byte_time()
+        line = runtime.board.uart_line(self._tx, self._rx)
+        line.frames += 1
+        replies = [reply for reply in (device.receive(data) for device in line.devices) if reply]
+        if replies:
+            latency = min(reply[1] for reply in replies)
+            frame = replies[0][0]
+            for reply, _ in replies[1:]:
+                # simultaneous answers collide on the line
+                frame = bytes(a & b for a, b in zip(frame.ljust(len(reply), b'\xff'), reply.ljust(len(frame), b'\xff')))
+            arrival = self._tx_busy + latency
+            for value in frame:
+                arrival += self._byte_time()
+                self._rx_queue.append((arrival, value))
+        return len(data)
+
+    def _arrived(self):
+        now = runtime.clock.monotonic()
+        count = 0
+        for arrival, _ in self._rx_queue:
+            if arrival > now:
+                break
+            count += 1
+        return count
+
+    def any(self):
+        return self._arrived()
+
+    def _wait(self, nbytes):
+        "blocks up to timeout until nbytes (or anything for nbytes < 0) arrived"
+        now = runtime.clock.monotonic()
+        deadline = now + self._timeout / 1000
+        wanted = nbytes if nbytes > 0 else 1
+        if len(self._rx_queue) >= wanted and self._rx_queue[wanted - 1][0] <= deadline:
+            until = self._rx_queue[wanted - 1][0]
+        else:
+            until = deadline
+        runtime.clock.sleep(until - now)
+
+    def read(self, nbytes=-1):
+        self._wait(nbytes)
+        count = self._arrived()
+        if nbytes >= 0:
+            count = min(count, nbytes)
+        if not count:
+            return None
+        return bytes(self._rx_queue.popleft()[1] for _ in range(count))
+
+    def readinto(self, buf, nbytes=-1):
+        data = self.read(len(buf) if nbytes < 0 else nbytes)
+        if not data:
+            return None
+        buf[:len(data)] = data
+        return len(data)
+
+    def readline(self):
+        self._wait(-1)
+        result = bytearray()
+        now = runtime.clock.monotonic()
+        while self._rx_queue and self._rx_queue[0][0] <= now:
+            value = self._rx_queue.popleft()[1]
+            result.append(value)
+            if value == 0x0A:
+                break
+        return bytes(result) or None
+
+    def flush(self):
+        runtime.clock.sleep(self._tx_busy - runtime.clock.monotonic())
+
+    def sim_ready_at(self, kind):
+        "event loop polling: time the stream becomes readable/writable or None"
+        if kind == 'w':
+            return self._tx_busy
+        return self._rx_queue[0][0] if self._rx_queue else None
+
+class ADC:
+
+    ATTN_0DB, ATTN_2_5DB, ATTN_6DB, ATTN_11DB = 0, 1, 2, 3
+    WIDTH_9BIT, WIDTH_10BIT, WIDTH_11BIT, WIDTH_12BIT = 0, 1, 2, 3
+    FULL_SCALE = (1.1, 1.5, 2.2, 3.9)
+
+    def __init__(self, pin, unit=1):
+        self._pin = _pin_number(pin)
+        self._width = ADC.WIDTH_12BIT
+        self._atten = ADC.ATTN_0DB
+
+    def width(self, width):
+        self._width = width
+
+    def atten(self, atten):
+        self._atten = atten
+
+    def read(self):
+        runtime.clock.sleep(0.00004)
+        board = runtime.board
+        source = board.adc_inputs.get(self._pin)
+        volts = source() if source else board.env.analog(self._pin)
+        top = (1 << (9 + self._width)) - 1
+        return int(min(max(volts / ADC.FULL_SCALE[self._atten], 0), 1) * top)
+
+class RTC:
+    "internal RTC, time tuples are in utime.localtime() order"
+
+    def init(self, datetime):
+        fields = tuple(datetime) + (0,) * (6 - len(datetime))
+        runtime.board.rtc_set(calendar.timegm(fields[:6]))
+
+    def now(self):
+        return localtime()
+
+    def datetime(self, datetime=None):
+        if datetime is not None:
+            self.init(datetime)
+            return None
+        return localtime()
+
+    def ntp_sync(self, server=None, tz=None, update_period=0):
+        "POSIX TZ offset ('<+03>-3', 'MSK-3') is applied to UTC"
+        offset = 0
+        match = re.search(r'([+-]?\d+)(?::(\d+))?$', tz or '')
+        if match:
+            hours = int(match.group(1))
+            minutes = int(match.group(2) or 0)
+            offset = -(hours * 3600 + (minutes * 60 if hours >= 0 else -minutes * 60))
+        board = runtime.board
+        board.rtc_set(board.clock.time() + offset)
+        board.rtc_synced = True
+
+    def synced(self):
+        return runtime.board.rtc_synced
+
+    def wake_on_ext0(self, pin, level):
+        pass
+
+    def wake_on_ext1(self, pins, level):
+        pass
+
+class WDT:
+
+    def __init__(self, enable=True, timeout=None):
+        if timeout:
+            runtime.board.wdt_timeout = timeout / 1000
+        if enable:
+            runtime.board.enable_watchdog()
+
+    def feed(self):
+        runtime.board.feed_watchdog()
+
+    def deinit(self):
+        runtime.board.wdt_enabled = False
+
+class Onewire:
+    "LoBo 1-Wire bus object driving the board's 1-Wire bus model byte by byte"
+
+    def __init__(self, pin, *args, **kwargs):
+        self.pin = _pin_number(pin)
+        self._bus = runtime.board.onewire_bus(self.pin)
+
+    def reset(self):
+        runtime.clock.sleep(ONEWIRE_RESET_TIME)
+        return self._bus.reset()
+
+    def writebyte(self, value):
+        runtime.clock.sleep(ONEWIRE_BYTE_TIME)
+        self._bus.write_byte(value)
+
+    def writebytes(self, buf):
+        runtime.clock.sleep(len(buf) * ONEWIRE_BYTE_TIME)
+        for value in buf:
+            self._bus.write_byte(value)
+
+    def readbyte(self):
+        runtime.clock.sleep(ONEWIRE_BYTE_TIME)
+        return self._bus.read_byte()
+
+    def readbytes(self, count):
+        runtime.clock.sleep(count * ONEWIRE_BYTE_TIME)
+        read_byte = self._bus.read_byte
+        return bytes(read_byte() for _ in range(count))
+
+    def select(self, rom):
+        self.reset()
+        self.writebyte(0x55)
+        self.writebytes(rom)
+
+    def scan(self):
+        "ROM codes of the bus devices as integers"
+        runtime.clock.sleep(len(self._bus) * 64 * 3 * ONEWIRE_BYTE_TIME / 8 + ONEWIRE_RESET_TIME)
+        return [int.from_bytes(rom, 'big') for rom in self._bus.roms()]
+
+    def crc8(self, data):
+        from sim.devices import crc8_dallas
+        return crc8_dallas(data)
+
+    def deinit(self):
+        pass
+
+    class ds18x20:
+        "LoBo DS18x20 helper bound to the dev-th probe found on the bus"
+
+        def __init__(self, ow, dev=0):
+            self._ow = ow
+            self._rom = ow._bus.roms()[dev].to_bytes(8, 'big') if isinstance(ow._bus.roms()[dev], int)\
+                else ow._bus.roms()[dev]
+            self._res = 12
+
+        def rom_code(self):
+            return int.from_bytes(self._rom, 'big')
+
+        def convert(self, wait=True):
+            self._ow.select(self._rom)
+            self._ow.writebyte(0x44)
+            if wait:
+                runtime.clock.sleep(0.09375 * (1 << (self._res - 9)))
+            return True
+
+        def _scratchpad(self):
+            self._ow.select(self._rom)
+            self._ow.writebyte(0xBE)
+            data = self._ow.readbytes(9)
+            if self._ow.crc8(data[:8]) != data[8]:
+                raise OSError('onewire CRC error')
+            return data
+
+        def read_tempint(self):
+            data = self._scratchpad()
+            return int.from_bytes(data[0:2], 'little', signed=True)
+
+        def read_temp(self):
+            return self.read_tempint() / 16
+
+        def get_res(self):
+            return 9 + ((self._scratchpad()[4] >> 5) & 3)
+
+        def set_res(self, res):
+            data = self._scratchpad()
+            self._ow.select(self._rom)
+            self._ow.writebytes((0x4E, data[2], data[3], ((res - 9) << 5) | 0x1F))
+            self._res = res
+
+        def deinit(self):
+            pass
+
+def resetWDT():
+    runtime.board.feed_watchdog()
+
+def reset():
+    raise runtime.MachineReset('reset')
+
+def deepsleep(time_ms=0):
+    raise runtime.MachineReset('deepsleep', time_ms)
+
+def unique_id():
+    return b'\x24\x0a\xc4\x00\x00\x01'
+
+def freq(value=None):
+    return 240000000 if value is None else None
+
+def idle():
+    pass
+
+def disable_irq():
+    return 0
+
+def enable_irq(state=0):
+    pass
@@ -0,0 +1,14 @@
+"micropython stand-in"
+
+def const(value):
+    return value
+
+def mem_info(verbose=False):
+    import gc
+    print('heap: total: %d, used: %d, free: %d' % (gc.mem_alloc() + gc.mem_free(), gc.mem_alloc(), gc.mem_free()))
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+def schedule(func, arg):
+    func(arg)
@@ -0,0 +1,48 @@
+"network stand-in: the station joins the access point named board.wlan_ssid"
+import sim.runtime as runtime
+
+STA_IF, AP_IF = 0, 1
+STA_ADDRESS = ('10.0.0.2', '255.255.255.0', '10.0.0.1', '10.0.0.1')
+
+class WLAN:
+
+    def __init__(self, interface=STA_IF):
+        self._interface = interface
+        self._active = False
+        self._ssid = None
+        self._ifconfig = STA_ADDRESS if interface == STA_IF else ('192.168.4.1', '255.255.255.0',
+            '192.168.4.1', '192.168.4.1')
+        self._config = {}
+
+    def active(self, value=None):
+        if value is None:
+            return self._active
+        self._active = bool(value)
+        if not self._active:
+            self._ssid = None
+
+    def connect(self, ssid, key=None, **kwargs):
+        if not self._active:
+            raise OSError('WLAN not active')
+        self._ssid = ssid
+
+    def disconnect(self):
+        self._ssid = None
+
+    def isconnected(self):
+        return self._interface == STA_IF and self._active and self._ssid is not None and\
+            self._ssid == runtime.board.wlan_ssid
+
+    def ifconfig(self, config=None):
+        if config is None:
+            return self._ifconfig
+        self._ifconfig = tuple(config)
+
+    def config(self, *args, **kwargs):
+        if args:
+            return self._config.get(args[0])
+        self._config.update(kwargs)
+
+    def scan(self):
+        ssid = runtime.board.wlan_ssid
+        return [(ssid.encode(), b'\x00' * 6, 1, -60, 4, False)] if ssid else []
@@ -0,0 +1,2 @@
+"uerrno stand-in"
+from errno import *
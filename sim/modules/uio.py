@@ -0,0 +1,2 @@
+"uio stand-in"
+from io import *
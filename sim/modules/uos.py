@@ -0,0 +1,2 @@
+"uos stand-in"
+from os import *
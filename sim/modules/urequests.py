@@ -0,0 +1,72 @@
+"urequests stand-in: blocking requests over http.client to the host runtime.resolve() maps the device URL to"
+import http.client
+import io
+import json
+
+import sim.runtime as runtime
+
+TIMEOUT = 30
+
+class _Raw(io.BytesIO):
+
+    def settimeout(self, timeout):
+        pass
+
+class Response:
+
+    def __init__(self, status_code, reason, body):
+        self.status_code = status_code
+        self.reason = reason
+        self.raw = _Raw(body)
+
+    @property
+    def content(self):
+        return self.raw.getvalue()
+
+    @property
+    def text(self):
+        return self.content.decode()
+
+    def json(self):
+        return json.loads(self.content)
+
+    def close(self):
+        self.raw = None
+
+def request(method, url, data=None, json=None, headers=None):
+    proto, _, host, path = (url + '/' if url.count('/') < 3 else url).split('/', 3)
+    port = 443 if proto == 'https:' else 80
+    if ':' in host:
+        host, port = host.split(':', 1)
+        port = int(port)
+    address, port = runtime.resolve(host, port)
+    headers = dict(headers or {})
+    if json is not None:
+        import json as _json
+        data = _json.dumps(json)
+        headers['Content-Type'] = 'application/json'
+    connection = http.client.HTTPConnection(address, port, timeout=TIMEOUT)
+    try:
+        connection.request(method, '/' + path, body=data, headers=dict(headers, Host=host))
+        rsp = connection.getresponse()
+        return Response(rsp.status, rsp.reason, rsp.read())
+    finally:
+        connection.close()
+
+def head(url, **kwargs):
+    return request('HEAD', url, **kwargs)
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+def put(url, **kwargs):
+    return request('PUT', url, **kwargs)
+
+def patch(url, **kwargs):
+    return request('PATCH', url, **kwargs)
+
+def delete(url, **kwargs):
+    return request('DELETE', url, **kwargs)
@@ -0,0 +1,48 @@
+"""utime stand-in: MicroPython time functions on the sim clock and the board RTC.
+
+MicroPython time is local (the RTC is set to local time), epoch seconds are
+kept as host epoch numbers, so utime.time() values match the stand-in server's.
+"""
+import calendar
+import time as _time
+
+import sim.runtime as runtime
+
+TICKS_PERIOD = 1 << 30
+
+def time():
+    return int(runtime.board.rtc_time())
+
+def localtime(secs=None):
+    "(year, month, mday, hour, minute, second, weekday, yearday)"
+    value = _time.gmtime(time() if secs is None else secs)
+    return (value.tm_year, value.tm_mon, value.tm_mday, value.tm_hour, value.tm_min, value.tm_sec,
+        value.tm_wday, value.tm_yday)
+
+gmtime = localtime
+
+def mktime(time_tuple):
+    return calendar.timegm(tuple(time_tuple[:6]))
+
+def sleep(seconds):
+    runtime.clock.sleep(seconds)
+
+def sleep_ms(ms):
+    runtime.clock.sleep(ms / 1000)
+
+def sleep_us(us):
+    runtime.clock.sleep(us / 1000000)
+
+def ticks_ms():
+    return int(runtime.clock.monotonic() * 1000) & (TICKS_PERIOD - 1)
+
+def ticks_us():
+    return int(runtime.clock.monotonic() * 1000000) & (TICKS_PERIOD - 1)
+
+ticks_cpu = ticks_us
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & (TICKS_PERIOD - 1)
+
+def ticks_diff(end, start):
+    return ((end - start + TICKS_PERIOD // 2) & (TICKS_PERIOD - 1)) - TICKS_PERIOD // 2
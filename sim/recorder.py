@@ -0,0 +1,96 @@
+"""Records what a simulated run did: relay transitions, uploads to the stand-in
+server, GC collections and resets, stamped with the sim clock. Saved runs of the
+same profile, seed and start time can be diffed to check scheduling changes."""
+import json
+import time
+
+def relay_pins(conf):
+    "output pins driving relays by number: switch name for the record"
+    pins = {}
+    counts = {}
+    for module_conf in conf['modules']:
+        module_type = module_conf['type']
+        idx = counts[module_type] = counts.get(module_type, -1) + 1
+        name = module_conf.get('name') or '%s%d' % (module_type, idx)
+        if module_type == 'climate':
+            for switch, switch_conf in (module_conf.get('switches') or {}).items():
+                if switch_conf and switch_conf.get('pin') is not None:
+                    pins[switch_conf['pin']] = '%s.%s' % (name, switch)
+            if isinstance(module_conf.get('light'), int):
+                pins[module_conf['light']] = '%s.light' % name
+        elif module_type in ('relay_switch', 'gate', 'feeder'):
+            if module_conf.get('pin') is not None:
+                pins[module_conf['pin']] = name
+            if isinstance(module_conf.get('reverse'), int) and not isinstance(module_conf['reverse'], bool):
+                pins[module_conf['reverse']] = '%s.reverse' % name
+    return pins
+
+class Recorder:
+
+    def __init__(self, simulation):
+        self._simulation = simulation
+        self.pins = relay_pins(simulation.conf)
+        self.transitions = []
+        self.collections = []
+        self.resets = []
+        self._wall_start = None
+        self.wall_time = 0
+        simulation.board.listeners.append(self.on_event)
+
+    def on_event(self, kind, sim_time, data):
+        if kind == 'pin' and data['pin'] in self.pins:
+            self.transitions.append((sim_time, self.pins[data['pin']], data['level']))
+        elif kind == 'gc':
+            self.collections.append((sim_time, data['alloc'], data['free']))
+        elif kind == 'reset':
+            self.resets.append((sim_time, data['reason']))
+
+    def run(self, duration=None):
+        self._wall_start = time.monotonic()
+        try:
+            self._simulation.run(duration)
+        finally:
+            self.wall_time = time.monotonic() - self._wall_start
+        return self
+
+    @property
+    def uploads(self):
+        server = self._simulation.server
+        return list(server.requests) if server else []
+
+    def events(self):
+        "all records ordered by sim time"
+        events = [{'t': round(t, 3), 'kind': 'relay', 'switch': switch, 'level': level}
+            for t, switch, level in self.transitions]
+        events += [{'t': round(t, 3), 'kind': 'upload', 'path': path, 'bytes': size}
+            for t, path, size in self.uploads]
+        events += [{'t': round(t, 3), 'kind': 'gc', 'alloc': alloc, 'free': free}
+            for t, alloc, free in self.collections]
+        events += [{'t': round(t, 3), 'kind': 'reset', 'reason': reason} for t, reason in self.resets]
+        events.sort(key=lambda event: event['t'])
+        return events
+
+    def save(self, path):
+        "one JSON event per line"
+        with open(path, 'w') as record_file:
+            for event in self.events():
+                record_file.write(json.dumps(event) + '\n')
+
+    def summary(self):
+        sim_time = self._simulation.clock.monotonic()
+        switches = {}
+        for _, switch, level in self.transitions:
+            switches[switch] = switches.get(switch, 0) + 1
+        uploads = self.uploads
+        return {
+            'sim_time': round(sim_time, 3),
+            'wall_time': round(self.wall_time, 3),
+            'speedup': round(sim_time / self.wall_time, 1) if self.wall_time else None,
+            'boots': self._simulation.boots,
+            'resets': len(self.resets),
+            'transitions': switches,
+            'uploads': len(uploads),
+            'upload_bytes': sum(size for _, _, size in uploads),
+            'gc_collections': len(self.collections),
+            'min_free': min((free for _, _, free in self.collections), default=None),
+        }
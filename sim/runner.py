@@ -0,0 +1,161 @@
+"""Boots the device main.py under CPython on a simulated board built from a
+conf/ profile, reboots it on machine.reset()/deepsleep()/watchdog like the
+ESP32 does."""
+import json
+import logging
+import os
+import runpy
+import shutil
+import sys
+import tempfile
+import threading
+
+import sim.runtime as runtime
+from sim.board import Board
+from sim.clock import Clock
+from sim.environment import Environment
+
+LOG = logging.getLogger('Sim')
+
+SSID = 'sim'
+DEVICE_ID = {'id': 1, 'token': 'sim'}
+FS_FILES = ('wlan_default.json', 'gsm_apns.json', 'schedule.json', 'version.json')
+
+def profile_path(profile):
+    "conf.json of a profile name under conf/ ('feeder', 'r7ab_gates/gates'), a directory or a file"
+    for path in (profile, os.path.join(runtime.REPO_ROOT, 'conf', profile)):
+        if os.path.isdir(path):
+            path = os.path.join(path, 'conf.json')
+        if os.path.isfile(path):
+            return path
+    raise ValueError('Profile not found: %s' % profile)
+
+def device_conf(conf):
+    "conf.json in the form LenferDevice reads: modules list of confs with type"
+    conf = dict(conf)
+    if isinstance(conf.get('modules'), dict):
+        conf['modules'] = [dict(module_conf, type=module_type) for module_type, module_conf in conf['modules'].items()]
+    return conf
+
+class SimTimeFilter(logging.Filter):
+    "adds sim_time (clock.monotonic()) to log records"
+
+    def filter(self, record):
+        record.sim_time = runtime.clock.monotonic() if runtime.clock else 0
+        return True
+
+class Simulation:
+    """server - 'stand-in' (local host.stand_in_server), 'host:port' of a server to send
+    the device requests to, or None to let them go to the real server URIs
+    http_port - host port of the device web server, None - not served"""
+
+    def __init__(self, profile, fs=None, server='stand-in', http_port=None, seed=0, reboots=10, clock=None,
+            traced_heap=True):
+        self.conf_path = profile_path(profile)
+        with open(self.conf_path) as conf_file:
+            self.conf = device_conf(json.load(conf_file))
+        self.clock = clock or Clock()
+        self.board = Board.from_conf(self.conf, self.clock, environment=Environment(self.clock, seed=seed),
+            traced_heap=traced_heap)
+        self.board.wlan_ssid = SSID
+        self.fs = fs or tempfile.mkdtemp(prefix='lenfer-sim-')
+        self.server_address = server
+        self.server = None
+        self.http_port = http_port
+        self.reboots = reboots
+        self.boots = 0
+        self.resets = []
+
+    def prepare_fs(self):
+        "device flash: profile conf.json, default settings, registered id.json and the static files"
+        profile_dir = os.path.dirname(self.conf_path)
+        os.makedirs(self.fs, exist_ok=True)
+        with open(os.path.join(self.fs, 'conf.json'), 'w') as conf_file:
+            json.dump(self.conf, conf_file)
+        self._copy_missing(os.path.join(profile_dir, 'settings_default.json')
+            if os.path.isfile(os.path.join(profile_dir, 'settings_default.json'))
+            else os.path.join(runtime.REPO_ROOT, 'conf', 'settings_default.json'), 'settings_default.json')
+        for name in FS_FILES:
+            self._copy_missing(os.path.join(runtime.REPO_ROOT, name), name)
+        if not os.path.exists(os.path.join(self.fs, 'id.json')):
+            with open(os.path.join(runtime.REPO_ROOT, 'id.json')) as id_file:
+                device_id = json.load(id_file)
+            device_id.update(DEVICE_ID)
+            self._write_json('id.json', device_id)
+        if not os.path.exists(os.path.join(self.fs, 'wlan.json')):
+            with open(os.path.join(runtime.REPO_ROOT, 'wlan_default.json')) as wlan_file:
+                wlan = json.load(wlan_file)
+            wlan.update(ssid=SSID, key='')
+            self._write_json('wlan.json', wlan)
+        if not os.path.exists(os.path.join(self.fs, 'html')):
+            shutil.copytree(os.path.join(runtime.REPO_ROOT, 'html'), os.path.join(self.fs, 'html'))
+
+    def _copy_missing(self, src, name):
+        if os.path.isfile(src) and not os.path.exists(os.path.join(self.fs, name)):
+            shutil.copyfile(src, os.path.join(self.fs, name))
+
+    def _write_json(self, name, data):
+        with open(os.path.join(self.fs, name), 'w') as json_file:
+            json.dump(data, json_file)
+
+    def start_server(self):
+        if self.server_address == 'stand-in':
+            from host.stand_in_server import StandInServer
+            self.server = StandInServer(('127.0.0.1', 0), clock=self.clock.monotonic)
+            threading.Thread(target=self.server.serve_forever, daemon=True).start()
+            runtime.hosts['*'] = self.server.server_address
+        elif self.server_address:
+            host, port = self.server_address.rsplit(':', 1)
+            runtime.hosts['*'] = (host, int(port))
+
+    def _purge(self):
+        "forgets the modules of the previous boot, the next one imports them afresh"
+        uasyncio = sys.modules.get('lib.uasyncio')
+        if uasyncio and uasyncio._event_loop:
+            uasyncio._event_loop.close()
+        for name in runtime.device_modules():
+            del sys.modules[name]
+
+    def boot(self):
+        "runs main.py until the device resets or the run ends"
+        self.boots += 1
+        self._purge()
+        self.board.heap.reset()
+        self.board.emit('boot', count=self.boots)
+        runpy.run_path(os.path.join(runtime.REPO_ROOT, 'main.py'), run_name='__main__')
+
+    def run(self, duration=None):
+        "runs for duration sim seconds (None - until the reboots limit)"
+        cwd = os.getcwd()
+        self.prepare_fs()
+        runtime.install(self.board, self.clock)
+        runtime.http_address = ('127.0.0.1', self.http_port) if self.http_port else None
+        runtime.stop_at = self.clock.monotonic() + duration if duration else None
+        self.start_server()
+        os.chdir(self.fs)
+        try:
+            while True:
+                try:
+                    self.boot()
+                    reason, sleep_ms = 'exit', 0
+                except runtime.SimulationEnd:
+                    break
+                except runtime.MachineReset as exc:
+                    reason, sleep_ms = exc.reason, exc.sleep_ms
+                except Exception:
+                    LOG.exception('Unhandled exception in main.py')
+                    reason, sleep_ms = 'crash', 0
+                LOG.info('device reset: %s', reason)
+                self.resets.append((self.clock.monotonic(), reason))
+                self.board.reset(reason)
+                self.clock.sleep(sleep_ms / 1000)
+                if self.boots > self.reboots:
+                    LOG.warning('Reboots limit reached')
+                    break
+        finally:
+            self._purge()
+            os.chdir(cwd)
+            if self.server:
+                self.server.shutdown()
+                self.server.server_close()
+        return self
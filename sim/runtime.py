@@ -0,0 +1,81 @@
+"""State shared by the stand-in modules and the runner.
+
+The stand-ins (machine, utime, lib.uasyncio, ...) are imported by the device
+code as top level modules; they reach the simulated board, its clock and the
+network settings through this module.
+"""
+import gc
+import logging
+import os
+import sys
+import time
+
+SIM_ROOT = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(SIM_ROOT)
+MODULES_PATH = os.path.join(SIM_ROOT, 'modules')
+
+board = None
+clock = None
+# device host name -> (host, port) to connect to instead, '*' matches any host
+hosts = {}
+# host address of the device web server, None - the server is not started
+http_address = None
+# clock.monotonic() value the run stops at
+stop_at = None
+
+class MachineReset(BaseException):
+    """raised by machine.reset() and machine.deepsleep()
+    BaseException, so device code catching Exception does not swallow it"""
+
+    def __init__(self, reason, sleep_ms=0):
+        BaseException.__init__(self, reason)
+        self.reason = reason
+        self.sleep_ms = sleep_ms
+
+class SimulationEnd(BaseException):
+    "raised by the event loop when the run reaches stop_at"
+
+def resolve(host, port):
+    return hosts.get(host) or hosts.get('*') or (host, port)
+
+def tick():
+    "called by the event loop on every iteration"
+    board.check_watchdog()
+    if stop_at is not None and clock.monotonic() >= stop_at:
+        raise SimulationEnd()
+
+def _logger_exc(self, exc, msg, *args):
+    "micropython-logging Logger.exc"
+    self.error(msg, *args, exc_info=exc)
+
+def install(board_, clock_):
+    """puts the stand-ins in front of the device modules on sys.path and patches
+    the CPython modules MicroPython extends (gc, time, logging)"""
+    global board, clock
+    board, clock = board_, clock_
+    for path in (REPO_ROOT, MODULES_PATH):
+        if path in sys.path:
+            sys.path.remove(path)
+    sys.path[0:0] = [MODULES_PATH, REPO_ROOT]
+    import utime
+    for name in ('sleep_ms', 'sleep_us', 'ticks_ms', 'ticks_us', 'ticks_diff', 'ticks_add'):
+        setattr(time, name, getattr(utime, name))
+    gc.mem_free = board.heap.mem_free
+    gc.mem_alloc = board.heap.mem_alloc
+    gc.threshold = board.heap.threshold
+    if not hasattr(gc, 'host_collect'):
+        gc.host_collect = gc.collect
+    gc.collect = board.heap.collect
+    logging.Logger.exc = _logger_exc
+
+def device_modules():
+    "names of imported modules that belong to a boot: device code and stand-ins"
+    result = []
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, '__file__', None) or ''
+        if path.startswith(REPO_ROOT) and not path.startswith(SIM_ROOT) and not path.startswith(
+                os.path.join(REPO_ROOT, 'host')):
+            result.append(name)
+        elif path.startswith(MODULES_PATH):
+            result.append(name)
+    return result
@@ -42,10 +42,14 @@ def load_version():
 def save_version(version_data):
     save_json(version_data, 'version.json')
 
-def check_software_update():
+async def check_software_update():
+    global HTTP_CLIENT
     device_type = get_device_type()
     version_data = load_version()
-    srv_versions = load_srv_json('devices')
+    if not HTTP_CLIENT:
+        HTTP_CLIENT = HttpClient()
+    srv_versions = await HTTP_CLIENT.get(updates_url() + 'devices.json')
+    manage_memory('software_check')
     return srv_versions and device_type in srv_versions and version_data['hash'] != srv_versions[device_type]
 
 def load_srv_json(file, srv_url=None):
@@ -61,7 +65,7 @@ def load_srv_json(file, srv_url=None):
         LOG.exc(exc, 'Error loading server data: %s' % file)
         return None
     finally:
-        manage_memory()
+        manage_memory('srv_json', force=True)
 
 def schedule_software_update():
     version_data = load_version()
@@ -74,7 +78,7 @@ def perform_software_update():
     if not HTTP_CLIENT:
         HTTP_CLIENT = HttpClient()
     machine.WDT()
-    manage_memory()
+    manage_memory('software_update', force=True)
     version_data = load_version()
     device_type = get_device_type()
     srv_url = updates_url()
@@ -0,0 +1,54 @@
+"""GateController current sensing on the simulated board: INA219 or an explicitly configured ADC sensor."""
+import unittest
+
+import sim.runtime as runtime
+from sim import devices
+from sim.board import Board
+from sim.clock import VirtualClock
+
+GATE_CONF = {'pin': 22, 'reverse': 21, 'adc': 35, 'power_monitor': {'i2c': 0, 'shunt_ohms': 0.1}}
+
+class Device:
+
+    def __init__(self, i2c):
+        from i2c_bus import I2CArbiter
+        self.settings = {}
+        self._arbiters = [I2CArbiter(i2c)]
+
+    def i2c_clients(self, module):
+        return [arbiter.client(module) for arbiter in self._arbiters]
+
+class GateCurrentSenseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = VirtualClock()
+        self.board = Board(self.clock)
+        self.bus = self.board.i2c_bus(32, 33)
+        runtime.install(self.board, self.clock)
+        from machine import I2C, Pin
+        self.device = Device(I2C(scl=Pin(32), sda=Pin(33)))
+
+    def gate(self, conf):
+        from gate_controller import GateController
+        return GateController(self.device, conf)
+
+    def test_ina219_failure_does_not_fall_back_to_adc(self):
+        # no INA219 on the bus, the legacy "adc" pin is left alone
+        self.assertIsNone(self.gate(GATE_CONF)._power_monitor)
+
+    def test_ina219(self):
+        self.bus.attach(devices.INA219(self.board, 0.1, load=lambda: 0.0))
+        from power_monitor import PowerMonitor
+        self.assertIsInstance(self.gate(GATE_CONF)._power_monitor, PowerMonitor)
+
+    def test_adc_current_sense_is_opt_in(self):
+        conf = {'pin': 22, 'reverse': 21,
+            'current_sense': {'type': 'adc', 'pin': 35, 'zero': 1.65, 'sensitivity': 0.122}}
+        self.board.attach_current_sense(conf['current_sense'], lambda: 2.0)
+        from power_monitor import AdcCurrentSense
+        power_monitor = self.gate(conf)._power_monitor
+        self.assertIsInstance(power_monitor, AdcCurrentSense)
+        self.assertAlmostEqual(power_monitor.current(), 2000, delta=100)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+"""HttpClient keep-alive pool against the stand-in server on the simulated board."""
+import threading
+import unittest
+
+import sim.runtime as runtime
+from sim.board import Board
+from sim.clock import VirtualClock
+from host.stand_in_server import StandInHandler, StandInServer
+
+class DroppingHandler(StandInHandler):
+    "reads the request and closes the connection without an answer while the server drops requests"
+
+    def do_POST(self):
+        if not self.server.drop:
+            return StandInHandler.do_POST(self)
+        self.server.requests.append((self.server.clock(), self.path, int(self.headers.get('Content-Length') or 0)))
+        self.read_json()
+        self.close_connection = True
+
+class HttpClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = VirtualClock()
+        runtime.install(Board(self.clock), self.clock)
+        self.server = StandInServer(('127.0.0.1', 0), handler=DroppingHandler)
+        self.server.drop = False
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:%d/api/sensors_data' % self.server.server_address[1]
+        from http_client import HttpClient
+        self.http = HttpClient()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def post(self):
+        import lib.uasyncio as uasyncio
+        return uasyncio.get_event_loop().run_until_complete(self.http.post(self.url, {'data': []}))
+
+    def test_connection_is_reused_across_sync_period(self):
+        self.post()
+        # the default sync_period
+        self.clock.sleep(60)
+        self.assertEqual(self.post(), 'OK')
+        self.assertEqual((self.http.stats['connects'], self.http.stats['reuses']), (1, 1))
+
+    def test_sent_request_is_not_repeated(self):
+        self.post()
+        self.server.drop = True
+        self.assertIsNone(self.post())
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_failure_log_omits_payload(self):
+        with self.assertLogs('Main', level='ERROR') as logs:
+            self.http.log_exception(None, self.url, {'sensors_data': {'data': [1] * 1000}}, 500)
+        self.assertIn('Postdata keys: sensors_data', logs.output[-1])
+        self.assertLess(max(len(line) for line in logs.output), 200)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+"""I2CArbiter turns on the simulated board."""
+import unittest
+
+import sim.runtime as runtime
+from sim import devices
+from sim.board import Board
+from sim.clock import VirtualClock
+
+class I2CArbiterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = VirtualClock()
+        self.board = Board(self.clock)
+        self.board.i2c_bus(22, 21).attach(devices.DS3231(self.board))
+        runtime.install(self.board, self.clock)
+        import lib.uasyncio as uasyncio
+        from machine import I2C, Pin
+        from i2c_bus import I2CArbiter
+        self.uasyncio = uasyncio
+        self.arbiter = I2CArbiter(I2C(scl=Pin(22), sda=Pin(21)))
+        self.order = []
+
+    async def burst(self, module, tag=None):
+        client = self.arbiter.client(module)
+        await client.turn()
+        client.readfrom_mem(0x68, 0, 7)
+        self.order.append(module if tag is None else tag)
+
+    def run_tasks(self, *coros):
+        loop = self.uasyncio.get_event_loop()
+        for coro in coros[:-1]:
+            loop.create_task(coro)
+        loop.run_until_complete(coros[-1])
+
+    def test_turns_go_by_priority(self):
+        async def last():
+            await self.uasyncio.sleep_ms(10)
+        self.run_tasks(self.burst('climate'), self.burst('rtc'), self.burst('power_monitor'), last())
+        self.assertEqual(self.order, ['power_monitor', 'rtc', 'climate'])
+
+    def test_turns_keep_order_within_priority(self):
+        async def last():
+            await self.uasyncio.sleep_ms(10)
+        self.run_tasks(*[self.burst('climate', idx) for idx in range(3)] + [last()])
+        self.assertEqual(self.order, [0, 1, 2])
+
+    def test_occupancy_is_accounted_per_module(self):
+        async def last():
+            await self.burst('rtc')
+            await self.uasyncio.sleep_ms(10)
+        self.run_tasks(self.burst('climate'), self.burst('climate'), last())
+        self.assertEqual(self.arbiter.clients['climate'].transfers, 2)
+        self.assertEqual(self.arbiter.clients['rtc'].transfers, 1)
+        self.assertGreater(self.arbiter.clients['climate'].busy_us, 0)
+
+if __name__ == '__main__':
+    unittest.main()
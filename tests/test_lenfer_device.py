@@ -0,0 +1,82 @@
+"""LenferDevice server exchanges on the simulated board against the stand-in server."""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import sim.runtime as runtime
+from sim.board import Board
+from sim.clock import VirtualClock
+from host.stand_in_server import StandInServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class Network:
+
+    def online(self):
+        return True
+
+class LenferDeviceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        os.chdir(tempfile.mkdtemp(prefix='lenfer-test-'))
+        for name, data in (('conf.json', {'modules': [], 'i2c': [], 'leds': {}}),
+                ('id.json', {'id': 1, 'token': 'token', 'combined_sync': True})):
+            with open(name, 'w') as json_file:
+                json.dump(data, json_file)
+        shutil.copyfile(os.path.join(REPO_ROOT, 'conf', 'settings_default.json'), 'settings_default.json')
+        self.clock = VirtualClock()
+        runtime.install(Board(self.clock), self.clock)
+        self.server = StandInServer(('127.0.0.1', 0), clock=self.clock.monotonic)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        runtime.hosts['*'] = self.server.server_address
+        from lenfer_device import LenferDevice
+        self.device = LenferDevice(Network())
+
+    def tearDown(self):
+        runtime.hosts.pop('*', None)
+        self.server.shutdown()
+        self.server.server_close()
+        os.chdir(self.cwd)
+
+    def run_coro(self, coro):
+        import lib.uasyncio as uasyncio
+        return uasyncio.get_event_loop().run_until_complete(coro)
+
+    def test_transitions_recorded_during_post_are_kept(self):
+        from lenfer_device import SWITCH_TRANSITIONS_LIMIT
+        for idx in range(5):
+            self.device.switch_transition(1, idx % 2)
+        _, transitions_seq, snapshot = self.device.switches_state_payload()
+        # the list is trimmed while the post is awaited
+        for idx in range(SWITCH_TRANSITIONS_LIMIT):
+            self.device.switch_transition(2, idx % 2)
+        self.device.switches_state_posted(transitions_seq, snapshot)
+        self.assertEqual(len(self.device.switch_transitions), SWITCH_TRANSITIONS_LIMIT)
+        self.assertEqual({entry[0] for entry in self.device.switch_transitions}, {2})
+
+    def paths(self):
+        return [path for _, path, _ in self.server.requests]
+
+    def test_sync_without_queued_data_sends_updates_query_only(self):
+        self.device._switches_snapshot = self.clock.time()
+        self.run_coro(self.device.post_sync(sensor_data=True, updates=True))
+        self.assertEqual(self.paths(), ['/api/device_updates'])
+
+    def test_sync_without_queued_data_and_updates_sends_nothing(self):
+        self.device._switches_snapshot = self.clock.time()
+        self.run_coro(self.device.post_sync(sensor_data=True, updates=False))
+        self.assertEqual(self.paths(), [])
+
+    def test_sync_with_queued_data(self):
+        self.device._switches_snapshot = self.clock.time()
+        self.device.data_log.append([(1, int(self.clock.time()), 20.5)])
+        self.run_coro(self.device.post_sync(sensor_data=True, updates=True))
+        self.assertEqual(self.paths(), ['/api/device_sync'])
+        self.assertEqual(len(self.device.data_log), 0)
+
+if __name__ == '__main__':
+    unittest.main()
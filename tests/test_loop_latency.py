@@ -0,0 +1,39 @@
+"""Event loop latency while HttpClient requests wait for a slow stand-in server (host time)."""
+import threading
+import unittest
+
+import sim.runtime as runtime
+from sim.board import Board
+from sim.clock import Clock
+from host.stand_in_server import StandInServer
+
+SERVER_DELAY = 0.5
+
+class LoopLatencyTest(unittest.TestCase):
+
+    def setUp(self):
+        clock = Clock()
+        runtime.install(Board(clock), clock)
+        self.server = StandInServer(('127.0.0.1', 0), delay=SERVER_DELAY)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_requests_do_not_block_the_loop(self):
+        import lib.uasyncio as uasyncio
+        from host import loop_latency
+        stats = {'running': True, 'ticks': 0, 'max_lag': 0, 'requests': []}
+        loop = uasyncio.get_event_loop()
+        loop.create_task(loop_latency.ticker(stats))
+        loop.run_until_complete(loop_latency.requests('http://127.0.0.1:%d/api/' % self.server.server_address[1],
+            2, stats))
+        self.assertEqual([result for _, result in stats['requests']], ['OK', 'OK'])
+        # the ticker kept running while each request waited for the server
+        self.assertGreaterEqual(min(duration for duration, _ in stats['requests']), SERVER_DELAY * 1000)
+        self.assertGreater(stats['ticks'], SERVER_DELAY * 1000 / loop_latency.TICK_MS)
+        self.assertLessEqual(stats['max_lag'], loop_latency.MAX_LAG_MS)
+
+if __name__ == '__main__':
+    unittest.main()
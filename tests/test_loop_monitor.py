@@ -0,0 +1,55 @@
+"""loop_monitor on the simulated event loop: lag accounting of sleeping and parked tasks."""
+import unittest
+
+import sim.runtime as runtime
+from sim.board import Board
+from sim.clock import VirtualClock
+
+class LoopMonitorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = VirtualClock()
+        runtime.install(Board(self.clock), self.clock)
+        import lib.uasyncio as uasyncio
+        import loop_monitor
+        self.uasyncio = uasyncio
+        self.loop_monitor = loop_monitor
+        loop_monitor._tasks.clear()
+
+    def test_parked_task_has_no_lag(self):
+        import lib.uasyncio.core as uasyncio_core
+        from i2c_bus import _Park
+        parked = []
+
+        async def waiter():
+            parked.append(uasyncio_core.cur_task)
+            await _Park()
+
+        async def waker():
+            await self.uasyncio.sleep_ms(500)
+            self.uasyncio.get_event_loop().call_soon(parked[0])
+            await self.uasyncio.sleep_ms(10)
+
+        self.loop_monitor.create_task(waiter(), 'waiter')
+        self.uasyncio.get_event_loop().run_until_complete(waker())
+        task = self.loop_monitor.stats()['tasks']['waiter']
+        self.assertEqual(task['steps'], 2)
+        self.assertEqual(task['max_lag'], 0)
+        self.assertEqual(task['lag_count'], 0)
+
+    def test_sleep_lag_is_recorded(self):
+        async def sleeper():
+            await self.uasyncio.sleep_ms(100)
+
+        async def blocker():
+            await self.uasyncio.sleep_ms(50)
+            # holds the loop past the sleeper wake up time
+            self.clock.sleep(0.2)
+            await self.uasyncio.sleep_ms(10)
+
+        self.loop_monitor.create_task(sleeper(), 'sleeper')
+        self.uasyncio.get_event_loop().run_until_complete(blocker())
+        self.assertGreaterEqual(self.loop_monitor.stats()['tasks']['sleeper']['max_lag'], 100)
+
+if __name__ == '__main__':
+    unittest.main()
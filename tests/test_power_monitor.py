@@ -0,0 +1,54 @@
+"""PowerMonitor read cycle on the simulated board: deadband filtering of the meter readings."""
+import unittest
+
+import sim.runtime as runtime
+from sim.board import Board
+from sim.clock import VirtualClock
+
+SENSOR_DEVICE_CONF = {'type': 'pzem004t', 'uart': {'tx': 23, 'rx': 22}, 'address': 1,
+    'sensors_ids': [24, 25], 'deadband': [5, 1]}
+
+class DataLog(list):
+
+    def append(self, entries):
+        self.extend(entries)
+
+class Device:
+
+    def __init__(self):
+        self.data_log = DataLog()
+        self.settings = {'sleep': 30}
+
+class PowerMonitorReadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = VirtualClock()
+        self.board = Board(self.clock)
+        self.board.attach_sensor_device(SENSOR_DEVICE_CONF, [], [])
+        runtime.install(self.board, self.clock)
+        from power_monitor_controller import PowerMonitor
+        self.device = Device()
+        self.power_monitor = PowerMonitor(self.device, {'uart_id': 1, 'sensor_devices': [SENSOR_DEVICE_CONF]})
+
+    def read(self):
+        import lib.uasyncio as uasyncio
+        del self.device.data_log[:]
+        uasyncio.get_event_loop().run_until_complete(self.power_monitor.read(once=True))
+        return {sensor_id: value for sensor_id, _, value in self.device.data_log}
+
+    def test_value_inside_deadband_is_not_logged(self):
+        first = self.read()
+        self.assertEqual(sorted(first), [24, 25])
+        self.assertIsNotNone(first[24])
+        self.clock.sleep(30)
+        # mains voltage and current move less than 5 V and 1 A between the readings
+        self.assertEqual(self.read(), {})
+
+    def test_failed_read_logs_none(self):
+        self.read()
+        self.board.uart_line(23, 22).devices[:] = []
+        self.clock.sleep(30)
+        self.assertEqual(self.read(), {24: None, 25: None})
+
+if __name__ == '__main__':
+    unittest.main()
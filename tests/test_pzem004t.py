@@ -0,0 +1,37 @@
+"""PZEM004T driver on a simulated Modbus line: replies of the polled meter only are accepted."""
+import unittest
+
+import sim.runtime as runtime
+from sim import devices
+from sim.board import Board
+from sim.clock import VirtualClock
+
+class PZEM004TReplyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = VirtualClock()
+        self.board = Board(self.clock)
+        self.meter = devices.PZEM004T(self.board, address=2)
+        self.board.uart_line(23, 22).devices.append(self.meter)
+        runtime.install(self.board, self.clock)
+
+    def read(self, address):
+        import lib.uasyncio as uasyncio
+        from machine import UART
+        from pzem004t import PZEM004T
+        pzem = PZEM004T(UART(1, baudrate=9600, tx=23, rx=22), address)
+        uasyncio.get_event_loop().run_until_complete(pzem.read())
+        return pzem
+
+    def test_reply_from_another_address_is_rejected(self):
+        # a misconfigured meter that answers the frames sent to meter 1
+        self.meter.BROADCAST = 1
+        with self.assertRaises(OSError):
+            self.read(1)
+
+    def test_broadcast_accepts_any_address(self):
+        from pzem004t import BROADCAST
+        self.assertIsNotNone(self.read(BROADCAST).voltage)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""RtcController on the simulated board: writing the internal RTC time to the DS3231."""
+import os
+import tempfile
+import unittest
+
+import sim.runtime as runtime
+from sim import devices
+from sim.board import Board
+from sim.clock import VirtualClock
+
+TICK_MS = 10
+
+class Device:
+
+    def __init__(self, i2c):
+        from i2c_bus import I2CArbiter
+        self._arbiters = [I2CArbiter(i2c)]
+
+    def i2c_clients(self, module):
+        return [arbiter.client(module) for arbiter in self._arbiters]
+
+class SaveTimeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        os.chdir(tempfile.mkdtemp(prefix='lenfer-test-'))
+        self.clock = VirtualClock()
+        self.board = Board(self.clock)
+        self.ds3231 = self.board.i2c_bus(22, 21).attach(devices.DS3231(self.board))
+        runtime.install(self.board, self.clock)
+        from machine import I2C, Pin
+        from timers import RtcController
+        self.rtc = RtcController(Device(I2C(scl=Pin(22), sda=Pin(21))), {'i2c': 0})
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def test_first_boot_without_drift_file_logs_nothing(self):
+        from machine import I2C, Pin
+        from timers import RtcController
+        with self.assertNoLogs(level='ERROR'):
+            rtc = RtcController(Device(I2C(scl=Pin(22), sda=Pin(21))), {'i2c': 0})
+        self.assertIsNone(rtc.ppm)
+
+    def test_save_time_does_not_block_the_loop(self):
+        import lib.uasyncio as uasyncio
+        import utime
+        self.clock.sleep(0.3)
+        self.board.rtc_set(self.board.rtc_time() + 100.5)
+        stats = {'running': True, 'max_lag': 0}
+
+        async def ticker():
+            while stats['running']:
+                start = utime.ticks_ms()
+                await uasyncio.sleep_ms(TICK_MS)
+                stats['max_lag'] = max(stats['max_lag'], utime.ticks_diff(utime.ticks_ms(), start) - TICK_MS)
+
+        async def save():
+            await self.rtc.save_time()
+            stats['running'] = False
+
+        loop = uasyncio.get_event_loop()
+        loop.create_task(ticker())
+        loop.run_until_complete(save())
+        self.assertLessEqual(stats['max_lag'], TICK_MS)
+        self.assertAlmostEqual(self.ds3231.epoch(), self.board.rtc_time(), delta=0.01)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""SensorDataLog ring file: header writes and head recovery after a reboot."""
+import os
+import tempfile
+import unittest
+
+import sim.runtime as runtime
+from sim.board import Board
+from sim.clock import VirtualClock
+
+EPOCH = 720000000
+
+class SensorDataLogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        os.chdir(tempfile.mkdtemp(prefix='lenfer-test-'))
+        clock = VirtualClock()
+        runtime.install(Board(clock), clock)
+        import sensor_data_log
+        self.module = sensor_data_log
+        self.log = sensor_data_log.SensorDataLog('sensor_data.bin', capacity=64)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def append(self, start, count):
+        for idx in range(start, start + count):
+            self.log.append([(idx % 7, EPOCH + idx // 3, float(idx))])
+
+    def header_head(self):
+        import ustruct
+        with open('sensor_data.bin', 'rb') as _file:
+            return ustruct.unpack(self.module.HEADER_FORMAT, _file.read(self.module.HEADER_SIZE))[2]
+
+    def reboot(self):
+        self.log = self.module.SensorDataLog('sensor_data.bin', capacity=64)
+
+    def test_header_is_written_every_period(self):
+        period = self.module.HEADER_PERIOD
+        self.append(0, period - 1)
+        self.assertEqual(self.header_head(), 0)
+        self.append(period - 1, 1)
+        self.assertEqual(self.header_head(), period)
+
+    def test_head_is_recovered_on_boot(self):
+        self.append(0, 5)
+        self.reboot()
+        self.assertEqual(len(self.log), 5)
+        self.assertEqual([value for _, _, value in self.log.read(10)], [0.0, 1.0, 2.0, 3.0, 4.0])
+
+    def test_head_is_recovered_after_wrap(self):
+        self.append(0, 50)
+        self.log.read(50)
+        self.log.ack(50)
+        self.append(50, 25)
+        self.reboot()
+        self.assertEqual(len(self.log), 25)
+        self.assertEqual(self.log.read(1)[0][2], 50.0)
+        self.append(75, 1)
+        self.assertEqual(self.log.read(30)[-1][2], 75.0)
+
+    def test_head_is_recovered_after_clock_step_back(self):
+        self.append(0, 3)
+        # RTC reset to 2000 after a power loss
+        self.log.append([(1, 10, 3.0), (70000, 11, 4.0)])
+        self.reboot()
+        self.assertEqual(len(self.log), 5)
+        self.assertEqual(self.log.read(5)[3:], [(1, 10, 3.0), (70000, 11, 4.0)])
+
+    def test_stale_slots_are_not_recovered(self):
+        self.append(0, 70)
+        self.log.read(64)
+        self.log.ack(64)
+        # earlier epochs than the stale records of the previous lap
+        for idx in range(70, 70 + 8):
+            self.log.append([(1, idx, float(idx))])
+        self.reboot()
+        self.assertEqual(len(self.log), 8)
+
+    def test_overflow_is_recovered(self):
+        self.append(0, 70)
+        self.reboot()
+        self.assertEqual(len(self.log), 64)
+        self.assertEqual(self.log.read(1)[0][2], 6.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+"""I2C sensor devices circuit breaker on the simulated board."""
+import os
+import tempfile
+import unittest
+
+import sim.runtime as runtime
+from sim import devices
+from sim.board import Board
+from sim.clock import VirtualClock
+
+class Device:
+
+    def __init__(self):
+        self.recoveries = []
+
+    def recover_i2c(self, idx):
+        self.recoveries.append(idx)
+
+class Controller:
+
+    def __init__(self):
+        self.device = Device()
+        self.data = {}
+        self.sensors_roles = {'temperature': [1], 'humidity': [2]}
+
+class CCS811BreakerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        os.chdir(tempfile.mkdtemp(prefix='lenfer-test-'))
+        self.clock = VirtualClock()
+        self.board = Board(self.clock)
+        self.bus = self.board.i2c_bus(22, 21)
+        self.bus.attach(devices.CCS811(self.board))
+        runtime.install(self.board, self.clock)
+        from machine import I2C, Pin
+        from sensors import SensorDeviceCCS811
+        self.controller = Controller()
+        self.ccs811 = SensorDeviceCCS811({'type': 'ccs811', 'i2c': 0, 'sensors_ids': [3]}, self.controller,
+            [I2C(scl=Pin(22), sda=Pin(21))])
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def read(self, count):
+        for _ in range(count):
+            self.clock.sleep(1.1)
+            self.ccs811.read()
+
+    def test_first_start_without_baseline_logs_nothing(self):
+        from sensors import SensorDeviceCCS811
+        with self.assertNoLogs(level='ERROR'):
+            ccs811 = SensorDeviceCCS811({'type': 'ccs811', 'i2c': 0, 'sensors_ids': [3]}, self.controller,
+                [self.ccs811._i2c])
+        self.assertIsNone(ccs811._baseline)
+
+    def test_tripped_sensor_recovers_bus(self):
+        self.read(3)
+        self.assertEqual(self.ccs811.failures, 0)
+        self.bus.stuck = 100
+        self.read(self.ccs811.FAILURES_TRIP)
+        self.assertTrue(self.ccs811.tripped)
+        self.assertEqual(self.controller.device.recoveries, [0])
+        transfers = self.bus.transfers
+        self.read(3)
+        # skipped until the back-off expires
+        self.assertEqual(self.bus.transfers, transfers)
+        self.assertIsNone(self.controller.data[3])
+        self.bus.stuck = 0
+        self.clock.sleep(self.ccs811.BACKOFF_MIN)
+        self.read(1)
+        self.assertFalse(self.ccs811.tripped)
+
+if __name__ == '__main__':
+    unittest.main()
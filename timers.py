@@ -1,41 +1,131 @@
 from machine import RTC
+import utime
 
 import lib.uasyncio as uasyncio
 import logging
 
 from lenfer_controller import LenferController
-from utils import manage_memory
+from utils import manage_memory, load_json, save_json, file_exists
 
 LOG = logging.getLogger("Timers")
 
 class RtcController(LenferController):
+    """keeps the internal RTC within RESYNC_THRESHOLD seconds of the DS3231
+    the internal RTC drift is estimated in ppm (persisted between boots) and the next check
+    is made when the predicted error reaches half of the threshold; the internal RTC is resynced
+    only when the measured error does. When NTP keeps the internal RTC the DS3231 follows it."""
+
+    DRIFT_FILE = 'rtc_drift.json'
+    RESYNC_THRESHOLD = 0.5
+    CHECK_MIN = 600
+    CHECK_MAX = 6 * 3600
+    # DS3231 seconds since the resync for a drift estimate: offsets are measured within ~10 ms
+    PPM_MIN_ELAPSED = 3600
+    POLL_MS = 5
 
     def __init__(self, device, conf):
         LenferController.__init__(self, device)
-        self.i2c = device.i2c[conf["i2c"]]
+        self.i2c = device.i2c_clients('rtc')[conf["i2c"]]
+        self._ds3231 = None
+        # there is no drift file until the first estimate
+        drift = (load_json(self.DRIFT_FILE) if file_exists(self.DRIFT_FILE) else None) or {}
+        self.ppm = drift.get('ppm')
+        self._saved_ppm = self.ppm
+        self.offset = None
+        self._synced_at = None
+
+    @property
+    def ds3231(self):
+        "DS3231 driver, created on first use (the bus scan runs once)"
+        if not self._ds3231:
+            from ds3231_port import DS3231
+            self._ds3231 = DS3231(self.i2c)
+        return self._ds3231
 
     def get_time(self, set_rtc=False):
-        from ds3231_port import DS3231
-        ds3231 = DS3231(self.i2c)
-        ds3231.get_time(set_rtc=set_rtc)
-
-    def save_time(self):
-        from ds3231_port import DS3231
-        ds3231 = DS3231(self.i2c)
+        result = self.ds3231.get_time(set_rtc=set_rtc)
+        if set_rtc:
+            self._synced_at = utime.mktime(result)
+        return result
+
+    async def save_time(self):
+        "writes the internal RTC time to the DS3231 right after its seconds transition"
+        # the driver is created (the bus is scanned) before the transition
+        ds3231 = self.ds3231
+        await self.await_rtc_transition()
+        await self.i2c.turn()
         ds3231.save_time()
+        self._synced_at = None
 
-    def set_time(self, datetime_tuple):
+    async def set_time(self, datetime_tuple):
         rtc = RTC()
         rtc.init(datetime_tuple)
-        self.save_time()
+        await self.save_time()
+
+    async def await_rtc_transition(self):
+        "awaits the internal RTC seconds transition, returns its ticks_ms and the new seconds"
+        late = 0
+        sec = utime.time()
+        polled = utime.ticks_ms()
+        while True:
+            await uasyncio.sleep_ms(self.POLL_MS)
+            now = utime.ticks_ms()
+            rtc_epoch = utime.time()
+            if rtc_epoch != sec:
+                # a poll delayed by the loop misses the transition moment
+                if utime.ticks_diff(now, polled) <= 2 * self.POLL_MS or late >= 3:
+                    return now, rtc_epoch
+                late += 1
+                sec = rtc_epoch
+            polled = now
+
+    async def measure_offset(self):
+        """internal RTC minus DS3231 time in seconds measured on the seconds transitions of both
+        returns (offset, DS3231 epoch), the DS3231 driver buffer holds the time of its transition"""
+        rtc_ticks, rtc_epoch = await self.await_rtc_transition()
+        await self.i2c.turn()
+        await self.ds3231.await_transition_async()
+        ds_ticks = utime.ticks_ms()
+        ds_epoch = utime.mktime(self.ds3231.convert())
+        return rtc_epoch + utime.ticks_diff(ds_ticks, rtc_ticks) / 1000 - ds_epoch, ds_epoch
+
+    def update_ppm(self, sample):
+        self.ppm = sample if self.ppm is None else (self.ppm + sample) / 2
+        if self._saved_ppm is None or abs(self.ppm - self._saved_ppm) >= 0.5:
+            save_json({'ppm': round(self.ppm, 2)}, self.DRIFT_FILE)
+            self._saved_ppm = self.ppm
+        LOG.info('RTC drift: %.1f ppm' % self.ppm)
+
+    async def check_time(self, force=False):
+        "measures the internal RTC error, resyncs when needed, returns seconds till the next check"
+        offset, ds_epoch = await self.measure_offset()
+        self.offset = offset
+        if RTC().synced():
+            if abs(offset) >= self.RESYNC_THRESHOLD / 2:
+                LOG.info('DS3231 is %.3f s off NTP time, saving' % -offset)
+                await self.save_time()
+            return self.CHECK_MAX
+        if self._synced_at is not None and ds_epoch - self._synced_at >= self.PPM_MIN_ELAPSED:
+            self.update_ppm(offset / (ds_epoch - self._synced_at) * 1e6)
+        if force or self._synced_at is None or abs(offset) >= self.RESYNC_THRESHOLD / 2:
+            # the DS3231 seconds transition has just passed
+            self.ds3231.convert(set_rtc=True)
+            self._synced_at = ds_epoch
+            offset = 0
+        if self.ppm is None:
+            return self.CHECK_MIN
+        if not self.ppm:
+            return self.CHECK_MAX
+        interval = (self.RESYNC_THRESHOLD / 2 - abs(offset)) / abs(self.ppm) * 1e6
+        return int(min(max(interval, self.CHECK_MIN), self.CHECK_MAX))
 
     async def adjust_time(self, once=False):
         while True:
-            self.get_time(set_rtc=True)
+            interval = await self.check_time(force=once)
             if once:
                 break
-            await uasyncio.sleep(600)
-            manage_memory()
+            await uasyncio.sleep(interval)
+            manage_memory('rtc_adjust')
 
 
 def timer_minutes(entry):
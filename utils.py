@@ -1,11 +1,20 @@
-import gc
 import machine
 
+import uos
 import ujson
 import logging
 
+import gc_policy
+
 LOG = logging.getLogger("Main")
 
+def file_exists(path):
+    try:
+        uos.stat(path)
+        return True
+    except OSError:
+        return False
+
 def load_json(path):
     try:
         with open(path, 'r', encoding="utf-8") as _file:
@@ -21,10 +30,14 @@ def save_json(data, path):
     except Exception as exc:
         LOG.exc(exc, 'JSON file save failed: %s' % path)     
 
-def manage_memory():
+def manage_memory(site=None, force=False):
+    """feeds WDT and lets gc_policy decide if collection is needed
+    force - unconditional collection (boot, before large allocations)"""
     machine.resetWDT()
-    gc.collect()
-    gc.threshold(gc.mem_free() // 4 + gc.mem_alloc())
+    if force:
+        gc_policy.reserve(site=site)
+    else:
+        gc_policy.check(site)
 #    micropython.mem_info()
 #    print('-----------------------------')
 #    print('Free: {} allocated: {}'.format(gc.mem_free(), gc.mem_alloc()))